@@ -35,6 +35,7 @@ export async function initPanel() {
 
   filterBtn.addEventListener('click', () => {
     filterPanel.classList.toggle('rhif-open');
+    if (filterPanel.classList.contains('rhif-open')) loadFacets(new URLSearchParams());
   });
 
   themeBtn.addEventListener('click', () => {
@@ -124,10 +125,31 @@ export async function initPanel() {
     window.postMessage({ type: 'RHIF_PASTE', payload: text }, '*');
   });
 
+  // fill the filter suggestions with the hub's per-value counts
+  async function loadFacets(params) {
+    let data;
+    try {
+      data = await hubFetch(`/facets?${params.toString()}`);
+    } catch (err) {
+      console.error('Facets failed:', err);
+      return;
+    }
+    ['domain', 'topic', 'emotion'].forEach(dim => {
+      const list = document.getElementById(`rhif-${dim}-options`);
+      list.innerHTML = '';
+      (data.facets[dim] || []).forEach(f => {
+        const opt = document.createElement('option');
+        opt.value = f.value;
+        opt.label = `${f.value} (${f.count})`;
+        list.appendChild(opt);
+      });
+    });
+  }
+
   async function runSearch() {
     const q = searchInput.value.trim();
     if (!q) return;
-    const params = new URLSearchParams({ q, limit: '20' });
+    const params = new URLSearchParams({ q });
     const domain = document.getElementById('rhif-domain').value.trim();
     const topic = document.getElementById('rhif-topic').value.trim();
     const emotion = document.getElementById('rhif-emotion').value.trim();
@@ -141,7 +163,13 @@ export async function initPanel() {
     if (convId) params.append('conv_id', convId);
     if (start) params.append('start', start);
     if (end) params.append('end', end);
+    loadFacets(params);
+    params.append('limit', '20');
     if (slow) params.append('slow', '1');
+    // list rows only need an excerpt; previews load the whole conversation
+    params.append('fields', 'id,conv_id,summary,snippet');
+    params.append('open', '');
+    params.append('close', '');
     try {
       rows = await hubFetch(`/search?${params.toString()}`, { headers: { Accept: 'application/json' } });
     } catch (err) {
@@ -158,7 +186,7 @@ export async function initPanel() {
       const li = document.createElement('li');
       li.className = 'rhif-row';
       const link = document.createElement('a');
-      link.textContent = (r.summary || r.text).slice(0, 60);
+      link.textContent = (r.summary || r.snippet || '').slice(0, 60);
       link.addEventListener('click', e => { e.preventDefault(); showPreview(idx); });
       li.appendChild(link);
       results.appendChild(li);
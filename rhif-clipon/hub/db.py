@@ -9,16 +9,35 @@ Tables:
   - ``keyword_set``/``keyword_set_fts`` and ``rsp_keyword_xref``: deduplicated
     keyword lists with FTS search.
   - ``dim_value``: lookup table for dimension text values.
+  - ``rsp_vocab``: word document frequencies used by the fuzzy search tier.
+  - ``rsp_embedding``: float32 vectors for semantic search.
+  - ``rsp_minhash``/``rsp_lsh``: MinHash signatures, LSH band buckets and
+    near-duplicate links to a canonical packet.
+  - ``facet_count``/``facet_pair``: materialised per-value packet counts.
+  - ``text_dict``: compression dictionaries for ``rsp.text``.
+  - ``write_gen``: one counter advanced by every write, keying result caches.
+
+``rsp.text`` may be stored compressed (see ``text_codec``). ``rsp_fts``
+indexes the ``rsp_text`` view, which decompresses through the
+``rhif_text()`` SQL function registered on every connection; rows read
+in Python are decompressed by :func:`_inflate` only once they are returned.
 
 Important indices are created on the FK columns.
 """
 
+import atexit
+import base64
 import json
 import sqlite3
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional
 
+from . import fuzzy, minhash, text_codec
+from .embeddings import VectorIndex, rrf
 from .rhif_utils import (
     canonical_json,
     rsp_hash,
@@ -26,10 +45,45 @@ from .rhif_utils import (
     canonical_keyword_list,
 )
 
-from flask import current_app
+from flask import Flask, current_app, g
 
 _MEM_CONN: sqlite3.Connection | None = None
 
+FTS_TABLES = ('rsp_fts', 'keyword_set_fts')
+# every ingest commits a small transaction and so adds an FTS segment; let
+# more segments accumulate before merging than the FTS5 defaults (4 / 16)
+FTS_AUTOMERGE = 8
+FTS_CRISISMERGE = 32
+
+# hot axes copied into ``meta`` and resolved to ``dim_value`` ids
+META_AXES = ['domain', 'topic', 'conversation_type', 'emotion', 'novelty']
+
+
+RSP_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS rsp_fts USING fts5(text, summary, tokenize='trigram', "
+    "content='rsp_text', content_rowid='id')"
+)
+
+
+def write_generation() -> Optional[int]:
+    """Return the current write generation, or ``None`` if it is not tracked.
+
+    The counter lives in the database (``write_gen``), so writes made by
+    other processes, e.g. ``ingest_export --direct``, are seen as well.
+    Archives that predate the table report ``None`` until
+    :func:`ensure_schema` runs.
+    """
+    try:
+        row = get_db().execute("SELECT n FROM write_gen WHERE id = 0").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def _bump_generation(conn: sqlite3.Connection) -> None:
+    """Advance the write generation inside the caller's transaction."""
+    conn.execute("UPDATE write_gen SET n = n + 1 WHERE id = 0")
+
 
 def ensure_schema() -> None:
     """Create required tables and indices if they do not already exist."""
@@ -65,8 +119,9 @@ def ensure_schema() -> None:
             )"""
         )
         conn.execute(
-            "CREATE VIRTUAL TABLE IF NOT EXISTS rsp_fts USING fts5(text, summary, tokenize='trigram', content='rsp', content_rowid='id')"
+            "CREATE VIEW IF NOT EXISTS rsp_text AS SELECT id, rhif_text(text) AS text, summary FROM rsp"
         )
+        conn.execute(RSP_FTS_SQL)
         conn.execute(
             """CREATE TABLE IF NOT EXISTS rsp_index (
               hash TEXT,
@@ -81,6 +136,8 @@ def ensure_schema() -> None:
         conn.execute("CREATE INDEX IF NOT EXISTS rsp_topic_idx ON rsp(topic_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS rsp_convtype_idx ON rsp(convtype_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS rsp_emotion_idx ON rsp(emotion_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS rsp_conv_turn_idx ON rsp(conv_id, turn)")
+        conn.execute("CREATE INDEX IF NOT EXISTS rsp_date_idx ON rsp(date)")
         conn.execute(
             """CREATE TABLE IF NOT EXISTS keyword_set(
               id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -101,23 +158,245 @@ def ensure_schema() -> None:
         conn.execute(
             "CREATE UNIQUE INDEX IF NOT EXISTS idx_keyword_set_hash ON keyword_set(kw_hash)"
         )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rsp_vocab(
+              word TEXT PRIMARY KEY,
+              df   INTEGER NOT NULL
+            ) WITHOUT ROWID"""
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS rsp_vocab_len_idx ON rsp_vocab(length(word))"
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rsp_embedding(
+              seq    INTEGER PRIMARY KEY AUTOINCREMENT,
+              rsp_id INTEGER NOT NULL UNIQUE,
+              model  TEXT NOT NULL,
+              vec    BLOB NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rsp_minhash(
+              rsp_id       INTEGER PRIMARY KEY,
+              sig          BLOB NOT NULL,
+              canonical_id INTEGER,
+              similarity   REAL
+            )"""
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS rsp_minhash_canonical_idx ON rsp_minhash(canonical_id)"
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS rsp_lsh(
+              band   INTEGER NOT NULL,
+              bucket INTEGER NOT NULL,
+              rsp_id INTEGER NOT NULL,
+              PRIMARY KEY(band, bucket, rsp_id)
+            ) WITHOUT ROWID"""
+        )
+        # materialised facet counts, maintained by every write to ``rsp``:
+        # packets per dim_value, and per pair of values on one packet
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS facet_count(
+              value_id INTEGER PRIMARY KEY,
+              n        INTEGER NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS facet_pair(
+              filter_id INTEGER NOT NULL,
+              value_id  INTEGER NOT NULL,
+              n         INTEGER NOT NULL,
+              PRIMARY KEY(filter_id, value_id)
+            ) WITHOUT ROWID"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS text_dict(
+              id      INTEGER PRIMARY KEY AUTOINCREMENT,
+              digest  BLOB NOT NULL UNIQUE,
+              codec   TEXT NOT NULL,
+              dict    BLOB NOT NULL,
+              samples INTEGER,
+              created TEXT DEFAULT CURRENT_TIMESTAMP
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS write_gen(
+              id INTEGER PRIMARY KEY CHECK (id = 0),
+              n  INTEGER NOT NULL
+            )"""
+        )
+        conn.execute("INSERT OR IGNORE INTO write_gen(id, n) VALUES (0, 0)")
+        _load_text_dicts(conn)
+        _configure_fts(
+            conn,
+            int(current_app.config.get('FTS_AUTOMERGE', FTS_AUTOMERGE)),
+            int(current_app.config.get('FTS_CRISISMERGE', FTS_CRISISMERGE)),
+        )
         conn.commit()
 
 
+def _configure_fts(conn: sqlite3.Connection, automerge: int, crisismerge: int) -> None:
+    """Store the merge settings in each FTS table's config (persistent)."""
+    for table in FTS_TABLES:
+        conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('automerge', ?)", (automerge,))
+        conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('crisismerge', ?)", (crisismerge,))
+
+
+def _prepare_conn(conn: sqlite3.Connection) -> None:
+    """Set the row factory and SQL functions every connection needs."""
+    conn.row_factory = sqlite3.Row
+    conn.create_function('rhif_text', 1, text_codec.decode, deterministic=True)
+    _load_text_dicts(conn)
+
+
+def _load_text_dicts(conn: sqlite3.Connection) -> None:
+    """Register the stored compression dictionaries with ``text_codec``."""
+    try:
+        for r in conn.execute("SELECT dict FROM text_dict"):
+            text_codec.register_dictionary(r[0])
+    except sqlite3.OperationalError:
+        pass  # schema not created yet
+
+
+def _find_text_dict(did: bytes) -> Optional[bytes]:
+    """Return dictionary ``did`` from the ``text_dict`` of an open database.
+
+    Installed as the ``text_codec`` loader, so a dictionary trained by
+    another process decodes without a restart. A fresh connection is used
+    because this can run inside ``rhif_text`` on a pooled one.
+    """
+    with _POOLS_LOCK:
+        paths = list(_POOLS)
+    for path in paths:
+        conn = sqlite3.connect(path, timeout=30)
+        try:
+            row = conn.execute("SELECT dict FROM text_dict WHERE digest=?", (did,)).fetchone()
+        except sqlite3.OperationalError:
+            row = None  # schema not created yet
+        finally:
+            conn.close()
+        if row is not None:
+            return row[0]
+    return None
+
+
+class ConnectionPool:
+    """Small pool of reusable SQLite connections for one database file.
+
+    Each connection is opened in WAL mode with the tuning pragmas applied
+    once, so concurrent readers are not blocked by the single writer.
+    Connections are handed to one app context at a time and returned by
+    :func:`close_db` on teardown.
+    """
+
+    def __init__(self, path: str, size: int, pragmas: Dict[str, Any]) -> None:
+        self.path = path
+        self.size = size
+        self.pragmas = pragmas
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        _prepare_conn(conn)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        self.opened += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """Return an idle connection or open a new one."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return ``conn`` to the pool, closing it if the pool is full."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self) -> None:
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _get_pool(db_path: str) -> ConnectionPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(db_path)
+        if pool is None:
+            cfg = current_app.config
+            pragmas = {
+                'synchronous': cfg.get('DB_SYNCHRONOUS', 'NORMAL'),
+                'cache_size': -int(cfg.get('DB_CACHE_KB', 65536)),
+                'mmap_size': int(cfg.get('DB_MMAP_BYTES', 256 * 1024 * 1024)),
+                'temp_store': 'MEMORY',
+            }
+            pool = ConnectionPool(db_path, int(cfg.get('DB_POOL_SIZE', 8)), pragmas)
+            _POOLS[db_path] = pool
+        return pool
+
+
+text_codec.set_dictionary_loader(_find_text_dict)
+
+
+@atexit.register
+def close_pools() -> None:
+    """Close all pooled connections (run at interpreter exit)."""
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close_all()
+
+
 def get_db() -> sqlite3.Connection:
-    """Return a connection to the configured SQLite database."""
-    db_path = Path(current_app.config.get('DB_PATH', './rhif.sqlite'))
-    if str(db_path) == ':memory:':
+    """Return the connection bound to the current app context.
+
+    File databases borrow a pooled connection that is kept on ``g`` for the
+    rest of the context and returned by :func:`close_db`.
+    """
+    db_path = str(Path(current_app.config.get('DB_PATH', './rhif.sqlite')))
+    if db_path == ':memory:':
         global _MEM_CONN
         if _MEM_CONN is None:
-            _MEM_CONN = sqlite3.connect(':memory:')
-            _MEM_CONN.row_factory = sqlite3.Row
+            _MEM_CONN = sqlite3.connect(':memory:', check_same_thread=False)
+            _prepare_conn(_MEM_CONN)
         return _MEM_CONN
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = g.get('rhif_db')
+    if conn is None:
+        conn = _get_pool(db_path).acquire()
+        g.rhif_db = conn
+        g.rhif_db_path = db_path
     return conn
 
 
+def close_db(exc: Optional[BaseException] = None) -> None:
+    """Return the context's connection to its pool."""
+    conn = g.pop('rhif_db', None)
+    if conn is not None:
+        _POOLS[g.pop('rhif_db_path')].release(conn)
+
+
+def init_app(app: Flask) -> None:
+    """Register connection teardown on ``app``."""
+    app.teardown_appcontext(close_db)
+
+
 def execute(sql: str, *params) -> List[sqlite3.Row]:
     """Execute an SQL statement and return all fetched rows."""
     with get_db() as conn:
@@ -126,29 +405,82 @@ def execute(sql: str, *params) -> List[sqlite3.Row]:
         return cur.fetchall()
 
 
-def _dim_id(cur: sqlite3.Cursor, dim: str, val: str | None) -> Optional[int]:
-    """Return ID for *val* in ``dim_value`` inserting if needed."""
-    if not val:
-        return None
-    cur.execute(
-        "INSERT OR IGNORE INTO dim_value(dimension,value) VALUES (?,?)",
-        (dim, val),
-    )
-    return cur.execute(
-        "SELECT id FROM dim_value WHERE dimension=? AND value=?",
-        (dim, val),
-    ).fetchone()[0]
+def _keyword_set_id(
+    conn: sqlite3.Connection, kw_json: str, kw_hash: str, fts: bool = True
+) -> int:
+    """Return the ``keyword_set`` id for ``kw_json`` inserting if needed."""
+    row_kw = conn.execute("SELECT id FROM keyword_set WHERE kw_hash=?", (kw_hash,)).fetchone()
+    if row_kw:
+        return row_kw['id']
+    try:
+        cur = conn.execute(
+            "INSERT INTO keyword_set(kw_hash, keywords_json) VALUES (?,?)",
+            (kw_hash, kw_json)
+        )
+        kw_id = cur.lastrowid
+        if fts:
+            conn.execute(
+                "INSERT INTO keyword_set_fts(rowid, keywords_json) VALUES (?,?)",
+                (kw_id, kw_json)
+            )
+        return kw_id
+    except sqlite3.IntegrityError:
+        return conn.execute(
+            "SELECT id FROM keyword_set WHERE kw_hash=?", (kw_hash,)
+        ).fetchone()[0]
 
 
-def insert_rsp(row: Dict[str, Any]) -> int:
-    """Insert a response packet and create all related index entries."""
-    base_fields = [
-        'conv_id', 'turn', 'role', 'date', 'text',
-        'summary', 'keywords', 'tags', 'tokens',
-        'meta', 'children', 'domain_id', 'topic_id',
-        'convtype_id', 'emotion_id', 'novelty', 'hash'
+def _index_meta(
+    conn: sqlite3.Connection,
+    entries: Iterable[tuple],
+) -> None:
+    """Write flattened meta pairs into ``rsp_index``.
+
+    ``entries`` yields ``(hash, meta_pairs, children)`` per packet and all
+    rows are written with a single ``executemany``.
+    """
+    meta_rows = [
+        (idx['hash'], idx['dimension'], idx['value'], idx['dimension_hash'], idx['context_path'])
+        for hash_value, meta_pairs, children in entries
+        for idx in flatten_meta(hash_value, meta_pairs, children)
+        if idx['dimension'] != 'word'
     ]
-    row = {k: row.get(k) for k in base_fields + ['domain','topic','conversation_type','emotion']}
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO rsp_index(hash,dimension,value,dimension_hash,context_path) VALUES (?,?,?,?,?)",
+            meta_rows
+        )
+    except sqlite3.IntegrityError:
+        pass
+
+
+RSP_FIELDS = [
+    'conv_id', 'turn', 'role', 'date', 'text',
+    'summary', 'keywords', 'tags', 'tokens',
+    'meta', 'children', 'domain_id', 'topic_id',
+    'convtype_id', 'emotion_id', 'novelty', 'hash'
+]
+
+# (dimension name, rsp column) for the hot axes stored as ``dim_value`` ids
+DIM_COLUMNS = [
+    ('domain', 'domain_id'),
+    ('topic', 'topic_id'),
+    ('conversation_type', 'convtype_id'),
+    ('emotion', 'emotion_id'),
+]
+
+# stay well below SQLITE_MAX_VARIABLE_NUMBER on older builds
+_IN_CHUNK = 400
+
+
+def _chunks(items: List[Any], size: int = _IN_CHUNK) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _prepare_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalise an incoming packet and derive its hash, meta and keyword set."""
+    row = {k: row.get(k) for k in RSP_FIELDS + [d for d, _ in DIM_COLUMNS]}
 
     if row.get('date'):
         row['date'] = str(row['date']).strip('"\'')[:10]
@@ -157,83 +489,1032 @@ def insert_rsp(row: Dict[str, Any]) -> int:
         row['novelty'] = round(float(row['novelty']), 2)
 
     kw_list = canonical_keyword_list(json.loads(row.get('keywords') or '[]'))
-    kw_json = canonical_json(kw_list)
-    kw_hash = hashlib.sha256(kw_json.encode()).hexdigest()
+    row['_kw_json'] = canonical_json(kw_list)
+    row['_kw_hash'] = hashlib.sha256(row['_kw_json'].encode()).hexdigest()
     row['keywords'] = None  # legacy field stored as NULL
 
     # build meta pairs from hot axes if meta not provided
     meta_pairs: List[Dict[str, Any]] = []
-    for axis in ['domain', 'topic', 'conversation_type', 'emotion', 'novelty']:
+    for axis in META_AXES:
         if row.get(axis):
             meta_pairs.append({'dimension': axis, 'value': row[axis]})
     if row.get('meta'):
         meta_pairs.extend(json.loads(row['meta']))
     row['meta'] = json.dumps(meta_pairs)
+    row['_meta_pairs'] = meta_pairs
+    row['_children'] = json.loads(row.get('children', '[]') or '[]')
 
     row['hash'] = row.get('hash') or rsp_hash(
-        row.get('text', ''), meta_pairs, json.loads(row.get('children', '[]') or '[]')
+        row.get('text', ''), meta_pairs, row['_children']
+    )
+    return row
+
+
+class IdCache:
+    """Write-through maps of ``(dimension, value)`` and ``kw_hash`` to row ids.
+
+    ``dim_value`` only holds a few hundred rows so it is cached in full;
+    keyword sets are capped at ``max_keyword_sets`` entries, dropping the
+    oldest first. Callers publish new ids only after their transaction
+    commits so a rollback can never leave a dangling id behind.
+    """
+
+    def __init__(self, max_keyword_sets: int = 200000) -> None:
+        self.max_keyword_sets = max_keyword_sets
+        self._dims: Dict[tuple, int] = {}
+        self._kw: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def dims(self, pairs: Iterable[tuple]) -> Dict[tuple, int]:
+        with self._lock:
+            found = {p: self._dims[p] for p in pairs if p in self._dims}
+        return found
+
+    def keyword_sets(self, hashes: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            found = {h: self._kw[h] for h in hashes if h in self._kw}
+        return found
+
+    def count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def remember(self, dims: Dict[tuple, int], kw: Dict[str, int]) -> None:
+        with self._lock:
+            self._dims.update(dims)
+            self._kw.update(kw)
+            while len(self._kw) > self.max_keyword_sets:
+                self._kw.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'dim_values': len(self._dims),
+                'keyword_sets': len(self._kw),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_ID_CACHES: Dict[str, IdCache] = {}
+
+
+def get_id_cache() -> IdCache:
+    """Return the id cache for the configured database."""
+    db_path = str(current_app.config.get('DB_PATH', './rhif.sqlite'))
+    with _POOLS_LOCK:
+        cache = _ID_CACHES.get(db_path)
+        if cache is None:
+            cache = _ID_CACHES[db_path] = IdCache(
+                int(current_app.config.get('KEYWORD_SET_CACHE_SIZE', 200000))
+            )
+        return cache
+
+
+def warm_id_caches() -> None:
+    """Load all dimension values and the newest keyword sets into memory."""
+    cache = get_id_cache()
+    conn = get_db()
+    dims = {
+        (r['dimension'], r['value']): r['id']
+        for r in conn.execute("SELECT id, dimension, value FROM dim_value")
+    }
+    kw = {
+        r['kw_hash']: r['id']
+        for r in conn.execute(
+            "SELECT id, kw_hash FROM keyword_set ORDER BY id DESC LIMIT ?",
+            (cache.max_keyword_sets,),
+        )
+    }
+    cache.remember(dims, kw)
+
+
+def _dim_ids(conn: sqlite3.Connection, pairs: Iterable[tuple]) -> Dict[tuple, int]:
+    """Resolve many ``(dimension, value)`` pairs to ids, inserting new ones.
+
+    Values are compared as text, matching the column affinity.
+    """
+    wanted = list({(d, str(v)) for d, v in pairs if v})
+    if not wanted:
+        return {}
+    cache = get_id_cache()
+    ids = cache.dims(wanted)
+    missing = [p for p in wanted if p not in ids]
+    cache.count(len(ids), len(missing))
+    if not missing:
+        return ids
+    conn.executemany(
+        "INSERT OR IGNORE INTO dim_value(dimension,value) VALUES (?,?)", missing
+    )
+    for chunk in _chunks(missing):
+        sql = (
+            "SELECT id, dimension, value FROM dim_value WHERE (dimension, value) IN (VALUES "
+            + ",".join(["(?,?)"] * len(chunk)) + ")"
+        )
+        params = [x for pair in chunk for x in pair]
+        for r in conn.execute(sql, params):
+            ids[(r['dimension'], r['value'])] = r['id']
+    return ids
+
+
+def _keyword_set_ids(
+    conn: sqlite3.Connection, sets: Dict[str, str], fts: bool = True
+) -> Dict[str, int]:
+    """Resolve ``{kw_hash: kw_json}`` to ``keyword_set`` ids, inserting new sets."""
+    cache = get_id_cache()
+    ids = cache.keyword_sets(sets)
+    hashes = [h for h in sets if h not in ids]
+    cache.count(len(ids), len(hashes))
+    for chunk in _chunks(hashes):
+        sql = f"SELECT id, kw_hash FROM keyword_set WHERE kw_hash IN ({','.join('?' * len(chunk))})"
+        for r in conn.execute(sql, chunk):
+            ids[r['kw_hash']] = r['id']
+    for kw_hash in hashes:
+        if kw_hash not in ids:
+            ids[kw_hash] = _keyword_set_id(conn, sets[kw_hash], kw_hash, fts)
+    return ids
+
+
+def _add_vocab(conn: sqlite3.Connection, texts: Iterable[Optional[str]], delta: int = 1) -> None:
+    """Add ``delta`` per text to the ``rsp_vocab`` frequencies of its words."""
+    counts: Dict[str, int] = {}
+    for text in texts:
+        for word in fuzzy.words(text):
+            counts[word] = counts.get(word, 0) + delta
+    conn.executemany(
+        "INSERT INTO rsp_vocab(word, df) VALUES (?,?) "
+        "ON CONFLICT(word) DO UPDATE SET df = df + excluded.df",
+        counts.items(),
+    )
+    if delta < 0:
+        conn.executemany("DELETE FROM rsp_vocab WHERE word = ? AND df <= 0", ((w,) for w in counts))
+
+
+def rebuild_vocab() -> int:
+    """Rebuild ``rsp_vocab`` from every stored packet and return its size."""
+    with get_db() as conn:
+        conn.execute("DELETE FROM rsp_vocab")
+        cur = conn.execute("SELECT text FROM rsp")
+        while True:
+            batch = cur.fetchmany(1000)
+            if not batch:
+                break
+            _add_vocab(conn, (text_codec.decode(r['text']) for r in batch))
+        _bump_generation(conn)
+        conn.commit()
+        return conn.execute("SELECT COUNT(*) FROM rsp_vocab").fetchone()[0]
+
+
+def vocab_doc_freq(words: Iterable[str]) -> Dict[str, int]:
+    """Return ``rsp_vocab`` document frequencies for ``words``."""
+    words = list(words)
+    found: Dict[str, int] = {}
+    conn = get_db()
+    for chunk in _chunks(words):
+        sql = f"SELECT word, df FROM rsp_vocab WHERE word IN ({','.join('?' * len(chunk))})"
+        for r in conn.execute(sql, chunk):
+            found[r['word']] = r['df']
+    return found
+
+
+def archive_size() -> int:
+    """Return an O(1) estimate of the number of stored packets."""
+    return get_db().execute("SELECT COALESCE(MAX(id), 0) FROM rsp").fetchone()[0]
+
+
+_TEXT_CODECS: Dict[str, Optional[tuple]] = {}
+
+
+def _fts_uses_view(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'rsp_fts'").fetchone()
+    return row is not None and "content='rsp_text'" in row['sql']
+
+
+def _latest_dict(conn: sqlite3.Connection, codec: str) -> Optional[bytes]:
+    row = conn.execute(
+        "SELECT dict FROM text_dict WHERE codec = ? ORDER BY id DESC LIMIT 1", (codec,)
+    ).fetchone()
+    return row['dict'] if row else None
+
+
+def _text_codec(conn: sqlite3.Connection) -> Optional[tuple]:
+    """Return ``(codec, dictionary)`` for new writes, or ``None`` for plain text.
+
+    ``TEXT_COMPRESSION`` picks ``zlib`` (default), ``zstd`` (falls back to
+    zlib without the ``zstandard`` package) or ``none``. Compression also
+    needs ``rsp_fts`` to index the ``rsp_text`` view; older archives keep
+    plain text until ``tools/compress_text.py migrate`` switches them over.
+    """
+    db_path = str(Path(current_app.config.get('DB_PATH', './rhif.sqlite')))
+    if db_path not in _TEXT_CODECS:
+        codec = current_app.config.get('TEXT_COMPRESSION', 'zlib') or 'none'
+        if codec != 'none' and not text_codec.available(codec):
+            codec = 'zlib'
+        state = None
+        if codec != 'none' and _fts_uses_view(conn):
+            state = (codec, _latest_dict(conn, codec))
+        _TEXT_CODECS[db_path] = state
+    return _TEXT_CODECS[db_path]
+
+
+def _inflate(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Decompress ``text`` in place for rows about to be returned."""
+    for row in rows:
+        if isinstance(row.get('text'), bytes):
+            row['text'] = text_codec.decode(row['text'])
+    return rows
+
+
+def train_text_dict(codec: str = 'zlib', samples: int = 2000,
+                    size: int = text_codec.DICT_SIZE) -> Dict[str, Any]:
+    """Train a dictionary on a random sample of packets and make it current."""
+    with get_db() as conn:
+        texts = [text_codec.decode(r['text']) for r in conn.execute(
+            "SELECT text FROM rsp WHERE text IS NOT NULL ORDER BY random() LIMIT ?", (samples,)
+        )]
+        if not texts:
+            raise ValueError("no packets to train on")
+        dictionary = text_codec.train_dictionary(texts, codec, size)
+        conn.execute(
+            "INSERT OR IGNORE INTO text_dict(digest, codec, dict, samples) VALUES (?,?,?,?)",
+            (text_codec.dict_id(dictionary), codec, dictionary, len(texts)),
+        )
+        conn.commit()
+    text_codec.register_dictionary(dictionary)
+    _TEXT_CODECS.clear()
+    return {'codec': codec, 'bytes': len(dictionary), 'samples': len(texts)}
+
+
+def use_text_view() -> bool:
+    """Point ``rsp_fts`` at the decompressing ``rsp_text`` view.
+
+    Archives created before text compression index ``rsp`` directly; their
+    FTS table is dropped, recreated and rebuilt once. Returns whether the
+    index had to be rebuilt.
+    """
+    with get_db() as conn:
+        if _fts_uses_view(conn):
+            return False
+        conn.execute("DROP TABLE rsp_fts")
+        conn.execute(RSP_FTS_SQL)
+        conn.execute("INSERT INTO rsp_fts(rsp_fts) VALUES ('rebuild')")
+        _configure_fts(
+            conn,
+            int(current_app.config.get('FTS_AUTOMERGE', FTS_AUTOMERGE)),
+            int(current_app.config.get('FTS_CRISISMERGE', FTS_CRISISMERGE)),
+        )
+        _bump_generation(conn)
+        conn.commit()
+    _TEXT_CODECS.clear()
+    return True
+
+
+def recompress_text(codec: str = 'zlib', batch: int = 1000) -> Dict[str, int]:
+    """Rewrite every ``rsp.text`` with ``codec`` and its newest dictionary.
+
+    Works in short transactions of ``batch`` rows. ``rsp_fts`` must already
+    index ``rsp_text`` (see :func:`use_text_view`); it is not touched since
+    the decompressed text does not change. Returns row and byte counts.
+    """
+    stats = {'rows': 0, 'rewritten': 0, 'bytes_before': 0, 'bytes_after': 0}
+    with get_db() as conn:
+        if not _fts_uses_view(conn):
+            raise ValueError("rsp_fts still indexes rsp directly; run use_text_view() first")
+        dictionary = _latest_dict(conn, codec)
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, text FROM rsp WHERE id > ? AND text IS NOT NULL ORDER BY id LIMIT ?",
+                (last_id, batch),
+            ).fetchall()
+            if not rows:
+                break
+            updates = []
+            for r in rows:
+                old = r['text']
+                new = text_codec.encode(text_codec.decode(old), codec, dictionary)
+                stats['bytes_before'] += len(old if isinstance(old, bytes) else old.encode('utf-8'))
+                stats['bytes_after'] += len(new if isinstance(new, bytes) else new.encode('utf-8'))
+                if new != old:
+                    updates.append((new, r['id']))
+            conn.executemany("UPDATE rsp SET text = ? WHERE id = ?", updates)
+            conn.commit()
+            stats['rows'] += len(rows)
+            stats['rewritten'] += len(updates)
+            last_id = rows[-1]['id']
+        _bump_generation(conn)
+        conn.commit()
+    _TEXT_CODECS.clear()
+    return stats
+
+
+def text_stats() -> Dict[str, Any]:
+    """Return how ``rsp.text`` is stored and the size of the database file."""
+    conn = get_db()
+    row = conn.execute(
+        "SELECT COUNT(*) AS n, COALESCE(SUM(typeof(text) = 'blob'), 0) AS compressed, "
+        "COALESCE(SUM(length(CAST(text AS BLOB))), 0) AS stored, "
+        "COALESCE(SUM(length(CAST(rhif_text(text) AS BLOB))), 0) AS plain FROM rsp"
+    ).fetchone()
+    page = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    return {
+        'rows': row['n'],
+        'compressed_rows': row['compressed'],
+        'text_bytes': row['plain'],
+        'stored_bytes': row['stored'],
+        'ratio': round(row['plain'] / row['stored'], 3) if row['stored'] else None,
+        'db_bytes': page * pages,
+        'fts_on_view': _fts_uses_view(conn),
+        'dictionaries': [dict(r) for r in conn.execute(
+            "SELECT id, codec, length(dict) AS bytes, samples, created FROM text_dict ORDER BY id"
+        )],
+    }
+
+
+def _count_facets(conn: sqlite3.Connection, id_rows: Iterable[Iterable[Optional[int]]],
+                  delta: int) -> None:
+    """Add ``delta`` to the facet counts of each packet's dimension ids."""
+    single: Dict[int, int] = {}
+    pairs: Dict[tuple, int] = {}
+    for ids in id_rows:
+        ids = [i for i in ids if i is not None]
+        for a in ids:
+            single[a] = single.get(a, 0) + delta
+            for b in ids:
+                if a != b:
+                    pairs[(a, b)] = pairs.get((a, b), 0) + delta
+    conn.executemany(
+        "INSERT INTO facet_count(value_id, n) VALUES (?,?) "
+        "ON CONFLICT(value_id) DO UPDATE SET n = n + excluded.n",
+        single.items(),
+    )
+    conn.executemany(
+        "INSERT INTO facet_pair(filter_id, value_id, n) VALUES (?,?,?) "
+        "ON CONFLICT(filter_id, value_id) DO UPDATE SET n = n + excluded.n",
+        ((a, b, n) for (a, b), n in pairs.items()),
     )
+    if delta < 0:
+        conn.executemany(
+            "DELETE FROM facet_count WHERE value_id = ? AND n <= 0", ((a,) for a in single)
+        )
+        conn.executemany(
+            "DELETE FROM facet_pair WHERE filter_id = ? AND value_id = ? AND n <= 0", pairs
+        )
+
+
+def rebuild_facets() -> int:
+    """Recount the facet tables from every stored packet; return the packets read."""
+    cols = ', '.join(col for _, col in DIM_COLUMNS)
+    done = 0
+    with get_db() as conn:
+        conn.execute("DELETE FROM facet_count")
+        conn.execute("DELETE FROM facet_pair")
+        cur = conn.execute(f"SELECT {cols} FROM rsp")
+        while True:
+            batch = cur.fetchmany(1000)
+            if not batch:
+                break
+            _count_facets(conn, (tuple(r) for r in batch), 1)
+            done += len(batch)
+        _bump_generation(conn)
+        conn.commit()
+    return done
+
+
+# estimated Jaccard similarity at which a packet is linked to an earlier one
+NEAR_DUP_THRESHOLD = 0.85
+
+
+def _near_dup_threshold() -> float:
+    return float(current_app.config.get('NEAR_DUP_THRESHOLD', NEAR_DUP_THRESHOLD))
+
+
+def _nearest(conn: sqlite3.Connection, sig: List[int], keys: List[int]) -> Optional[Dict[str, Any]]:
+    """Return the canonical packet most similar to ``sig`` above the threshold."""
+    where = " OR ".join(["(l.band = ? AND l.bucket = ?)"] * len(keys))
+    params = [v for band, key in enumerate(keys) for v in (band, key)]
+    best = None
+    for r in conn.execute(
+        "SELECT DISTINCT m.rsp_id, m.sig, m.canonical_id FROM rsp_lsh l "
+        f"JOIN rsp_minhash m ON m.rsp_id = l.rsp_id WHERE {where}",
+        params,
+    ):
+        sim = minhash.similarity(sig, minhash.unpack(r['sig']))
+        if best is None or sim > best['similarity']:
+            best = {'id': r['canonical_id'] or r['rsp_id'], 'similarity': round(sim, 3)}
+    if best is None or best['similarity'] < _near_dup_threshold():
+        return None
+    return best
+
+
+def _index_minhash(conn: sqlite3.Connection, rsp_id: int,
+                   sig: Optional[List[int]]) -> Optional[Dict[str, Any]]:
+    """Store the signature and bands of a packet; return its near-dup link.
+
+    Text too short to sign gets an empty placeholder signature so
+    :func:`rebuild_minhash` does not pick it up again.
+    """
+    if sig is None:
+        conn.execute(
+            "INSERT OR IGNORE INTO rsp_minhash(rsp_id, sig) VALUES (?, ?)", (rsp_id, b'')
+        )
+        return None
+    keys = minhash.band_keys(sig)
+    near = _nearest(conn, sig, keys)
+    conn.execute(
+        "INSERT OR REPLACE INTO rsp_minhash(rsp_id, sig, canonical_id, similarity) VALUES (?,?,?,?)",
+        (rsp_id, minhash.pack(sig), near and near['id'], near and near['similarity']),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO rsp_lsh(band, bucket, rsp_id) VALUES (?,?,?)",
+        ((band, key, rsp_id) for band, key in enumerate(keys)),
+    )
+    return near
+
+
+def find_near_dup(text: str, sig: Optional[List[int]] = None) -> Optional[Dict[str, Any]]:
+    """Return ``{'id', 'similarity'}`` of the canonical near-duplicate of ``text``.
+
+    Pass ``sig`` when the signature of ``text`` is already known.
+    """
+    if sig is None:
+        sig = minhash.signature(text)
+    if sig is None:
+        return None
+    return _nearest(get_db(), sig, minhash.band_keys(sig))
+
+
+def rebuild_minhash() -> int:
+    """Compute signatures for packets stored without one; return how many."""
+    last_id = done = 0
+    with get_db() as conn:
+        while True:
+            batch = conn.execute(
+                "SELECT rsp.id, rsp.text FROM rsp LEFT JOIN rsp_minhash m ON m.rsp_id = rsp.id "
+                "WHERE m.rsp_id IS NULL AND rsp.id > ? ORDER BY rsp.id LIMIT 1000",
+                (last_id,),
+            ).fetchall()
+            if not batch:
+                break
+            # signatures are computed before the first write opens a transaction
+            sigs = [minhash.signature(text_codec.decode(r['text'])) for r in batch]
+            for r, sig in zip(batch, sigs):
+                _index_minhash(conn, r['id'], sig)
+            if any(sig is not None for sig in sigs):
+                # placeholders change no near-dup link, so cached searches stay valid
+                _bump_generation(conn)
+            conn.commit()
+            last_id = batch[-1]['id']
+            done += len(batch)
+    return done
+
+
+def packet_summary(rsp_id: int) -> Optional[tuple]:
+    """Return ``(summary, keywords, meta)`` stored for a packet, if summarised."""
+    row = get_db().execute(
+        f"SELECT {_SEARCH_COLUMNS}, ks.keywords_json FROM rsp {_DIM_JOINS}"
+        "LEFT JOIN rsp_keyword_xref rx ON rx.rsp_id = rsp.id "
+        "LEFT JOIN keyword_set ks ON ks.id = rx.keyword_set_id WHERE rsp.id = ?",
+        (rsp_id,),
+    ).fetchone()
+    if row is None or row['summary'] is None:
+        return None
+    meta = {axis: row[axis] or '' for axis in META_AXES if axis != 'novelty'}
+    meta['novelty'] = row['novelty'] or 0
+    return row['summary'], json.loads(row['keywords_json'] or '[]'), meta
+
+
+def near_dup_links(ids: List[int]) -> Dict[int, int]:
+    """Map those of ``ids`` linked to a canonical packet to its id."""
+    links: Dict[int, int] = {}
+    for chunk in _chunks(ids):
+        sql = (
+            "SELECT rsp_id, canonical_id FROM rsp_minhash "
+            f"WHERE canonical_id IS NOT NULL AND rsp_id IN ({','.join('?' * len(chunk))})"
+        )
+        links.update((r['rsp_id'], r['canonical_id']) for r in get_db().execute(sql, chunk))
+    return links
+
+
+def shared_clusters(cluster_ids: Iterable[int]) -> List[int]:
+    """Return those of ``cluster_ids`` that other packets are linked to."""
+    found: List[int] = []
+    for chunk in _chunks(list(cluster_ids)):
+        sql = (
+            "SELECT DISTINCT canonical_id FROM rsp_minhash "
+            f"WHERE canonical_id IN ({','.join('?' * len(chunk))})"
+        )
+        found.extend(r[0] for r in get_db().execute(sql, chunk))
+    return found
+
+
+def collapse_near_dups(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep the first row of each near-duplicate cluster, in order.
+
+    Kept rows get ``near_dups``: how many later rows of the list they hide.
+    """
+    links = near_dup_links([r['id'] for r in rows])
+    kept: Dict[int, Dict[str, Any]] = {}
+    out = []
+    for row in rows:
+        cluster = links.get(row['id'], row['id'])
+        if cluster in kept:
+            kept[cluster]['near_dups'] += 1
+            continue
+        row = {**row, 'near_dups': 0}
+        kept[cluster] = row
+        out.append(row)
+    return out
+
+
+def insert_rsps(rows: Iterable[Dict[str, Any]], fts: bool = True,
+                derived: bool = True) -> List[Dict[str, Any]]:
+    """Insert many packets in a single transaction.
+
+    Dimension and keyword-set ids are resolved in bulk and the FTS, keyword
+    xref and meta index writes are batched. Returns one ``{'id', 'dup'}``
+    entry per input row; for duplicates ``id`` is the already stored packet.
+    With ``fts=False`` (bulk-load mode) neither ``rsp_fts`` nor
+    ``keyword_set_fts`` is written; call :func:`rebuild_fts` once at the end.
+    Likewise ``derived=False`` skips the vocabulary, MinHash and facet
+    writes, to be redone by :func:`rebuild_vocab`, :func:`rebuild_minhash`
+    and :func:`rebuild_facets`.
 
-    placeholders = ','.join('?' for _ in base_fields)
+    MinHash signatures are computed before the write transaction starts; a
+    row may carry its own under ``minhash`` (``None`` for texts too short).
+    """
+    rows = list(rows)
+    if derived:
+        sigs = [r['minhash'] if 'minhash' in r else minhash.signature(r.get('text') or '')
+                for r in rows]
+    else:
+        sigs = [None] * len(rows)
+    prepared = [_prepare_row(r) for r in rows]
+    if not prepared:
+        return []
     sql = f"""
-    INSERT OR IGNORE INTO rsp ({', '.join(base_fields)})
-    VALUES ({', '.join(['?'] * len(base_fields))})
+    INSERT OR IGNORE INTO rsp ({', '.join(RSP_FIELDS)})
+    VALUES ({', '.join(['?'] * len(RSP_FIELDS))})
     """
+    results: List[Dict[str, Any]] = []
     with get_db() as conn:
-        cur = conn.cursor()
-        row['domain_id'] = _dim_id(cur, 'domain', row.pop('domain', None))
-        row['topic_id'] = _dim_id(cur, 'topic', row.pop('topic', None))
-        row['convtype_id'] = _dim_id(cur, 'conversation_type', row.pop('conversation_type', None))
-        row['emotion_id'] = _dim_id(cur, 'emotion', row.pop('emotion', None))
-
-        # keyword set handling
-        cur = conn.execute("SELECT id FROM keyword_set WHERE kw_hash=?", (kw_hash,))
-        row_kw = cur.fetchone()
-        if row_kw:
-            kw_id = row_kw['id']
-        else:
-            try:
-                cur = conn.execute(
-                    "INSERT INTO keyword_set(kw_hash, keywords_json) VALUES (?,?)",
-                    (kw_hash, kw_json)
-                )
-                kw_id = cur.lastrowid
-                conn.execute(
-                    "INSERT INTO keyword_set_fts(rowid, keywords_json) VALUES (?,?)",
-                    (kw_id, kw_json)
-                )
-            except sqlite3.IntegrityError:
-                kw_id = conn.execute(
-                    "SELECT id FROM keyword_set WHERE kw_hash=?", (kw_hash,)
-                ).fetchone()[0]
-
-        cur = conn.execute(sql, [row[k] for k in base_fields])
-        rowid = cur.lastrowid
-        if rowid is None:
-            raise RuntimeError("Failed to insert RSP row: lastrowid is None")
+        dim_ids = _dim_ids(
+            conn, ((d, r[d]) for r in prepared for d, _ in DIM_COLUMNS)
+        )
+        kw_ids = _keyword_set_ids(conn, {r['_kw_hash']: r['_kw_json'] for r in prepared}, fts)
+        codec = _text_codec(conn)
+
+        fts_rows, xref_rows, meta_rows, facet_rows, vocab_texts = [], [], [], [], []
+        for row, sig in zip(prepared, sigs):
+            for dim, col in DIM_COLUMNS:
+                val = row.pop(dim, None)
+                row[col] = dim_ids.get((dim, str(val))) if val else None
+            values = [row[k] for k in RSP_FIELDS]
+            if codec and row['text']:
+                values[RSP_FIELDS.index('text')] = text_codec.encode(row['text'], *codec)
+            cur = conn.execute(sql, values)
+            if cur.rowcount == 0:
+                # ``INSERT OR IGNORE`` skipped an existing hash; lastrowid is stale
+                existing = conn.execute(
+                    "SELECT id FROM rsp WHERE hash=?", (row['hash'],)
+                ).fetchone()
+                results.append({'id': existing['id'] if existing else None, 'dup': True})
+                continue
+            rowid = cur.lastrowid
+            if rowid is None:
+                raise RuntimeError("Failed to insert RSP row: lastrowid is None")
+            near = _index_minhash(conn, rowid, sig) if derived else None
+            results.append({'id': rowid, 'dup': False, 'near_dup_of': near and near['id']})
+            fts_rows.append((rowid, row['text'], row['summary']))
+            if derived:
+                facet_rows.append([row[col] for _, col in DIM_COLUMNS])
+                vocab_texts.append(row['text'])
+            xref_rows.append((rowid, kw_ids[row['_kw_hash']]))
+            meta_rows.append((row['hash'], row['_meta_pairs'], row['_children']))
+
+        if fts:
+            conn.executemany(
+                "INSERT INTO rsp_fts(rowid, text, summary) VALUES (?,?,?)", fts_rows
+            )
+        conn.executemany(
+            "INSERT OR IGNORE INTO rsp_keyword_xref(rsp_id, keyword_set_id) VALUES (?, ?)",
+            xref_rows
+        )
+        _index_meta(conn, meta_rows)
+        _count_facets(conn, facet_rows, 1)
+        _add_vocab(conn, vocab_texts)
+        _bump_generation(conn)
+        conn.commit()
+    get_id_cache().remember(dim_ids, kw_ids)
+    return results
+
+
+def rebuild_fts(optimize: bool = True) -> None:
+    """Bring the FTS indexes up to date after a bulk load.
+
+    ``rsp_fts`` is rebuilt from ``rsp`` in one pass and keyword sets missing
+    from ``keyword_set_fts`` are added. With ``optimize`` both indexes are
+    then merged into a single b-tree.
+    """
+    with get_db() as conn:
+        conn.execute("INSERT INTO rsp_fts(rsp_fts) VALUES ('rebuild')")
+        conn.execute(
+            "INSERT INTO keyword_set_fts(rowid, keywords_json) "
+            "SELECT id, keywords_json FROM keyword_set "
+            "WHERE id NOT IN (SELECT rowid FROM keyword_set_fts)"
+        )
+        if optimize:
+            for table in FTS_TABLES:
+                conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+        _bump_generation(conn)
+        conn.commit()
+
+
+def optimize_fts() -> None:
+    """Merge every FTS index into a single b-tree (slow, best when idle)."""
+    with get_db() as conn:
+        for table in FTS_TABLES:
+            conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+        conn.commit()
+
+
+def merge_fts(pages: int = 500, max_rounds: int = 100) -> int:
+    """Incrementally merge FTS segments, ``pages`` leaf pages per step.
+
+    Each step is its own short transaction, so this can run while the hub
+    is serving. Stops when a step does no more work; returns the steps run.
+    """
+    rounds = 0
+    with get_db() as conn:
+        for table in FTS_TABLES:
+            for _ in range(max_rounds):
+                before = conn.total_changes
+                conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('merge', ?)", (-pages,))
+                conn.commit()
+                rounds += 1
+                # FTS5 reports fewer than two changed rows once nothing is left
+                if conn.total_changes - before < 2:
+                    break
+    return rounds
+
+
+def configure_fts(automerge: int = FTS_AUTOMERGE, crisismerge: int = FTS_CRISISMERGE) -> None:
+    """Persist new ``automerge``/``crisismerge`` settings on the FTS tables."""
+    with get_db() as conn:
+        _configure_fts(conn, automerge, crisismerge)
+        conn.commit()
+
+
+def fts_stats() -> Dict[str, Dict[str, int]]:
+    """Return stored page counts and merge settings for each FTS index."""
+    out = {}
+    with get_db() as conn:
+        for table in FTS_TABLES:
+            config = {
+                r[0]: r[1] for r in conn.execute(f"SELECT k, v FROM {table}_config")
+            }
+            out[table] = {
+                'pages': conn.execute(f"SELECT COUNT(*) FROM {table}_data").fetchone()[0],
+                'automerge': int(config.get('automerge', 4)),
+                'crisismerge': int(config.get('crisismerge', 16)),
+            }
+    return out
+
+
+def pending_rsps(limit: int, after_id: int = 0) -> List[Dict[str, Any]]:
+    """Return up to ``limit`` packets past ``after_id`` still awaiting a summary."""
+    return _inflate([dict(r) for r in execute(
+        "SELECT id, role, text FROM rsp WHERE summary IS NULL AND id > ? ORDER BY id LIMIT ?",
+        after_id, limit,
+    )])
+
+
+def insert_rsp(row: Dict[str, Any]) -> int:
+    """Insert a response packet and create all related index entries.
+
+    Raises :class:`sqlite3.IntegrityError` if the packet is already stored.
+    """
+    res = insert_rsps([row])[0]
+    if res['dup']:
+        raise sqlite3.IntegrityError(f"duplicate packet {res['id']}")
+    return res['id']
+
+
+def update_rsp_summary(
+    rsp_id: int,
+    summary: str,
+    keywords: List[str],
+    meta: Dict[str, Any],
+) -> None:
+    """Fill in summary, keywords and dimension ids for a stored packet.
+
+    Used by the async ingest workers once the model has answered for a row
+    that was inserted with its summary still pending. The packet hash is
+    left unchanged so existing ``rsp_index`` rows stay valid.
+    """
+    kw_json = canonical_json(canonical_keyword_list(keywords))
+    kw_hash = hashlib.sha256(kw_json.encode()).hexdigest()
+    novelty = meta.get('novelty')
+    if novelty is not None:
+        novelty = round(float(novelty), 2)
+    meta_pairs = [{'dimension': axis, 'value': meta[axis]} for axis in META_AXES if meta.get(axis)]
+
+    with get_db() as conn:
+        old = conn.execute(
+            "SELECT hash, text, summary, meta, children, domain_id, topic_id, convtype_id,"
+            " emotion_id FROM rsp WHERE id=?", (rsp_id,)
+        ).fetchone()
+        if old is None:
+            raise KeyError(rsp_id)
+        old_text = text_codec.decode(old['text'])
+        meta_pairs.extend(p for p in json.loads(old['meta'] or '[]') if p.get('dimension') not in META_AXES)
+        dim_ids = _dim_ids(conn, ((d, meta.get(d)) for d, _ in DIM_COLUMNS))
+        dim_vals = [dim_ids.get((d, str(meta.get(d)))) if meta.get(d) else None for d, _ in DIM_COLUMNS]
+        conn.execute(
+            "UPDATE rsp SET summary=?, meta=?, novelty=?, domain_id=?, topic_id=?,"
+            " convtype_id=?, emotion_id=? WHERE id=?",
+            (summary, json.dumps(meta_pairs), novelty, *dim_vals, rsp_id),
+        )
+        old_dims = [old[col] for _, col in DIM_COLUMNS]
+        if old_dims != dim_vals:
+            _count_facets(conn, [old_dims], -1)
+            _count_facets(conn, [dim_vals], 1)
+        # external content FTS rows must be deleted with their old values
+        conn.execute(
+            "INSERT INTO rsp_fts(rsp_fts, rowid, text, summary) VALUES ('delete',?,?,?)",
+            (rsp_id, old_text, old['summary'])
+        )
         conn.execute(
             "INSERT INTO rsp_fts(rowid, text, summary) VALUES (?,?,?)",
-            (rowid, row['text'], row['summary'])
+            (rsp_id, old_text, summary)
         )
+        kw_ids = _keyword_set_ids(conn, {kw_hash: kw_json})
+        kw_id = kw_ids[kw_hash]
+        conn.execute("DELETE FROM rsp_keyword_xref WHERE rsp_id=?", (rsp_id,))
         conn.execute(
             "INSERT OR IGNORE INTO rsp_keyword_xref(rsp_id, keyword_set_id) VALUES (?, ?)",
-            (rowid, kw_id)
+            (rsp_id, kw_id)
         )
-        # index meta
-        meta_rows = [
-            (idx['hash'], idx['dimension'], idx['value'], idx['dimension_hash'], idx['context_path'])
-            for idx in flatten_meta(row['hash'], meta_pairs, json.loads(row.get('children', '[]') or '[]'))
-            if idx['dimension'] != 'word'
-        ]
-        try:
+        _index_meta(conn, [(old['hash'], meta_pairs, json.loads(old['children'] or '[]'))])
+        # the vector covered the old summary; the backlog re-embeds the row
+        conn.execute("DELETE FROM rsp_embedding WHERE rsp_id=?", (rsp_id,))
+        _bump_generation(conn)
+        conn.commit()
+    get_id_cache().remember(dim_ids, kw_ids)
+
+
+def delete_rsp(rsp_id: int) -> bool:
+    """Delete a packet with its index, vocabulary, near-dup and facet entries.
+
+    Packets that were linked to it as near-duplicates become canonical
+    themselves. Returns ``False`` if no such packet is stored.
+    """
+    with get_db() as conn:
+        old = conn.execute(
+            "SELECT hash, text, summary, domain_id, topic_id, convtype_id, emotion_id"
+            " FROM rsp WHERE id=?", (rsp_id,)
+        ).fetchone()
+        if old is None:
+            return False
+        text = text_codec.decode(old['text'])
+        conn.execute(
+            "INSERT INTO rsp_fts(rsp_fts, rowid, text, summary) VALUES ('delete',?,?,?)",
+            (rsp_id, text, old['summary'])
+        )
+        sig = conn.execute("SELECT sig FROM rsp_minhash WHERE rsp_id=?", (rsp_id,)).fetchone()
+        if sig is not None and sig['sig']:
             conn.executemany(
-                "INSERT OR IGNORE INTO rsp_index(hash,dimension,value,dimension_hash,context_path) VALUES (?,?,?,?,?)",
-                meta_rows
+                "DELETE FROM rsp_lsh WHERE band=? AND bucket=? AND rsp_id=?",
+                ((band, key, rsp_id)
+                 for band, key in enumerate(minhash.band_keys(minhash.unpack(sig['sig'])))),
             )
-        except sqlite3.IntegrityError:
-            pass
+        conn.execute("DELETE FROM rsp_minhash WHERE rsp_id=?", (rsp_id,))
+        conn.execute(
+            "UPDATE rsp_minhash SET canonical_id=NULL, similarity=NULL WHERE canonical_id=?",
+            (rsp_id,)
+        )
+        conn.execute("DELETE FROM rsp_keyword_xref WHERE rsp_id=?", (rsp_id,))
+        conn.execute("DELETE FROM rsp_embedding WHERE rsp_id=?", (rsp_id,))
+        conn.execute("DELETE FROM rsp_index WHERE hash=?", (old['hash'],))
+        _count_facets(conn, [[old[col] for _, col in DIM_COLUMNS]], -1)
+        _add_vocab(conn, [text], -1)
+        conn.execute("DELETE FROM rsp WHERE id=?", (rsp_id,))
+        _bump_generation(conn)
         conn.commit()
-    return rowid
+    return True
+
+
+def find_rsp(conv_id: str, turn: int, text: str) -> Optional[int]:
+    """Return the id of a stored packet with the same turn and text, if any.
+
+    Used as a cheap pre-check before summarisation so duplicate turns do not
+    cost an LLM call only to be discarded by ``INSERT OR IGNORE``.
+    """
+    rows = execute(
+        "SELECT id FROM rsp WHERE conv_id=? AND turn=? AND rhif_text(text)=? LIMIT 1",
+        conv_id, turn, text,
+    )
+    return rows[0]['id'] if rows else None
+
+
+def encode_cursor(rank: float, rsp_id: int, seen: Iterable[int] = ()) -> str:
+    """Return an opaque pagination token for the ``(rank, id)`` of a hit.
+
+    ``seen`` lists near-duplicate clusters already shown on earlier pages.
+    """
+    state: List[Any] = [rank, rsp_id]
+    seen = list(seen)
+    if seen:
+        state.append(seen)
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _cursor_state(token: str) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        state = json.loads(raw)
+        rank, rsp_id, *rest = state
+        seen = [int(c) for c in rest[0]] if rest else []
+        return [float(rank), int(rsp_id), seen]
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+
+def decode_cursor(token: str) -> tuple:
+    """Return ``(rank, id)`` from :func:`encode_cursor`; ``ValueError`` if invalid."""
+    rank, rsp_id, _ = _cursor_state(token)
+    return rank, rsp_id
+
+
+def cursor_seen(token: Optional[str]) -> List[int]:
+    """Return the near-duplicate clusters recorded in a cursor."""
+    return _cursor_state(token)[2] if token else []
+
+
+_SEARCH_COLUMNS = (
+    "rsp.id, rsp.conv_id, rsp.turn, rsp.role, rsp.date, rsp.text, "
+    "rsp.summary, rsp.keywords, rsp.tags, rsp.tokens, "
+    "d1.value AS domain, d2.value AS topic, "
+    "d3.value AS conversation_type, d4.value AS emotion, rsp.novelty"
+)
+
+_DIM_JOINS = (
+    "LEFT JOIN dim_value d1 ON d1.id = rsp.domain_id "
+    "LEFT JOIN dim_value d2 ON d2.id = rsp.topic_id "
+    "LEFT JOIN dim_value d3 ON d3.id = rsp.convtype_id "
+    "LEFT JOIN dim_value d4 ON d4.id = rsp.emotion_id "
+)
+
+# rows counted when estimating how selective the FTS term and filters are
+PLAN_PROBE_CAP = 2000
+
+
+def _lookup_dim_id(conn: sqlite3.Connection, dim: str, value: str) -> Optional[int]:
+    """Return the id of an existing ``dim_value`` without inserting."""
+    pair = (dim, str(value))
+    found = get_id_cache().dims([pair])
+    if found:
+        return found[pair]
+    row = conn.execute(
+        "SELECT id FROM dim_value WHERE dimension=? AND value=?", pair
+    ).fetchone()
+    return row['id'] if row else None
+
+
+def _index_conds(
+    conn: sqlite3.Connection,
+    dims: Dict[str, Optional[str]],
+    conv_id: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+) -> Optional[tuple]:
+    """Return ``(conditions, params)`` for filters served by ``rsp`` indexes.
+
+    ``None`` means a dimension value is unknown so nothing can match.
+    """
+    conds: List[str] = []
+    params: List[Any] = []
+    columns = {'domain': 'domain_id', 'topic': 'topic_id', 'emotion': 'emotion_id'}
+    for dim, value in dims.items():
+        if not value:
+            continue
+        dim_id = _lookup_dim_id(conn, dim, value)
+        if dim_id is None:
+            return None
+        conds.append(f"rsp.{columns[dim]} = ?")
+        params.append(dim_id)
+    if conv_id:
+        conds.append("rsp.conv_id = ?")
+        params.append(conv_id)
+    if start:
+        conds.append("rsp.date >= ?")
+        params.append(start)
+    if end:
+        conds.append("rsp.date <= ?")
+        params.append(end)
+    return conds, params
+
+
+def _post_conds(tags: Optional[List[str]], keywords: Optional[str]) -> tuple:
+    """Return ``(join, conditions, params)`` for the tag and keyword filters."""
+    conds: List[str] = []
+    params: List[Any] = []
+    if keywords:
+        conds.append("keyword_set_fts MATCH ?")
+        params.append(keywords)
+    for tag in tags or []:
+        conds.append("EXISTS (SELECT 1 FROM json_each(rsp.tags) WHERE value = ?)")
+        params.append(tag)
+    kw_join = (
+        "JOIN rsp_keyword_xref rx ON rx.rsp_id = rsp.id "
+        "JOIN keyword_set_fts ON keyword_set_fts.rowid = rx.keyword_set_id "
+    ) if keywords else ""
+    return kw_join, conds, params
+
+
+def _plan_search(
+    conn: sqlite3.Connection,
+    query: str,
+    tags: Optional[List[str]],
+    limit: int,
+    dims: Dict[str, str],
+    keywords: Optional[str],
+    conv_id: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    cursor: Optional[str],
+) -> Optional[tuple]:
+    """Choose an access path for a search and return ``(plan, sql, params)``.
+
+    Dimension filters are resolved to ids first so they hit the ``*_id``
+    indexes; ``None`` is returned when a filter value does not exist. With
+    indexable filters the number of matching ``rsp`` rows is compared with
+    the number of FTS matches (both capped at :data:`PLAN_PROBE_CAP`) and
+    the smaller side drives the query: ``fts`` ranks the MATCH set and
+    joins ``rsp``, ``filter`` walks the ``rsp`` indexes and probes
+    ``rsp_fts`` by rowid.
+    """
+    resolved = _index_conds(conn, dims, conv_id, start, end)
+    if resolved is None:
+        return None
+    index_conds, index_params = resolved
+
+    plan = 'fts'
+    if index_conds:
+        where = " AND ".join(index_conds)
+        n_filter = conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM rsp WHERE {where} LIMIT ?)",
+            (*index_params, PLAN_PROBE_CAP),
+        ).fetchone()[0]
+        n_fts = conn.execute(
+            "SELECT COUNT(*) FROM (SELECT 1 FROM rsp_fts WHERE rsp_fts MATCH ? LIMIT ?)",
+            (query, PLAN_PROBE_CAP),
+        ).fetchone()[0]
+        if n_filter < n_fts:
+            plan = 'filter'
+
+    kw_join, post_conds, post_params = _post_conds(tags, keywords)
+
+    after = decode_cursor(cursor) if cursor else None
+    if plan == 'fts':
+        inner = "SELECT rowid, bm25(rsp_fts) AS rank FROM rsp_fts WHERE rsp_fts MATCH ?"
+        params: List[Any] = [query]
+        if after:
+            inner += " AND (bm25(rsp_fts) > ? OR (bm25(rsp_fts) = ? AND rowid < ?))"
+            params.extend([after[0], after[0], after[1]])
+        if not index_conds and not post_conds:
+            # nothing to filter afterwards: only rank and join one page
+            inner += " ORDER BY rank, rowid DESC LIMIT ?"
+            params.append(limit)
+        sql = (
+            f"SELECT {_SEARCH_COLUMNS}, f.rank FROM ({inner}) f "
+            f"JOIN rsp ON rsp.id = f.rowid {kw_join}{_DIM_JOINS}WHERE 1=1 "
+        )
+        order = "f.rank"
+    else:
+        params = []
+        sql = (
+            f"SELECT {_SEARCH_COLUMNS}, bm25(rsp_fts) AS rank FROM rsp "
+            f"CROSS JOIN rsp_fts ON rsp_fts.rowid = rsp.id {kw_join}{_DIM_JOINS}"
+            "WHERE rsp_fts MATCH ? "
+        )
+        params.append(query)
+        if after:
+            sql += "AND (bm25(rsp_fts) > ? OR (bm25(rsp_fts) = ? AND rsp.id < ?)) "
+            params.extend([after[0], after[0], after[1]])
+        order = "bm25(rsp_fts)"  # rsp_fts has its own hidden ``rank`` column
+
+    for cond in index_conds + post_conds:
+        sql += f"AND {cond} "
+    params.extend(index_params + post_params)
+    sql += f"ORDER BY {order}, rsp.id DESC LIMIT ?"
+    params.append(limit)
+    return plan, sql, params
 
 
 def search_rsps(
@@ -248,68 +1529,437 @@ def search_rsps(
     start: Optional[str] = None,
     end: Optional[str] = None,
     slow: bool = False,
+    cursor: Optional[str] = None,
+    explain: bool = False,
+    info: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
-    """Search stored packets using FTS5 MATCH with optional filters."""
+    """Search stored packets using FTS5 MATCH with optional filters.
+
+    Results are ordered by ``(rank, id DESC)`` and each row carries its
+    ``rank``. Pass ``cursor`` (see :func:`encode_cursor`) built from the
+    last row of a page to fetch the next one. The access path is chosen by
+    :func:`_plan_search`; a dict passed as ``info`` receives the chosen
+    ``plan`` and, with ``explain``, the ``EXPLAIN QUERY PLAN`` rows.
+
+    With ``slow`` a first page that is not full is topped up by
+    :func:`_fuzzy_search` within ``SLOW_SEARCH_BUDGET_MS``.
+    """
+    if info is None:
+        info = {}
     if not query.strip():
         return []
 
-    sql = (
-        "SELECT rsp.id, rsp.conv_id, rsp.turn, rsp.role, rsp.date, rsp.text, "
-        "rsp.summary, rsp.keywords, rsp.tags, rsp.tokens, "
-        "d1.value AS domain, d2.value AS topic, "
-        "d3.value AS conversation_type, d4.value AS emotion, rsp.novelty "
-        "FROM (SELECT rowid, bm25(rsp_fts) AS rank FROM rsp_fts WHERE rsp_fts MATCH ? ORDER BY rank) f "
-        "JOIN rsp ON rsp.id = f.rowid "
+    conn = get_db()
+    planned = _plan_search(
+        conn, query, tags, limit,
+        {'domain': domain, 'topic': topic, 'emotion': emotion},
+        keywords, conv_id, start, end, cursor,
     )
+    if planned is None:
+        info['plan'] = 'empty'
+        return []
+    plan, sql, params = planned
+    info['plan'] = plan
+    if explain:
+        info['query_plan'] = [
+            r['detail'] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)
+        ]
+    rows = _inflate([dict(r) for r in execute(sql, *params)])
+    if slow and not cursor and len(rows) < limit:
+        budget = float(current_app.config.get('SLOW_SEARCH_BUDGET_MS', 500)) / 1000
+        rows.extend(_fuzzy_search(
+            conn, query, tags, limit - len(rows),
+            {'domain': domain, 'topic': topic, 'emotion': emotion},
+            keywords, conv_id, start, end,
+            exclude={r['id'] for r in rows},
+            deadline=time.monotonic() + budget,
+            info=info,
+        ))
+    return rows
 
-    params: List[Any] = [query]
-    if keywords:
-        sql += (
-            "JOIN rsp_keyword_xref rx ON rx.rsp_id = rsp.id "
-            "JOIN keyword_set_fts ON keyword_set_fts.rowid = rx.keyword_set_id "
+
+# fields a search row can be projected to with ``fields=``
+SEARCH_FIELDS = (
+    'id', 'conv_id', 'turn', 'role', 'date', 'text', 'summary', 'keywords', 'tags',
+    'tokens', 'domain', 'topic', 'conversation_type', 'emotion', 'novelty',
+    'rank', 'score', 'near_dups', 'snippet', 'highlight',
+)
+# FTS5 caps snippet length at 64 tokens; a trigram token is about a character
+SNIPPET_TOKENS = 64
+SNIPPET_ELLIPSIS = '…'
+
+
+def add_snippets(query: str, rows: List[Dict[str, Any]],
+                 open_mark: str = '**', close_mark: str = '**') -> None:
+    """Set ``snippet`` and ``highlight`` on search ``rows`` in place.
+
+    ``snippet`` is an FTS5 excerpt of ``text`` around the matches and
+    ``highlight`` the ``summary`` with every match marked. Only the given
+    rows are looked up, by rowid. Rows the query does not match (fuzzy
+    and semantic hits, or a query that is not valid FTS syntax) get the
+    start of their text and the plain summary.
+    """
+    found: Dict[int, sqlite3.Row] = {}
+    ids = [r['id'] for r in rows]
+    conn = get_db()
+    for chunk in _chunks(ids) if query.strip() else []:
+        sql = (
+            "SELECT rowid, snippet(rsp_fts, 0, ?, ?, ?, ?) AS snippet, "
+            "highlight(rsp_fts, 1, ?, ?) AS highlight FROM rsp_fts "
+            f"WHERE rsp_fts MATCH ? AND rowid IN ({','.join('?' * len(chunk))})"
         )
+        params = [open_mark, close_mark, SNIPPET_ELLIPSIS, SNIPPET_TOKENS,
+                  open_mark, close_mark, query, *chunk]
+        try:
+            found.update((r['rowid'], r) for r in conn.execute(sql, params))
+        except sqlite3.OperationalError:
+            break  # not an FTS expression, e.g. a semantic query
+    for row in rows:
+        hit = found.get(row['id'])
+        text = row.get('text') or ''
+        if hit is not None and hit['snippet']:
+            row['snippet'] = hit['snippet']
+        elif len(text) > SNIPPET_TOKENS:
+            row['snippet'] = text[:SNIPPET_TOKENS] + SNIPPET_ELLIPSIS
+        else:
+            row['snippet'] = text
+        row['highlight'] = hit['highlight'] if hit is not None and hit['highlight'] else row.get('summary')
+
+
+# matching packets read per dimension when counts cannot come from the
+# materialised tables; larger result sets are reported as ``truncated``
+FACET_SCAN_CAP = 100000
+
+
+def _facets_materialised(
+    conn: sqlite3.Connection, filter_ids: Dict[str, int]
+) -> List[sqlite3.Row]:
+    """Return ``(dimension, value, n)`` rows from the facet count tables."""
+    rows = conn.execute(
+        "SELECT d.dimension, d.value, f.n FROM facet_count f "
+        "JOIN dim_value d ON d.id = f.value_id WHERE f.n > 0"
+    ).fetchall()
+    if not filter_ids:
+        return rows
+    (dim, dim_id), = filter_ids.items()
+    rows = [r for r in rows if r['dimension'] == dim]
+    rows.extend(conn.execute(
+        "SELECT d.dimension, d.value, p.n FROM facet_pair p "
+        "JOIN dim_value d ON d.id = p.value_id WHERE p.filter_id = ? AND p.n > 0",
+        (dim_id,),
+    ))
+    return rows
+
+
+def facet_counts(
+    query: str = '',
+    tags: Optional[List[str]] = None,
+    domain: Optional[str] = None,
+    topic: Optional[str] = None,
+    keywords: Optional[str] = None,
+    conv_id: Optional[str] = None,
+    emotion: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 20,
+    info: Optional[Dict[str, Any]] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Count packets per ``dim_value`` for a query and filter set.
+
+    Returns ``{dimension: [{'value', 'count'}, ...]}`` with at most
+    ``limit`` values per dimension, most frequent first. Each dimension is
+    counted with every filter except its own, so the counts show what
+    picking another value would return. Without a query and with at most
+    one dimension filter the counts are read from ``facet_count`` and
+    ``facet_pair`` (plan ``materialised``); otherwise the matching packets
+    are grouped through the FTS and ``rsp`` indexes (plan ``matched``),
+    reading at most :data:`FACET_SCAN_CAP` of them per dimension.
+    """
+    if info is None:
+        info = {}
+    conn = get_db()
+    out: Dict[str, List[Dict[str, Any]]] = {dim: [] for dim, _ in DIM_COLUMNS}
+    dims = {'domain': domain, 'topic': topic, 'emotion': emotion}
+    filter_ids: Dict[str, int] = {}
+    for dim, value in dims.items():
+        if value:
+            dim_id = _lookup_dim_id(conn, dim, value)
+            if dim_id is None:
+                info['plan'] = 'empty'
+                return out
+            filter_ids[dim] = dim_id
+
+    query = (query or '').strip()
+    if not query and not (tags or keywords or conv_id or start or end) and len(filter_ids) <= 1:
+        info['plan'] = 'materialised'
+        found = [(r['dimension'], r['value'], r['n']) for r in _facets_materialised(conn, filter_ids)]
+    else:
+        info['plan'] = 'matched'
+        found = []
+        kw_join, post_conds, post_params = _post_conds(tags, keywords)
+        for dim, col in DIM_COLUMNS:
+            conds, params = _index_conds(
+                conn, {k: v for k, v in dims.items() if k != dim}, conv_id, start, end
+            )
+            if query:
+                base = f"FROM rsp_fts JOIN rsp ON rsp.id = rsp_fts.rowid {kw_join}WHERE rsp_fts MATCH ? "
+                params = [query, *params]
+            else:
+                base = f"FROM rsp {kw_join}WHERE 1=1 "
+            for cond in conds + post_conds:
+                base += f"AND {cond} "
+            sql = (
+                f"SELECT d.value, COUNT(*) AS n FROM (SELECT rsp.{col} AS v {base}LIMIT ?) m "
+                "LEFT JOIN dim_value d ON d.id = m.v GROUP BY m.v"
+            )
+            seen = 0
+            for r in conn.execute(sql, [*params, *post_params, FACET_SCAN_CAP]):
+                seen += r['n']
+                if r['value'] is not None:
+                    found.append((dim, r['value'], r['n']))
+            if seen >= FACET_SCAN_CAP:
+                info['truncated'] = True
+    for dim, value, n in sorted(found, key=lambda f: (-f[2], f[1])):
+        if len(out[dim]) < limit:
+            out[dim].append({'value': value, 'count': n})
+    return out
+
+
+def embedding_backlog(model: str, limit: int, after_id: int = 0) -> List[Dict[str, Any]]:
+    """Return up to ``limit`` packets past ``after_id`` with no vector from ``model`` yet."""
+    return _inflate([dict(r) for r in execute(
+        "SELECT rsp.id, rsp.text, rsp.summary FROM rsp "
+        "LEFT JOIN rsp_embedding e ON e.rsp_id = rsp.id "
+        "WHERE rsp.id > ? AND (e.rsp_id IS NULL OR e.model <> ?) ORDER BY rsp.id LIMIT ?",
+        after_id, model, limit,
+    )])
+
+
+def store_embeddings(model: str, items: Iterable[tuple]) -> None:
+    """Store ``(rsp_id, blob)`` vectors computed with ``model``."""
+    with get_db() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO rsp_embedding(rsp_id, model, vec) VALUES (?,?,?)",
+            ((rsp_id, model, blob) for rsp_id, blob in items),
+        )
+        _bump_generation(conn)
+        conn.commit()
+
+
+_VECTOR_INDEXES: Dict[tuple, VectorIndex] = {}
+_VECTOR_INDEXES_LOCK = threading.Lock()
+
 
-    sql += (
-        "LEFT JOIN dim_value d1 ON d1.id = rsp.domain_id "
-        "LEFT JOIN dim_value d2 ON d2.id = rsp.topic_id "
-        "LEFT JOIN dim_value d3 ON d3.id = rsp.convtype_id "
-        "LEFT JOIN dim_value d4 ON d4.id = rsp.emotion_id "
-        "WHERE 1=1 "
+def get_vector_index(model: str) -> VectorIndex:
+    """Return the in-memory vectors of ``model``, loading rows added since last use."""
+    key = (str(current_app.config.get('DB_PATH', './rhif.sqlite')), model)
+    with _VECTOR_INDEXES_LOCK:
+        index = _VECTOR_INDEXES.setdefault(key, VectorIndex())
+    cur = get_db().execute(
+        "SELECT seq, rsp_id, vec FROM rsp_embedding WHERE model=? AND seq > ? ORDER BY seq",
+        (model, index.last_seq),
     )
+    while True:
+        batch = cur.fetchmany(10000)
+        if not batch:
+            break
+        index.add(tuple(r) for r in batch)
+    return index
 
-    if keywords:
-        sql += "AND keyword_set_fts MATCH ? "
-        params.append(keywords)
-    if tags:
-        placeholders = " AND ".join(
-            ["EXISTS (SELECT 1 FROM json_each(rsp.tags) WHERE value = ?)"] * len(tags)
-        )
-        sql += f"AND {placeholders} "
-        params.extend(tags)
-    if domain:
-        sql += "AND d1.value = ? "
-        params.append(domain)
-    if topic:
-        sql += "AND d2.value = ? "
-        params.append(topic)
-    if conv_id:
-        sql += "AND rsp.conv_id = ? "
-        params.append(conv_id)
-    if emotion:
-        sql += "AND d4.value = ? "
-        params.append(emotion)
-    if start:
-        sql += "AND rsp.date >= ? "
-        params.append(start)
-    if end:
-        sql += "AND rsp.date <= ? "
-        params.append(end)
 
-    sql += "ORDER BY f.rank, rsp.id DESC LIMIT ?"
-    params.append(limit)
+# semantic candidates fetched per requested row, to survive filtering
+SEMANTIC_OVERSAMPLE = 5
+
+
+def _filtered_rows(
+    conn: sqlite3.Connection,
+    ids: List[int],
+    tags: Optional[List[str]],
+    dims: Dict[str, Optional[str]],
+    keywords: Optional[str],
+    conv_id: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+) -> Dict[int, Dict[str, Any]]:
+    """Return ``{id: row}`` for the ``ids`` that pass the search filters."""
+    resolved = _index_conds(conn, dims, conv_id, start, end)
+    if resolved is None or not ids:
+        return {}
+    conds, params = resolved
+    kw_join, post_conds, post_params = _post_conds(tags, keywords)
+    rows: Dict[int, Dict[str, Any]] = {}
+    for chunk in _chunks(ids):
+        sql = (
+            f"SELECT DISTINCT {_SEARCH_COLUMNS} FROM rsp {kw_join}{_DIM_JOINS}"
+            f"WHERE rsp.id IN ({','.join('?' * len(chunk))}) "
+        )
+        for cond in conds + post_conds:
+            sql += f"AND {cond} "
+        for r in conn.execute(sql, [*chunk, *params, *post_params]):
+            rows[r['id']] = dict(r)
+    _inflate(list(rows.values()))
+    return rows
+
+
+def semantic_search(
+    query_vec: List[float],
+    model: str,
+    tags: Optional[List[str]] = None,
+    limit: int = 10,
+    domain: Optional[str] = None,
+    topic: Optional[str] = None,
+    keywords: Optional[str] = None,
+    conv_id: Optional[str] = None,
+    emotion: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    info: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Return packets nearest to ``query_vec`` by cosine similarity.
+
+    Candidates come from the in-memory :class:`VectorIndex` and are then
+    checked against the same filters as :func:`search_rsps`. Rows carry a
+    ``score`` and ``rank`` ``None`` (no cursor pagination).
+    """
+    if info is not None:
+        info['plan'] = 'semantic'
+    hits = get_vector_index(model).search(query_vec, max(limit * SEMANTIC_OVERSAMPLE, 50))
+    rows = _filtered_rows(
+        get_db(), [i for i, _ in hits], tags,
+        {'domain': domain, 'topic': topic, 'emotion': emotion},
+        keywords, conv_id, start, end,
+    )
+    out = []
+    for rsp_id, score in hits:
+        if rsp_id in rows:
+            out.append({**rows[rsp_id], 'rank': None, 'score': round(score, 4)})
+            if len(out) == limit:
+                break
+    return out
+
+
+def hybrid_search(
+    query: str,
+    query_vec: List[float],
+    model: str,
+    tags: Optional[List[str]] = None,
+    limit: int = 10,
+    info: Optional[Dict[str, Any]] = None,
+    **filters: Any,
+) -> List[Dict[str, Any]]:
+    """Fuse FTS (bm25) and semantic rankings with reciprocal rank fusion.
+
+    ``filters`` are the keyword filters of :func:`search_rsps`. Rows carry
+    the fused ``score`` and ``rank`` ``None``.
+    """
+    depth = max(limit * SEMANTIC_OVERSAMPLE, 50)
+    lexical = search_rsps(query, tags, depth, **filters)
+    semantic = semantic_search(query_vec, model, tags, depth, **filters)
+    if info is not None:
+        info['plan'] = 'hybrid'
+    rows = {r['id']: r for r in semantic}
+    rows.update((r['id'], r) for r in lexical)
+    fused = rrf([[r['id'] for r in lexical], [r['id'] for r in semantic]])
+    return [
+        {**rows[rsp_id], 'rank': None, 'score': round(score, 6)}
+        for rsp_id, score in fused[:limit]
+    ]
+
+
+def _fuzzy_search(
+    conn: sqlite3.Connection,
+    query: str,
+    tags: Optional[List[str]],
+    limit: int,
+    dims: Dict[str, Optional[str]],
+    keywords: Optional[str],
+    conv_id: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    exclude: set,
+    deadline: float,
+    info: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Second search tier: typo-tolerant matching with re-ranking.
+
+    Each query word is expanded with close ``rsp_vocab`` words, the
+    expansion is matched against ``rsp_fts`` and ``keyword_set_fts``, and
+    the candidates are re-ranked by how well they cover the query. Work
+    stops at ``deadline``; ``info['partial']`` is set when that happens.
+    Returned rows have ``rank`` ``None`` and a ``fuzzy`` score.
+    """
+    terms: Dict[str, List[tuple]] = {}
+    for term in sorted(fuzzy.words(query)):
+        lo, hi = len(term) - fuzzy.max_distance(term), len(term) + fuzzy.max_distance(term)
+        vocab = conn.execute(
+            "SELECT word, df FROM rsp_vocab WHERE length(word) BETWEEN ? AND ?", (lo, hi)
+        )
+        terms[term] = fuzzy.corrections(term, ((r['word'], r['df']) for r in vocab),
+                                        deadline=deadline)
+        if time.monotonic() > deadline:
+            info['partial'] = True
+            break
+    info['corrections'] = {t: [a for a, _ in alts] for t, alts in terms.items()}
+    alternatives = sorted({w for t, alts in terms.items() for w in [t] + [a for a, _ in alts]})
+    if not alternatives or limit <= 0:
+        return []
+    match = " OR ".join(f'"{w}"' for w in alternatives)
+
+    resolved = _index_conds(conn, dims, conv_id, start, end)
+    if resolved is None:
+        return []
+    conds, params = resolved
+    _, tag_conds, tag_params = _post_conds(tags, None)
+    conds, params = conds + tag_conds, params + tag_params
+    if exclude:
+        conds.append(f"rsp.id NOT IN ({','.join('?' * len(exclude))})")
+        params.extend(exclude)
+    where = "".join(f" AND {c}" for c in conds)
+    cap = limit * 5
 
-    rows = execute(sql, *params)
-    return [dict(r) for r in rows]
+    kw_join, kw_conds, kw_params = _post_conds(None, keywords)
+    kw_where = "".join(f" AND {c}" for c in kw_conds)
+    ids = [r['id'] for r in conn.execute(
+        "SELECT rsp.id FROM (SELECT rowid, bm25(rsp_fts) AS rank FROM rsp_fts "
+        f"WHERE rsp_fts MATCH ?) f JOIN rsp ON rsp.id = f.rowid {kw_join}"
+        f"WHERE 1=1{where}{kw_where} ORDER BY f.rank LIMIT ?",
+        (match, *params, *kw_params, cap),
+    )]
+    kw_hits: set = set()
+    if time.monotonic() <= deadline:
+        kw_match = f"({match}) AND ({keywords})" if keywords else match
+        kw_hits = {r['id'] for r in conn.execute(
+            "SELECT rsp.id FROM keyword_set_fts "
+            "JOIN rsp_keyword_xref rx ON rx.keyword_set_id = keyword_set_fts.rowid "
+            "JOIN rsp ON rsp.id = rx.rsp_id "
+            f"WHERE keyword_set_fts MATCH ?{where} LIMIT ?",
+            (kw_match, *params, cap),
+        )}
+    else:
+        info['partial'] = True
+    candidates = list(dict.fromkeys(ids + sorted(kw_hits)))
+    if not candidates:
+        return []
+
+    rows = _inflate([dict(r) for r in conn.execute(
+        f"SELECT {_SEARCH_COLUMNS}, NULL AS rank FROM rsp {_DIM_JOINS}"
+        f"WHERE rsp.id IN ({','.join('?' * len(candidates))})",
+        candidates,
+    )])
+    for row in rows:
+        score = fuzzy.score_text(f"{row['text'] or ''} {row['summary'] or ''}", terms)
+        row['fuzzy'] = round(score + (0.5 if row['id'] in kw_hits else 0.0), 4)
+    rows.sort(key=lambda r: (-r['fuzzy'], -r['id']))
+    return rows[:limit]
+
+
+def fetch_rsp(rsp_id: int) -> Optional[Dict[str, Any]]:
+    """Return one packet with its dimension values, or ``None``."""
+    rows = execute(
+        f"SELECT {_SEARCH_COLUMNS}, rsp.meta, rsp.children FROM rsp {_DIM_JOINS}WHERE rsp.id = ?",
+        rsp_id,
+    )
+    return _inflate([dict(rows[0])])[0] if rows else None
 
 
 def fetch_conversation(conv_id: str) -> List[Dict[str, Any]]:
@@ -328,4 +1978,4 @@ def fetch_conversation(conv_id: str) -> List[Dict[str, Any]]:
         """,
         conv_id,
     )
-    return [dict(r) for r in rows]
+    return _inflate([dict(r) for r in rows])
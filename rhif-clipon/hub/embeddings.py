@@ -0,0 +1,169 @@
+"""Dense vectors for the ``semantic`` and ``hybrid`` search modes.
+
+Vectors are L2-normalised and stored as little float32 blobs, so cosine
+similarity is a dot product. :class:`VectorIndex` keeps them in memory
+and scores a query by brute force; NumPy is used when installed and a
+pure-Python loop otherwise. The embeddings table and queries live in
+``db``; computing vectors for text lives here.
+
+``EMBED_MODEL=hash`` selects a dependency-free stand-in that hashes words
+and character trigrams into a fixed number of dimensions. It captures
+spelling overlap only, not meaning, but keeps the pipeline usable without
+an embedding model.
+"""
+
+import heapq
+import math
+import re
+import threading
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:  # optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on environment
+    np = None
+
+HASH_MODEL = 'hash'
+HASH_DIM = 256
+# characters of text + summary sent to the embedding model
+MAX_EMBED_CHARS = 4000
+# rows scored per matrix block, bounds temporary memory during a search
+SEARCH_BLOCK = 65536
+# reciprocal rank fusion constant from Cormack et al.
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _normalise(vec: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def hash_embedding(text: str, dim: int = HASH_DIM) -> List[float]:
+    """Return a signed feature-hashing vector of words and char trigrams."""
+    vec = [0.0] * dim
+    for word in _TOKEN_RE.findall(text.lower()):
+        feats = [word] + [word[i:i + 3] for i in range(max(1, len(word) - 2))]
+        for feat in feats:
+            h = zlib.crc32(feat.encode())
+            vec[h % dim] += 1.0 if h & 0x80000000 else -1.0
+    return _normalise(vec)
+
+
+def embed_input(text: str, summary: Optional[str]) -> str:
+    """Return the text embedded for a packet: its summary, then its text."""
+    joined = f"{summary}\n{text}" if summary else text
+    return joined[:MAX_EMBED_CHARS]
+
+
+def embed_texts(texts: List[str], model: str) -> List[List[float]]:
+    """Return one normalised vector per text using ``model``."""
+    if model == HASH_MODEL:
+        return [hash_embedding(t) for t in texts]
+    from .ollama_helpers import get_client
+
+    response = get_client().embed(model=model, input=texts)
+    return [_normalise(v) for v in response.embeddings]
+
+
+def pack(vec: Sequence[float]) -> bytes:
+    """Encode ``vec`` as a float32 blob."""
+    return array('f', vec).tobytes()
+
+
+def unpack(blob: bytes) -> array:
+    """Decode a float32 blob."""
+    vec = array('f')
+    vec.frombytes(blob)
+    return vec
+
+
+class VectorIndex:
+    """In-memory matrix of packet vectors for brute-force cosine search.
+
+    Vectors live in one preallocated float32 matrix (a flat ``array`` without
+    NumPy) that grows by doubling; :meth:`add` writes new rows at the end
+    and overwrites the rows of re-embedded packets in place, so searches
+    never copy the index. ``last_seq`` remembers how far the embeddings
+    table has been read so refreshes only load new rows.
+    """
+
+    def __init__(self) -> None:
+        self.ids: List[int] = []
+        self.last_seq = 0
+        self._pos: Dict[int, int] = {}
+        self._matrix = None
+        self._dim = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _reserve(self, rows: int) -> None:
+        """Make room for ``rows`` vectors (NumPy storage only)."""
+        if len(self._matrix) >= rows:
+            return
+        grown = np.empty((max(rows, 2 * len(self._matrix)), self._dim), dtype=np.float32)
+        grown[:len(self._matrix)] = self._matrix
+        self._matrix = grown
+
+    def add(self, items: Iterable[Tuple[int, int, bytes]]) -> None:
+        """Add ``(seq, rsp_id, blob)`` rows, replacing older vectors."""
+        with self._lock:
+            for seq, rsp_id, blob in items:
+                vec = unpack(blob)
+                if self._dim and len(vec) != self._dim:
+                    continue  # from another model; skipped until re-embedded
+                if self._matrix is None:
+                    self._dim = len(vec)
+                    self._matrix = (np.empty((1024, self._dim), dtype=np.float32)
+                                    if np is not None else array('f'))
+                pos = self._pos.get(rsp_id)
+                if pos is None:
+                    pos = self._pos[rsp_id] = len(self.ids)
+                    self.ids.append(rsp_id)
+                    if np is None:
+                        self._matrix.extend(vec)
+                    else:
+                        self._reserve(pos + 1)
+                elif np is None:
+                    self._matrix[pos * self._dim:(pos + 1) * self._dim] = vec
+                if np is not None:
+                    self._matrix[pos] = np.frombuffer(blob, dtype=np.float32)
+                self.last_seq = max(self.last_seq, seq)
+
+    def search(self, query: Sequence[float], k: int) -> List[Tuple[int, float]]:
+        """Return the ``k`` most similar ``(rsp_id, cosine)`` pairs."""
+        with self._lock:
+            if not self.ids or len(query) != self._dim:
+                return []
+            n, dim = len(self.ids), self._dim
+            if np is None:
+                flat = self._matrix
+                scored = (
+                    (sum(a * b for a, b in zip(flat[i * dim:(i + 1) * dim], query)), i)
+                    for i in range(n)
+                )
+                return [(self.ids[i], s) for s, i in heapq.nlargest(k, scored)]
+            q = np.asarray(query, dtype=np.float32)
+            best_ids: List[int] = []
+            best_scores: List[float] = []
+            for off in range(0, n, SEARCH_BLOCK):
+                scores = self._matrix[off:min(off + SEARCH_BLOCK, n)] @ q
+                top = np.argpartition(-scores, min(k, len(scores)) - 1)[:k]
+                best_ids.extend((top + off).tolist())
+                best_scores.extend(scores[top].tolist())
+            pairs = heapq.nlargest(k, zip(best_scores, best_ids))
+            return [(self.ids[i], float(s)) for s, i in pairs]
+
+
+def rrf(rankings: Iterable[Sequence[int]], k: int = RRF_K) -> List[Tuple[int, float]]:
+    """Fuse ranked id lists with reciprocal rank fusion, best first."""
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for pos, rsp_id in enumerate(ranking, 1):
+            scores[rsp_id] = scores.get(rsp_id, 0.0) + 1.0 / (k + pos)
+    return sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))
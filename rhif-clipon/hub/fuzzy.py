@@ -0,0 +1,88 @@
+"""Typo-tolerant matching helpers for the ``slow`` search tier.
+
+Pure functions only; the vocabulary table and queries live in ``db``.
+"""
+
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+WORD_RE = re.compile(r"[a-z0-9]{3,30}")
+
+
+def words(text: Optional[str]) -> Set[str]:
+    """Return the distinct lowercase words of ``text`` worth indexing."""
+    return set(WORD_RE.findall((text or '').lower()))
+
+
+def max_distance(word: str) -> int:
+    """Return the edit distance tolerated for ``word``."""
+    return 1 if len(word) <= 5 else 2
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """Return the edit distance of ``a`` and ``b`` or ``limit + 1`` if larger.
+
+    Rows are abandoned as soon as every cell exceeds ``limit`` so most
+    non-matching words are rejected after a couple of characters.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        best = i
+        for j, cb in enumerate(b, 1):
+            val = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            cur.append(val)
+            best = min(best, val)
+        if best > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+
+def corrections(
+    word: str,
+    vocab: Iterable[Tuple[str, int]],
+    max_results: int = 3,
+    deadline: Optional[float] = None,
+) -> List[Tuple[str, int]]:
+    """Return up to ``max_results`` ``(candidate, distance)`` pairs for ``word``.
+
+    ``vocab`` yields ``(word, document_frequency)``; closer and more common
+    words win. Scanning stops early once ``deadline`` (a ``time.monotonic``
+    value) has passed.
+    """
+    limit = max_distance(word)
+    found: List[Tuple[int, int, str]] = []
+    for n, (cand, df) in enumerate(vocab):
+        if deadline is not None and n % 256 == 0 and time.monotonic() > deadline:
+            break
+        if cand == word:
+            continue
+        d = bounded_levenshtein(word, cand, limit)
+        if d <= limit:
+            found.append((d, -df, cand))
+    found.sort()
+    return [(cand, d) for d, _, cand in found[:max_results]]
+
+
+def score_text(
+    text: str,
+    terms: Dict[str, List[Tuple[str, int]]],
+) -> float:
+    """Score ``text`` by how well it covers the query ``terms``.
+
+    ``terms`` maps each query word to its corrections. An exact hit counts
+    1.0 and a corrected one ``1 - distance / len(word)``.
+    """
+    present = words(text)
+    score = 0.0
+    for term, alts in terms.items():
+        if term in present:
+            score += 1.0
+            continue
+        best = max((1 - d / len(term) for alt, d in alts if alt in present), default=0.0)
+        score += best
+    return score
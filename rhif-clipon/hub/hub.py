@@ -10,24 +10,48 @@ from __future__ import annotations
 
 import json
 import os
+import queue
+import threading
+import time
 from datetime import date
 import sqlite3
+from typing import Callable, Dict, List, Optional
 
+import httpx
+import ollama
 from dotenv import load_dotenv
 from flask import Flask, jsonify, request, render_template
 from flask_cors import CORS
+from markupsafe import Markup, escape
 from werkzeug.exceptions import BadRequest
 
-from .db import execute, insert_rsp, search_rsps, fetch_conversation
-from .ollama_helpers import summarise_and_keywords
+from .db import (
+    execute, insert_rsp, insert_rsps, search_rsps, fetch_conversation, find_rsp,
+    update_rsp_summary, delete_rsp, init_app, get_id_cache, encode_cursor, write_generation,
+    vocab_doc_freq, archive_size, fts_stats, embedding_backlog, store_embeddings,
+    semantic_search, hybrid_search, find_near_dup, packet_summary, collapse_near_dups,
+    near_dup_links, shared_clusters, cursor_seen,
+    facet_counts, add_snippets, fetch_rsp, SEARCH_FIELDS,
+)
+from .ollama_helpers import (
+    batch_stats, get_summary_cache, json_recovery_stats, model_loaded,
+    summarise_routed, summarise_routed_batch, warm_up,
+)
+from .embeddings import embed_input, embed_texts, pack
+from .local_summariser import local_summarise
+from .tokens import get_estimator
 from .code_utils import extract_markdown_blocks, save_blocks
+from .jobs import JobQueue
+from .minhash import signature
+from .routing import get_route_stats, get_router
+from .search_cache import SearchCache
 
 
 load_dotenv()
 
 app = Flask(__name__, template_folder='templates')
 app.url_map.strict_slashes = False  # allow optional trailing slashes
-CORS(app, origins=['chrome-extension://*'])
+CORS(app, origins=['chrome-extension://*'], expose_headers=['X-Next-Cursor', 'X-Search-Partial'])
 
 app.config.update(
     OLLAMA_MODEL=os.getenv('OLLAMA_MODEL', 'llama3:8b-q5'),
@@ -36,30 +60,191 @@ app.config.update(
     WORKSPACE_DIR=os.getenv('WORKSPACE_DIR', './workspace'),
     SUMMARY_TOKENS=int(os.getenv('SUMMARY_TOKENS', 120)),
     KEYWORD_COUNT=int(os.getenv('KEYWORD_COUNT', 8)),
+    INGEST_WORKERS=int(os.getenv('INGEST_WORKERS', 2)),
+    INGEST_QUEUE_SIZE=int(os.getenv('INGEST_QUEUE_SIZE', 1000)),
+    DB_POOL_SIZE=int(os.getenv('DB_POOL_SIZE', 8)),
+    DB_SYNCHRONOUS=os.getenv('DB_SYNCHRONOUS', 'NORMAL'),
+    DB_CACHE_KB=int(os.getenv('DB_CACHE_KB', 65536)),
+    DB_MMAP_BYTES=int(os.getenv('DB_MMAP_BYTES', 256 * 1024 * 1024)),
+    KEYWORD_SET_CACHE_SIZE=int(os.getenv('KEYWORD_SET_CACHE_SIZE', 200000)),
+    SLOW_SEARCH_BUDGET_MS=int(os.getenv('SLOW_SEARCH_BUDGET_MS', 500)),
+    SEARCH_CACHE_BYTES=int(os.getenv('SEARCH_CACHE_BYTES', 32 * 1024 * 1024)),
+    # only used when the archive has no write generation to key entries on
+    SEARCH_CACHE_TTL=float(os.getenv('SEARCH_CACHE_TTL', 0)),
+    # embedding model for semantic search, e.g. 'nomic-embed-text' or the
+    # built-in stand-in 'hash'; empty (the default) turns embeddings off
+    EMBED_MODEL=os.getenv('EMBED_MODEL', ''),
+    EMBED_BATCH=int(os.getenv('EMBED_BATCH', 64)),
+    # after a failed backlog pass, wait this long before queueing another
+    EMBED_RETRY_SECS=float(os.getenv('EMBED_RETRY_SECS', 300)),
+    # MinHash similarity above which a turn reuses an earlier turn's summary
+    NEAR_DUP_THRESHOLD=float(os.getenv('NEAR_DUP_THRESHOLD', 0.85)),
+    SEARCH_COLLAPSE=os.getenv('SEARCH_COLLAPSE', '1') not in ('0', 'false', 'no'),
+    # default match markers in ``snippet``/``highlight``; ``open``/``close`` override
+    SNIPPET_OPEN=os.getenv('SNIPPET_OPEN', '**'),
+    SNIPPET_CLOSE=os.getenv('SNIPPET_CLOSE', '**'),
+    # codec for packet text at rest: zlib, zstd (needs zstandard) or none
+    TEXT_COMPRESSION=os.getenv('TEXT_COMPRESSION', 'zlib'),
+    FTS_AUTOMERGE=int(os.getenv('FTS_AUTOMERGE', 8)),
+    FTS_CRISISMERGE=int(os.getenv('FTS_CRISISMERGE', 32)),
+    # turns up to this many model tokens skip the LLM (0 disables)
+    LOCAL_SUMMARY_MAX_TOKENS=int(os.getenv('LOCAL_SUMMARY_MAX_TOKENS', 16)),
+    # summarise locally instead of failing when Ollama is unreachable
+    OLLAMA_FALLBACK=os.getenv('OLLAMA_FALLBACK', '1') not in ('0', 'false', 'no'),
 )
+init_app(app)
+
+# process-wide counters reported by ``/stats``
+_STATS: Dict[str, int] = {'llm_calls_skipped': 0}
+_STATS_LOCK = threading.Lock()
+
+
+def _bump(name: str, n: int = 1) -> None:
+    """Increment the ``name`` counter in a thread-safe way."""
+    with _STATS_LOCK:
+        _STATS[name] = _STATS.get(name, 0) + n
+
+
+_JOBS: Optional[JobQueue] = None
+
+# results of recent searches, invalidated by any database write
+_SEARCH_CACHE = SearchCache(app.config['SEARCH_CACHE_BYTES'], app.config['SEARCH_CACHE_TTL'])
+
+
+def get_job_queue() -> JobQueue:
+    """Return the async ingest queue, starting its workers on first use."""
+    global _JOBS
+    with _STATS_LOCK:
+        if _JOBS is None:
+            _JOBS = JobQueue(app.config['INGEST_WORKERS'], app.config['INGEST_QUEUE_SIZE'])
+    return _JOBS
+
+
+def _local_summary(text: str):
+    return local_summarise(
+        text,
+        app.config['KEYWORD_COUNT'],
+        app.config['SUMMARY_TOKENS'],
+        vocab_doc_freq,
+        archive_size(),
+    )
+
+
+def _is_short(text: str) -> bool:
+    threshold = app.config['LOCAL_SUMMARY_MAX_TOKENS']
+    return bool(threshold) and get_estimator(app.config['OLLAMA_MODEL'])(text) <= threshold
+
+
+# errors that mean Ollama is down or overloaded rather than misconfigured
+_OLLAMA_DOWN = (ConnectionError, httpx.TransportError, ollama.ResponseError)
+_OVERLOAD_STATUS = {429, 502, 503, 504}
+
+
+def _ollama_down(e: Exception) -> None:
+    """Re-raise ``e`` unless it is an outage and local fallback is enabled.
+
+    Only connection failures, timeouts and overload responses fall back;
+    other model errors (e.g. an unknown model) are logged and re-raised.
+    """
+    if isinstance(e, ollama.ResponseError) and e.status_code not in _OVERLOAD_STATUS:
+        app.logger.warning("Ollama model %s failed (%s): %s",
+                           app.config['OLLAMA_MODEL'], e.status_code, e.error)
+        raise e
+    if not app.config['OLLAMA_FALLBACK']:
+        raise e
+    app.logger.warning("Ollama unavailable, summarising locally: %s", e)
+
+
+def _summarise(text: str, role: Optional[str] = None):
+    """Return ``(summary, keywords, meta)`` for ``text``.
+
+    Short turns are summarised locally without calling the model, and when
+    Ollama cannot be reached the local summariser is used as a fallback so
+    ingestion does not stall. Otherwise the model is picked by the routing
+    table from size, code density and ``role``. Needs an application context.
+    """
+    if _is_short(text):
+        _bump('local_summaries')
+        return _local_summary(text)
+    try:
+        return summarise_routed(
+            text,
+            app.config['OLLAMA_MODEL'],
+            app.config['KEYWORD_COUNT'],
+            app.config['SUMMARY_TOKENS'],
+            role,
+        )
+    except _OLLAMA_DOWN as e:
+        _ollama_down(e)
+        _bump('ollama_fallbacks')
+        return _local_summary(text)
+
+
+def _summarise_pending(rsp_id: int, text: str, role: Optional[str] = None) -> None:
+    """Worker task: summarise a stored packet and fill in its metadata."""
+    with app.app_context():
+        summary, kw, meta = _summarise(text, role)
+        update_rsp_summary(rsp_id, summary, kw, meta)
+    _schedule_embedding()
+
+
+_EMBED_SCHEDULED = threading.Event()
+# monotonic time before which no backlog pass is queued after a failure
+_EMBED_RETRY_AT = 0.0
+
+
+def _embed_backlog() -> int:
+    """Worker task: embed every packet that has no vector for ``EMBED_MODEL``.
+
+    A failure ends the pass and holds off further passes for
+    ``EMBED_RETRY_SECS``, so a broken embedding model is reported once per
+    backlog rather than once per ingested row.
+    """
+    global _EMBED_RETRY_AT
+    _EMBED_SCHEDULED.clear()
+    model = app.config['EMBED_MODEL']
+    done = after_id = 0
+    with app.app_context():
+        while True:
+            rows = embedding_backlog(model, app.config['EMBED_BATCH'], after_id)
+            if not rows:
+                return done
+            after_id = rows[-1]['id']
+            try:
+                vectors = embed_texts([embed_input(r['text'], r['summary']) for r in rows], model)
+            except Exception:
+                _EMBED_RETRY_AT = time.monotonic() + app.config['EMBED_RETRY_SECS']
+                _bump('embed_failures')
+                raise
+            store_embeddings(model, [(r['id'], pack(v)) for r, v in zip(rows, vectors)])
+            done += len(rows)
+
+
+def _schedule_embedding() -> None:
+    """Queue one backlog pass unless embeddings are off, backing off or queued."""
+    if not app.config['EMBED_MODEL'] or _EMBED_SCHEDULED.is_set():
+        return
+    if time.monotonic() < _EMBED_RETRY_AT:
+        return
+    _EMBED_SCHEDULED.set()
+    try:
+        get_job_queue().submit(_embed_backlog, task='embed')
+    except queue.Full:
+        _EMBED_SCHEDULED.clear()  # the next write tries again
 
 
 @app.route('/summarise', methods=['POST'])
 def summarise_route():
     """Return a short summary and keywords for the provided text."""
     data = request.get_json(force=True)
-    summary, keywords, meta = summarise_and_keywords(
-        data.get('text', ''),
-        app.config['OLLAMA_MODEL'],
-        app.config['KEYWORD_COUNT'],
-        app.config['SUMMARY_TOKENS'],
-    )
+    summary, keywords, meta = _summarise(data.get('text', ''), data.get('role'))
     return jsonify({'summary': summary, 'keywords': keywords, 'meta': meta})
 
 
-@app.route('/ingest', methods=['POST'])
-def ingest_route():
-    """Ingest a conversation turn and store its summary and metadata."""
-    data = request.get_json(force=True)
-    if not data.get('text', '').strip():
-        return jsonify({'ok': False, 'error': 'empty text'}), 400
+def _row_from_payload(data: Dict) -> Dict:
+    """Build an ``rsp`` row from an ``/ingest`` request body."""
     tags = data.get('tags', ['#legacy'])
-    row = {
+    return {
         'conv_id': data['conv_id'],
         'turn': data['turn'],
         'role': data['role'],
@@ -70,24 +255,325 @@ def ingest_route():
         'keywords': None,
         'tokens': len(data['text'].split()),
     }
-    row['summary'], kw, meta = summarise_and_keywords(
-        row['text'],
-        app.config['OLLAMA_MODEL'],
-        app.config['KEYWORD_COUNT'],
-        app.config['SUMMARY_TOKENS'],
-    )
+
+
+def _summarise_row(row: Dict) -> None:
+    """Fill ``row`` in place with summary, keywords and meta."""
+    row['summary'], kw, meta = _summarise(row['text'], row['role'])
     row['keywords'] = json.dumps(kw)
     row.update(meta)
+
+
+def _reuse_near_dup(row: Dict) -> Optional[Dict]:
+    """Copy summary, keywords and meta from a stored near-duplicate of ``row``.
+
+    Returns the near-duplicate match (``{'id', 'similarity'}``) if one was
+    found; ``row['summary']`` is only set when that packet is summarised.
+    """
+    # computed once here and reused by ``insert_rsps``
+    row['minhash'] = signature(row['text'])
+    near = find_near_dup(row['text'], row['minhash'])
+    stored = packet_summary(near['id']) if near else None
+    if stored is not None:
+        summary, kw, meta = stored
+        row['summary'], row['keywords'] = summary, json.dumps(kw)
+        row.update(meta)
+        _bump('near_dup_reused')
+    return near
+
+
+def _summarise_rows(rows: List[Dict]) -> None:
+    """Fill many rows at once, packing their model calls into batched prompts."""
+    remote = []
+    for row in rows:
+        if _is_short(row['text']):
+            _bump('local_summaries')
+            result = _local_summary(row['text'])
+            row['summary'], row['keywords'] = result[0], json.dumps(result[1])
+            row.update(result[2])
+        else:
+            remote.append(row)
+    if not remote:
+        return
+    try:
+        results = summarise_routed_batch(
+            [row['text'] for row in remote],
+            app.config['OLLAMA_MODEL'],
+            app.config['KEYWORD_COUNT'],
+            app.config['SUMMARY_TOKENS'],
+            [row['role'] for row in remote],
+        )
+    except _OLLAMA_DOWN as e:
+        _ollama_down(e)
+        _bump('ollama_fallbacks', len(remote))
+        results = [_local_summary(row['text']) for row in remote]
+    for row, (summary, kw, meta) in zip(remote, results):
+        row['summary'], row['keywords'] = summary, json.dumps(kw)
+        row.update(meta)
+
+
+def _wants_async(data: Dict) -> bool:
+    return request.args.get('async') == '1' or bool(data.get('async'))
+
+
+def _queue_full():
+    """Return the 503 response sent when the job queue has no free slot."""
+    return jsonify({'ok': False, 'error': 'queue full'}), 503, {'Retry-After': '1'}
+
+
+@app.route('/ingest', methods=['POST'])
+def ingest_route():
+    """Ingest a conversation turn and store its summary and metadata.
+
+    With ``?async=1`` (or ``"async": true`` in the body) the raw turn is
+    stored immediately and summarised by a background worker; the response
+    carries a job id for ``/jobs/<id>``.
+    """
+    data = request.get_json(force=True)
+    if not data.get('text', '').strip():
+        return jsonify({'ok': False, 'error': 'empty text'}), 400
+    row = _row_from_payload(data)
+    # re-imports resend identical turns; answer before paying for the LLM
+    existing = find_rsp(row['conv_id'], row['turn'], row['text'])
+    if existing is not None:
+        _bump('llm_calls_skipped')
+        return jsonify({'ok': False, 'dup': True, 'id': existing}), 409
+    near = _reuse_near_dup(row)
+    near_id = near and near['id']
+    if _wants_async(data) and row['summary'] is None:
+        jobs = get_job_queue()
+        if jobs.full():  # cheap early answer; submit() below is the real check
+            return _queue_full()
+        row['keywords'] = '[]'
+        try:
+            rowid = insert_rsp(row)
+        except sqlite3.IntegrityError:
+            return jsonify({'ok': False, 'dup': True}), 409
+        try:
+            job_id = jobs.submit(_summarise_pending, rowid, row['text'], row['role'], rsp_id=rowid)
+        except queue.Full:
+            # another request took the last slot; undo so a retry is not a duplicate
+            delete_rsp(rowid)
+            return _queue_full()
+        return jsonify({'ok': True, 'id': rowid, 'job': job_id, 'status': 'queued',
+                        'near_dup_of': near_id}), 202
+    start = time.perf_counter()
+    if row['summary'] is None:
+        _summarise_row(row)
+    llm_seconds = round(time.perf_counter() - start, 3)
     try:
         rowid = insert_rsp(row)
     except sqlite3.IntegrityError:
         return jsonify({'ok': False, 'dup': True}), 409
-    return jsonify({'ok': True, 'id': rowid})
+    _schedule_embedding()
+    return jsonify({'ok': True, 'id': rowid, 'llm_seconds': llm_seconds,
+                    'near_dup_of': near_id})
+
+
+# fields every turn sent to ``/ingest_batch`` must carry besides ``text``
+_TURN_FIELDS = ('conv_id', 'turn', 'role')
+
+
+@app.route('/ingest_batch', methods=['POST'])
+def ingest_batch_route():
+    """Ingest many turns and write them in a single transaction.
+
+    The body is ``{"turns": [...]}`` where each turn has the same fields as
+    ``/ingest``. The response lists one result per turn plus inserted and
+    duplicate counts and the seconds spent summarising. ``?async=1`` stores
+    the turns unsummarised and queues one job per new row; it answers 413
+    for a batch larger than the queue and 503 when the rows needing a job
+    don't fit in the free slots. Turns that are near-duplicates of a
+    summarised packet reuse its summary either way.
+    """
+    data = request.get_json(force=True)
+    turns = data.get('turns') if isinstance(data, dict) else data
+    if not isinstance(turns, list):
+        raise BadRequest('turns must be a list')
+    run_async = _wants_async(data if isinstance(data, dict) else {})
+    jobs = get_job_queue() if run_async else None
+    if jobs is not None and len(turns) > jobs.maxsize:
+        # could never fit, so retrying would not help
+        return jsonify({'ok': False, 'error': f'batch larger than queue ({jobs.maxsize})'}), 413
+
+    results: List[Optional[Dict]] = [None] * len(turns)
+    rows, positions = [], []
+    for i, turn in enumerate(turns):
+        if not isinstance(turn, dict):
+            results[i] = {'ok': False, 'error': 'turn must be an object'}
+            continue
+        if not str(turn.get('text', '')).strip():
+            results[i] = {'ok': False, 'error': 'empty text'}
+            continue
+        missing = [f for f in _TURN_FIELDS if f not in turn]
+        if missing:
+            results[i] = {'ok': False, 'error': f"missing {', '.join(missing)}"}
+            continue
+        row = _row_from_payload(turn)
+        existing = find_rsp(row['conv_id'], row['turn'], row['text'])
+        if existing is not None:
+            _bump('llm_calls_skipped')
+            results[i] = {'ok': False, 'dup': True, 'id': existing}
+            continue
+        _reuse_near_dup(row)
+        if run_async and row['summary'] is None:
+            row['keywords'] = '[]'
+        rows.append(row)
+        positions.append(i)
+    if jobs is not None:
+        # duplicates and reused summaries never reach the queue
+        queued = sum(1 for row in rows if row['summary'] is None)
+        if queued > jobs.maxsize - jobs.stats()['depth']:
+            return _queue_full()
+    start = time.perf_counter()
+    if not run_async:
+        _summarise_rows([row for row in rows if row['summary'] is None])
+    llm_seconds = round(time.perf_counter() - start, 3)
+
+    for i, row, res in zip(positions, rows, insert_rsps(rows)):
+        results[i] = {'ok': not res['dup'], 'dup': res['dup'], 'id': res['id'],
+                      'near_dup_of': res.get('near_dup_of')}
+        if jobs is not None and not res['dup'] and row['summary'] is None:
+            try:
+                results[i]['job'] = jobs.submit(
+                    _summarise_pending, res['id'], row['text'], row['role'], rsp_id=res['id']
+                )
+            except queue.Full:
+                # filled up by concurrent requests; drop the row so it can be resent
+                delete_rsp(res['id'])
+                results[i] = {'ok': False, 'error': 'queue full'}
+
+    inserted = sum(1 for r in results if r.get('ok'))
+    if inserted and not run_async:
+        _schedule_embedding()
+    duplicates = sum(1 for r in results if r.get('dup'))
+    return jsonify({'ok': True, 'inserted': inserted, 'duplicates': duplicates,
+                    'llm_seconds': llm_seconds, 'results': results})
+
+
+def _vector_search(query: str, mode: str, tags: List[str], limit: int,
+                   info: Dict, **filters) -> List[Dict]:
+    if not query.strip():
+        return []
+    model = app.config['EMBED_MODEL']
+    query_vec = embed_texts([query], model)[0]
+    if mode == 'semantic':
+        return semantic_search(query_vec, model, tags, limit, info=info, **filters)
+    return hybrid_search(query, query_vec, model, tags, limit, info=info, **filters)
+
+
+# match markers used for the HTML view, replaced after escaping
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+@app.template_filter('marked')
+def marked_filter(text: Optional[str]) -> Markup:
+    """Escape a snippet and turn its match markers into ``<mark>`` tags."""
+    html = str(escape(text or ''))
+    return Markup(html.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>'))
+
+
+def _parse_fields(spec: Optional[str]) -> Optional[List[str]]:
+    """Return the ``fields=`` projection, or ``None`` for every column."""
+    if not spec:
+        return None
+    fields = [f.strip() for f in spec.split(',') if f.strip()]
+    unknown = sorted(set(fields) - set(SEARCH_FIELDS))
+    if unknown:
+        raise BadRequest(f"unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _present(rows: List[Dict], query: str, fields: Optional[List[str]],
+             marks: tuple) -> List[Dict]:
+    """Copy search rows for a response, adding snippets and projecting ``fields``.
+
+    Snippets are only computed when ``fields`` asks for them (or for the
+    HTML view, which passes ``['*']``); cached rows are never modified.
+    """
+    rows = [dict(r) for r in rows]
+    if fields and ('*' in fields or 'snippet' in fields or 'highlight' in fields):
+        add_snippets(query, rows, *marks)
+    if fields and '*' not in fields:
+        rows = [{f: r.get(f) for f in fields} for r in rows]
+    return rows
+
+
+# fetches per collapsed page before a short page is returned with a cursor
+COLLAPSE_MAX_ROUNDS = 5
+# near-duplicate clusters a cursor remembers as already shown
+COLLAPSE_SEEN_CAP = 256
+
+
+def _collapsed_page(fetch: Callable[[int, Optional[str]], List[Dict]], limit: int,
+                    cursor: Optional[str], info: Dict) -> List[Dict]:
+    """Return up to ``limit`` ranked rows, one per near-duplicate cluster.
+
+    ``fetch(n, cursor)`` returns the next ``n`` ranked rows. Rows are read
+    until the page is full, so hidden duplicates never shorten a page with
+    more results behind it. Clusters shown on earlier pages travel in the
+    cursor and stay hidden. ``info['resume']`` holds the cursor state after
+    the last row read, or ``None`` when the results are exhausted.
+    """
+    seen = cursor_seen(cursor)
+    hidden = set(seen)
+    kept: Dict[int, Dict] = {}
+    page: List[Dict] = []
+    last: Optional[Dict] = None
+    info['collapsed'] = 0
+    full = False
+    for _ in range(COLLAPSE_MAX_ROUNDS):
+        batch = fetch(limit * 2, cursor)
+        links = near_dup_links([r['id'] for r in batch])
+        for row in batch:
+            cluster = links.get(row['id'], row['id'])
+            if cluster in kept or cluster in hidden:
+                if cluster in kept:
+                    kept[cluster]['near_dups'] += 1
+                info['collapsed'] += 1
+            elif len(page) == limit:
+                full = True  # ``row`` starts the next page
+                break
+            else:
+                kept[cluster] = {**row, 'near_dups': 0}
+                page.append(kept[cluster])
+            last = row
+        if full:
+            break
+        # a short batch, or fuzzy rows (rank None), mean nothing is left
+        if len(batch) < limit * 2 or last is None or last['rank'] is None:
+            info['resume'] = None
+            return page
+        cursor = encode_cursor(last['rank'], last['id'])
+    if last is None or last['rank'] is None:
+        info['resume'] = None
+    else:
+        seen = (seen + shared_clusters(kept))[-COLLAPSE_SEEN_CAP:]
+        info['resume'] = [last['rank'], last['id'], seen]
+    return page
 
 
 @app.route('/search', methods=['GET'])
 def search_route():
-    """Search the archive using FTS and optional filters."""
+    """Search the archive using FTS and optional filters.
+
+    When a full page is returned the ``X-Next-Cursor`` header holds an
+    opaque token; pass it back as ``cursor`` to fetch the next page.
+    ``debug=1`` returns the chosen plan and ``EXPLAIN QUERY PLAN`` output
+    alongside the rows. ``slow=1`` adds typo-tolerant matches; if the time
+    budget ran out ``X-Search-Partial: 1`` is set. ``mode=semantic`` ranks
+    by embedding similarity and ``mode=hybrid`` fuses that with the FTS
+    ranking; both return a single page. Near-duplicate packets are folded
+    into the first of their cluster, which gets a ``near_dups`` count; pages
+    stay full and a cluster shown on one page is not repeated on the next.
+    ``collapse=0`` returns them all.
+
+    ``fields=id,summary,snippet`` limits each row to the listed fields
+    (see ``SEARCH_FIELDS``). ``snippet`` is an excerpt of the text around
+    the matches and ``highlight`` the marked-up summary; ``open`` and
+    ``close`` set the match markers. Full text is available from
+    ``/rsp/<id>`` or ``/conversation``.
+    """
     query = request.args.get('q', '')
     tags = request.args.get('tags', '')
     limit = int(request.args.get('limit', 10))
@@ -98,12 +584,123 @@ def search_route():
     start = request.args.get('start')
     end = request.args.get('end')
     slow = request.args.get('slow') == '1'
+    cursor = request.args.get('cursor')
+    debug = request.args.get('debug') == '1'
+    mode = request.args.get('mode', 'fts')
+    fields = _parse_fields(request.args.get('fields'))
+    collapse = request.args.get('collapse', '1' if app.config['SEARCH_COLLAPSE'] else '0') == '1'
+    if mode not in ('fts', 'semantic', 'hybrid'):
+        raise BadRequest('mode must be fts, semantic or hybrid')
+    if mode != 'fts' and not app.config['EMBED_MODEL']:
+        raise BadRequest('semantic search is disabled (EMBED_MODEL is empty)')
     tag_list = [t.strip() for t in tags.split(',') if t.strip()]
-    rows = search_rsps(query, tag_list, limit, domain, topic,
-                       None, conv_id, emotion, start, end, slow)
+    key = (' '.join(query.lower().split()), tuple(sorted(tag_list)), limit, domain,
+           topic, conv_id, emotion, start, end, slow, cursor, mode, collapse)
+    generation = write_generation()
+    cached = None if debug else _SEARCH_CACHE.get(key, generation)
+    if cached is not None:
+        rows, info = cached
+    else:
+        info: Dict = {}
+
+        def fetch(n: int, after: Optional[str]) -> List[Dict]:
+            return search_rsps(query, tag_list, n, domain, topic, None, conv_id, emotion,
+                               start, end, slow, after, explain=debug, info=info)
+
+        try:
+            if mode == 'fts' and collapse:
+                rows = _collapsed_page(fetch, limit, cursor, info)
+            elif mode == 'fts':
+                rows = fetch(limit, cursor)
+            else:
+                # a single page: over-fetch so enough distinct rows survive collapsing
+                rows = _vector_search(query, mode, tag_list, limit * 2 if collapse else limit,
+                                      info, domain=domain, topic=topic, conv_id=conv_id,
+                                      emotion=emotion, start=start, end=end)
+                if collapse:
+                    kept = collapse_near_dups(rows)
+                    info['collapsed'] = len(rows) - len(kept)
+                rows = rows[:limit] if not collapse else kept[:limit]
+        except ValueError as e:
+            raise BadRequest(str(e))
+        except (ConnectionError, ollama.ResponseError) as e:
+            return jsonify({'ok': False, 'error': f'embedding model unavailable: {e}'}), 503
+        if not debug and not info.get('partial'):
+            _SEARCH_CACHE.put(key, generation, (rows, info))
+    next_cursor = None
+    if 'resume' in info:  # collapsed pages say where the next one starts
+        next_cursor = info['resume'] and encode_cursor(*info['resume'])
+    # fuzzy rows (rank None) only ever top up the final page
+    elif rows and len(rows) >= limit and rows[-1]['rank'] is not None:
+        next_cursor = encode_cursor(rows[-1]['rank'], rows[-1]['id'])
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+    if info.get('partial'):
+        headers['X-Search-Partial'] = '1'
+    marks = (request.args.get('open', app.config['SNIPPET_OPEN']),
+             request.args.get('close', app.config['SNIPPET_CLOSE']))
+    if debug:
+        rows = _present(rows, query, fields, marks)
+        return jsonify({**info, 'next': next_cursor, 'rows': rows}), 200, headers
     if request.headers.get('Accept') == 'application/json':
-        return jsonify(rows)
-    return render_template('search.html', rows=rows)
+        return jsonify(_present(rows, query, fields, marks)), 200, headers
+    rows = _present(rows, query, ['*'], (_MARK_OPEN, _MARK_CLOSE))
+    next_args = request.args.to_dict()
+    next_args['cursor'] = next_cursor
+    return render_template('search.html', rows=rows,
+                           next_args=next_args if next_cursor else None), 200, headers
+
+
+@app.route('/facets', methods=['GET'])
+def facets_route():
+    """Return packet counts per domain, topic, conversation type and emotion.
+
+    Takes the same ``q`` and filter arguments as ``/search`` plus ``limit``
+    (values per dimension, default 20). Each dimension ignores its own
+    filter. Unfiltered and single-filter requests are answered from the
+    materialised count tables without touching ``rsp``.
+    """
+    tags = request.args.get('tags', '')
+    tag_list = [t.strip() for t in tags.split(',') if t.strip()]
+    args = {
+        'query': request.args.get('q', ''),
+        'domain': request.args.get('domain'),
+        'topic': request.args.get('topic'),
+        'emotion': request.args.get('emotion'),
+        'conv_id': request.args.get('conv_id'),
+        'start': request.args.get('start'),
+        'end': request.args.get('end'),
+    }
+    limit = int(request.args.get('limit', 20))
+    key = ('facets', ' '.join(args['query'].lower().split()), tuple(sorted(tag_list)),
+           limit, *(args[k] for k in sorted(args) if k != 'query'))
+    generation = write_generation()
+    cached = _SEARCH_CACHE.get(key, generation)
+    if cached is None:
+        info: Dict = {}
+        try:
+            facets = facet_counts(tags=tag_list, limit=limit, info=info, **args)
+        except ValueError as e:
+            raise BadRequest(str(e))
+        cached = {**info, 'facets': facets}
+        _SEARCH_CACHE.put(key, generation, cached)
+    return jsonify(cached)
+
+
+@app.route('/rsp/<int:rsp_id>', methods=['GET'])
+def rsp_route(rsp_id: int):
+    """Return one packet in full, including its text."""
+    row = fetch_rsp(rsp_id)
+    if row is None:
+        return jsonify({'ok': False, 'error': 'unknown packet'}), 404
+    return jsonify(row)
+
+
+@app.route('/rsp/<int:rsp_id>', methods=['DELETE'])
+def delete_rsp_route(rsp_id: int):
+    """Delete one packet and its index, near-dup and facet entries."""
+    if not delete_rsp(rsp_id):
+        return jsonify({'ok': False, 'error': 'unknown packet'}), 404
+    return jsonify({'ok': True, 'id': rsp_id})
 
 
 @app.route('/conversation', methods=['GET'])
@@ -127,15 +724,80 @@ def savecode_route():
     return jsonify({'ok': True, 'paths': paths})
 
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_route(job_id: str):
+    """Return the status of an async ingest job."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'ok': False, 'error': 'unknown job'}), 404
+    return jsonify(job)
+
+
+@app.route('/stats')
+def stats_route():
+    """Return process-wide counters for monitoring."""
+    with _STATS_LOCK:
+        counters = dict(_STATS)
+    cache = get_summary_cache()
+    counters['summary_cache'] = cache.stats() if cache is not None else None
+    counters['ingest_queue'] = _JOBS.stats() if _JOBS is not None else None
+    counters['id_cache'] = get_id_cache().stats()
+    counters['search_cache'] = _SEARCH_CACHE.stats()
+    counters['routes'] = get_route_stats().stats()
+    counters['summary_batches'] = batch_stats()
+    counters['json_recovery'] = json_recovery_stats()
+    counters['fts'] = fts_stats()
+    return jsonify(counters)
+
+
 @app.route('/health')
 def health_route():
     """Simple liveness probe used by tests and the extension."""
     return jsonify({'status': 'alive'})
 
 
+# set while the startup warm-up is loading models
+_WARMING = threading.Event()
+
+
+def _warm_models() -> None:
+    """Load every routed model so the first requests do not pay load time."""
+    _WARMING.set()
+    try:
+        for model in get_router().models(app.config['OLLAMA_MODEL']):
+            warm_up(model)
+    finally:
+        _WARMING.clear()
+
+
+@app.route('/ready')
+def ready_route():
+    """Readiness probe: 200 once the default model is loaded in Ollama.
+
+    Reports every routed model so clients can hold back requests that would
+    otherwise wait for a cold model load.
+    """
+    default = app.config['OLLAMA_MODEL']
+    try:
+        models = {m: model_loaded(m) for m in get_router().models(default)}
+    except (ConnectionError, ollama.ResponseError) as e:
+        return jsonify({'ready': False, 'error': str(e), 'warming': _WARMING.is_set()}), 503
+    ready = models[default]
+    body = {'ready': ready, 'models': models, 'warming': _WARMING.is_set()}
+    return jsonify(body), 200 if ready else 503
+
+
 if __name__ == '__main__':
-    from .db import ensure_schema
+    from .db import ensure_schema, warm_id_caches, rebuild_vocab, rebuild_minhash, rebuild_facets
     with app.app_context():
         ensure_schema()
+        warm_id_caches()
+        if not execute("SELECT 1 FROM rsp_vocab LIMIT 1"):
+            rebuild_vocab()  # archives created before the fuzzy tier
+        rebuild_minhash()  # signatures for packets stored before near-dup detection
+        if not execute("SELECT 1 FROM facet_count LIMIT 1") and execute("SELECT 1 FROM rsp LIMIT 1"):
+            rebuild_facets()  # archives created before the facet tables
+    threading.Thread(target=_warm_models, name='warm-up', daemon=True).start()
+    _schedule_embedding()  # vectors for rows stored while it was off
     port = app.config['HUB_PORT']
     app.run(host='127.0.0.1', port=port)
@@ -0,0 +1,110 @@
+"""Bounded background worker pool for deferred summarisation.
+
+``/ingest`` in async mode stores the raw turn straight away and hands the
+slow model call to this queue. Each submitted callable gets a job id whose
+status can be polled until it is ``done`` or ``failed``.
+"""
+
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("jobs")
+
+# finished job records kept for status polling
+MAX_FINISHED_JOBS = 10000
+
+
+class JobQueue:
+    """Fixed-size pool of daemon threads draining a bounded FIFO queue."""
+
+    def __init__(self, workers: int, maxsize: int) -> None:
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._counts = {'submitted': 0, 'done': 0, 'failed': 0, 'running': 0}
+        self._threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._worker, name=f"ingest-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def full(self) -> bool:
+        """Return ``True`` if no more jobs can be queued without blocking."""
+        return self._queue.full()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **info: Any) -> str:
+        """Queue ``fn(*args)`` and return its job id.
+
+        Extra keyword arguments are stored on the job record and returned by
+        :meth:`get`, e.g. the id of the row being summarised. Never blocks:
+        raises :class:`queue.Full` if ``maxsize`` jobs are already waiting.
+        """
+        job_id = str(next(self._ids))
+        job = {'id': job_id, 'status': 'queued', 'created': time.time(), **info}
+        with self._lock:
+            self._jobs[job_id] = job
+            self._counts['submitted'] += 1
+        try:
+            self._queue.put_nowait((job_id, fn, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                self._counts['submitted'] -= 1
+            raise
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job record or ``None`` if unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and job counters."""
+        with self._lock:
+            return {
+                'depth': self._queue.qsize(),
+                'max_depth': self.maxsize,
+                'workers': self.workers,
+                **self._counts,
+            }
+
+    def _finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job['status'] = status
+            job['finished'] = time.time()
+            if error:
+                job['error'] = error
+            self._counts['running'] -= 1
+            self._counts[status] += 1
+            # forget the oldest finished jobs once the table grows too big
+            while len(self._jobs) > MAX_FINISHED_JOBS:
+                oldest = next(iter(self._jobs.values()))
+                if oldest['status'] not in ('done', 'failed'):
+                    break
+                self._jobs.popitem(last=False)
+
+    def _worker(self) -> None:
+        while True:
+            job_id, fn, args = self._queue.get()
+            with self._lock:
+                self._jobs[job_id]['status'] = 'running'
+                self._counts['running'] += 1
+            try:
+                fn(*args)
+            except Exception as e:  # keep the worker alive
+                logger.error("Job %s failed: %s", job_id, e)
+                self._finish(job_id, 'failed', str(e))
+            else:
+                self._finish(job_id, 'done')
+            finally:
+                self._queue.task_done()
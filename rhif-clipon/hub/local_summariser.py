@@ -0,0 +1,89 @@
+"""Deterministic extractive summariser used without the LLM.
+
+Short turns ("thanks", "continue") and ingestion while Ollama is down are
+handled here. Sentences and keywords are scored with TF-IDF, taking
+document frequencies from the archive vocabulary when a lookup is given.
+The return value has the same ``(summary, keywords, meta)`` shape as
+``ollama_helpers._summarise_once``.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .fuzzy import WORD_RE
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+STOPWORDS = frozenset(
+    """
+    about above after again against all also and any are because been before
+    being below between both but can could did does doing down during each
+    few for from further had has have having her here hers herself him
+    himself his how into its itself just let more most myself nor not now off
+    once only other our ours ourselves out over own same she should some such
+    than that the their theirs them themselves then there these they this
+    those through too under until very was were what when where which while
+    who whom why will with would you your yours yourself yourselves
+    """.split()
+)
+
+DocFreq = Callable[[Iterable[str]], Dict[str, int]]
+
+
+def local_summarise(
+    text: str,
+    kw_count: int,
+    summary_tokens: int,
+    doc_freq: Optional[DocFreq] = None,
+    n_docs: int = 0,
+) -> Tuple[str, List[str], Dict[str, object]]:
+    """Return an extractive summary, TF-IDF keywords and meta for ``text``.
+
+    ``doc_freq`` maps words to the number of stored packets containing them
+    and ``n_docs`` is the archive size; without them every word gets the
+    same IDF and keywords are ranked by frequency. ``novelty`` is the share
+    of words the archive has never seen.
+    """
+    tokens = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+    tf = Counter(tokens)
+    df = doc_freq(tf) if doc_freq is not None and n_docs and tf else {}
+    weight = {w: tf[w] * (math.log((n_docs + 1) / (df.get(w, 0) + 1)) + 1) for w in tf}
+
+    keywords = [w for w, _ in sorted(weight.items(), key=lambda kv: (-kv[1], kv[0]))[:kw_count]]
+
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+    if len(text.split()) <= summary_tokens:
+        summary = " ".join(sentences)
+    else:
+        scored = []
+        for i, sent in enumerate(sentences):
+            words = [w for w in WORD_RE.findall(sent.lower()) if w in weight]
+            score = sum(weight[w] for w in words) / math.sqrt(len(words) + 1)
+            scored.append((score, i, sent))
+        chosen, used = [], 0
+        for score, i, sent in sorted(scored, key=lambda t: (-t[0], t[1])):
+            n = len(sent.split())
+            if used and used + n > summary_tokens:
+                continue
+            chosen.append((i, sent))
+            used += n
+            if used >= summary_tokens:
+                break
+        summary = " ".join(sent for _, sent in sorted(chosen))
+        words = summary.split()
+        if len(words) > summary_tokens:
+            summary = " ".join(words[:summary_tokens])
+
+    unseen = 0.0
+    if doc_freq is not None and n_docs and tf:
+        unseen = sum(1 for w in tf if not df.get(w)) / len(tf)
+    meta = {
+        'domain': '',
+        'topic': '',
+        'conversation_type': '',
+        'emotion': '',
+        'novelty': round(unseen, 2),
+    }
+    return summary, keywords, meta
@@ -0,0 +1,75 @@
+"""MinHash signatures and LSH banding for near-duplicate detection.
+
+Pure functions only; the signature and band tables live in ``db``.
+Texts are lowercased and whitespace-collapsed, then shingled into
+character trigrams; long texts keep only the ``MAX_SHINGLES`` smallest
+shingle hashes, a consistent sample that bounds the cost of a signature
+whatever the text length. With ``BANDS`` bands of ``ROWS`` rows two texts share
+a band bucket with probability ``1 - (1 - s**ROWS)**BANDS`` for Jaccard
+similarity ``s``: about 0.5 at ``s = 0.77`` and 0.97 at ``s = 0.9``.
+"""
+
+import hashlib
+import heapq
+import random
+import re
+import struct
+import zlib
+from typing import List, Optional, Set
+
+NUM_PERM = 64
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+# texts with fewer shingles are too short to compare meaningfully
+MIN_SHINGLES = 8
+# shingles hashed per signature; about 1,300 characters of distinct text
+MAX_SHINGLES = 1024
+
+_PRIME = 4294967311  # smallest prime above 2**32
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SPACE_RE = re.compile(r"\s+")
+
+
+def shingles(text: str) -> Set[int]:
+    """Return the hashed character trigrams of the normalised ``text``.
+
+    At most ``MAX_SHINGLES`` are returned: the smallest hashes, so texts
+    that share content keep the same sample of it.
+    """
+    norm = _SPACE_RE.sub(' ', (text or '').lower()).strip()
+    hs = {zlib.crc32(norm[i:i + 3].encode()) for i in range(len(norm) - 2)}
+    if len(hs) > MAX_SHINGLES:
+        hs = set(heapq.nsmallest(MAX_SHINGLES, hs))
+    return hs
+
+
+def signature(text: str) -> Optional[List[int]]:
+    """Return the MinHash signature of ``text`` or ``None`` if too short."""
+    hs = shingles(text)
+    if len(hs) < MIN_SHINGLES:
+        return None
+    return [min((a * h + b) % _PRIME for h in hs) for a, b in _PERMS]
+
+
+def band_keys(sig: List[int]) -> List[int]:
+    """Return one signed 64-bit bucket key per band of ``sig``."""
+    keys = []
+    for band in range(BANDS):
+        chunk = struct.pack(f'<{ROWS}Q', *sig[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(chunk, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True))
+    return keys
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def pack(sig: List[int]) -> bytes:
+    return struct.pack(f'<{NUM_PERM}Q', *sig)
+
+
+def unpack(blob: bytes) -> List[int]:
+    return list(struct.unpack(f'<{NUM_PERM}Q', blob))
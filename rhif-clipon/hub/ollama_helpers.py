@@ -1,17 +1,44 @@
 """Integration helpers for summarisation using the Ollama API."""
 
+import ast
 import json
 import os
 import logging
+import threading
+import time
 import regex as re
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
 
+import httpx
 import ollama
 
+from .summary_cache import SummaryCache, cache_key
+from .routing import get_route_stats, get_router
+from .tokens import (
+    PROMPT_OVERHEAD, answer_reserve, get_estimator, heuristic_tokens, model_context,
+    prompt_budget,
+)
 
-MAX_PROMPT_CHARS = int(os.getenv("OLLAMA_MAX_PROMPT", "32000"))
 
-# error logger for failed ollama JSON responses
+# set SUMMARY_CACHE_PATH to an empty string to disable the cache
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "./summary_cache.sqlite")
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# concurrent chunk calls; match the Ollama server's OLLAMA_NUM_PARALLEL
+SUMMARY_CONCURRENCY = int(
+    os.getenv("SUMMARY_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+)
+# how long Ollama keeps a model loaded after a request ("-1" = forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+# reduce rounds before giving up and truncating the combined summaries
+MAX_REDUCE_DEPTH = 4
+# most messages packed into one batched prompt (1 disables batching)
+SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "8"))
+# per-message framing tokens in a batched prompt
+BATCH_ITEM_OVERHEAD = 12
+
+# logger for failed or repaired ollama JSON responses
 logger = logging.getLogger("ollama")
 if not logger.handlers:
     handler = logging.FileHandler(
@@ -21,106 +48,265 @@ if not logger.handlers:
         logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
     )
     logger.addHandler(handler)
-    logger.setLevel(logging.ERROR)
+    logger.setLevel(logging.WARNING)
+
+
+_CACHE: Optional[SummaryCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """Return the shared summary cache, opening it on first use."""
+    global _CACHE
+    if _CACHE is None and SUMMARY_CACHE_PATH:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = SummaryCache(SUMMARY_CACHE_PATH, SUMMARY_CACHE_MAX_BYTES)
+    return _CACHE
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared pool used for concurrent chunk summaries."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, SUMMARY_CONCURRENCY), thread_name_prefix="summarise"
+            )
+    return _EXECUTOR
+
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_text(
+    text: str,
+    max_size: int,
+    size: Callable[[str], int] = len,
+) -> List[str]:
+    """Split ``text`` into chunks of at most ``max_size`` measured by ``size``.
+
+    Chunks are packed from whole paragraphs, falling back to sentences and
+    finally to hard cuts for pieces that are still too large.
+    """
+    def pieces(block: str, splitters: List) -> List[str]:
+        if size(block) <= max_size:
+            return [block]
+        if not splitters:
+            step = max(1, int(len(block) * max_size / max(size(block), 1)))
+            return [block[i:i + step] for i in range(0, len(block), step)]
+        out: List[str] = []
+        for part in splitters[0].split(block):
+            if part.strip():
+                out.extend(pieces(part, splitters[1:]))
+        return out
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces(text, [_PARAGRAPH_RE, _SENTENCE_RE]):
+        candidate = f"{current}\n\n{piece}" if current else piece
+        if current and size(candidate) > max_size:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
 
 
 _JSON_DECODER = json.JSONDecoder()
-_JSON_REGEX = re.compile(r'\{(?:[^{}]|(?R))*\}', re.S)  # recursive brace matcher
+# tolerates raw control characters (e.g. newlines) inside strings
+_LENIENT_DECODER = json.JSONDecoder(strict=False)
+# bounds on recovery work so pathological output cannot stall a worker
+MAX_JSON_CHARS = 64 * 1024
+MAX_JSON_STARTS = 64
+_QUOTE_FIXES = str.maketrans({"“": '"', "”": '"', "’": "'"})
 
+_JSON_STAGES: Dict[str, int] = {}
+_JSON_STAGES_LOCK = threading.Lock()
+
+
+def json_recovery_stats() -> Dict[str, int]:
+    """Return how often each ``_extract_json`` stage produced the result."""
+    with _JSON_STAGES_LOCK:
+        return dict(_JSON_STAGES)
 
-def _extract_json(text: str) -> Dict:
-    """Try hard to return a JSON object from *text*."""
 
-    import ast
+def _json_stage(stage: str, text: str) -> None:
+    with _JSON_STAGES_LOCK:
+        _JSON_STAGES[stage] = _JSON_STAGES.get(stage, 0) + 1
+    if stage != 'direct':
+        logger.warning("JSON recovered by %s stage from %r", stage, text[:200])
 
-    def _clean_fences(t: str) -> str:
-        t = t.strip()
-        if t.startswith("```"):
-            t = t.strip("` \n")
-            if t.lower().startswith("json"):
-                t = t[4:].lstrip()
-        return t
 
-    cleaned = _clean_fences(text)
+def _scan_object(text: str, decoder: json.JSONDecoder) -> Optional[Dict]:
+    """Return the first JSON object embedded in ``text``.
+
+    Candidates start at each ``{`` and are decoded in place with
+    ``raw_decode``; at most ``MAX_JSON_STARTS`` starts are tried so the work
+    is linear in the (capped) input size.
+    """
+    pos = text.find('{')
+    tries = 0
+    while pos != -1 and tries < MAX_JSON_STARTS:
+        tries += 1
+        try:
+            obj, _ = decoder.raw_decode(text, pos)
+        except (ValueError, RecursionError):
+            pos = text.find('{', pos + 1)
+            continue
+        if isinstance(obj, dict):
+            return obj
+        pos = text.find('{', pos + 1)
+    return None
+
+
+def _literal_object(text: str) -> Optional[Dict]:
+    """Return the outermost ``{...}`` of ``text`` read as a Python literal.
+
+    Catches single-quoted output such as ``{'summary': '...'}``.
+    """
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        obj = ast.literal_eval(text[start:end + 1].replace("\n", " "))
+    except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+def _extract_json(text: str) -> Dict:
+    """Return the first JSON object in *text*, tolerating common model noise.
+
+    Stages, cheapest first: the whole text as JSON (after stripping code
+    fences), then a scan for the first embedded object, then the same scan
+    with typographic quotes fixed and raw newlines allowed inside strings,
+    and last the outermost braces read as a Python literal (single-quoted
+    dicts). The stage used is counted and non-direct recoveries are logged.
+    """
+    cleaned = text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("` \n")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:].lstrip()
+    cleaned = cleaned[:MAX_JSON_CHARS]
 
-    # 1) direct decode
     try:
-        return json.loads(cleaned)
-    except Exception:
+        obj = _JSON_DECODER.decode(cleaned)
+        if isinstance(obj, dict):
+            _json_stage('direct', cleaned)
+            return obj
+    except (ValueError, RecursionError):
         pass
 
-    # 2) find first {...}
-    m = _JSON_REGEX.search(cleaned)
-    if m:
-        try:
-            return json.loads(m.group(0))
-        except Exception:
-            cleaned = m.group(0)
-
-    # 3) best-effort fixes
-    fixes = (
-        cleaned
-        .replace("“", '"').replace("”", '"')
-        .replace("’", "'")
-        .replace("\n", " ")
-    )
+    obj = _scan_object(cleaned, _JSON_DECODER)
+    if obj is not None:
+        _json_stage('scan', cleaned)
+        return obj
+
+    fixed = cleaned.translate(_QUOTE_FIXES)
+    obj = _scan_object(fixed, _LENIENT_DECODER)
+    if obj is not None:
+        _json_stage('repair', cleaned)
+        return obj
+
+    obj = _literal_object(fixed)
+    if obj is not None:
+        _json_stage('literal', cleaned)
+        return obj
+
+    _json_stage('failed', cleaned)
+    raise ValueError("No valid JSON object found")
+
+
+_CLIENT: Optional[ollama.Client] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_client() -> ollama.Client:
+    """Return the shared Ollama client.
+
+    The client keeps a pool of HTTP connections sized for the concurrent
+    chunk calls so requests reuse sockets instead of reconnecting.
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            conns = max(2, SUMMARY_CONCURRENCY * 2)
+            _CLIENT = ollama.Client(
+                host=os.getenv("OLLAMA_HOST") or None,
+                timeout=OLLAMA_TIMEOUT,
+                limits=httpx.Limits(max_connections=conns, max_keepalive_connections=conns),
+            )
+    return _CLIENT
+
+
+def _tagged(model: str) -> str:
+    return model if ':' in model else f"{model}:latest"
+
+
+def warm_up(model: str) -> bool:
+    """Load ``model`` into memory so the first real request is not cold.
+
+    Returns ``False`` (and logs) if Ollama cannot load it.
+    """
     try:
-        return json.loads(fixes)
-    except Exception:
-        try:
-            return ast.literal_eval(fixes)
-        except Exception:
-            raise ValueError("No valid JSON object found")
+        get_client().generate(
+            model=model,
+            prompt="",
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            options={"num_ctx": model_context(model)},
+        )
+        return True
+    except Exception as e:
+        logger.error("Warm-up of %s failed: %s", model, e)
+        return False
 
 
-def _summarise_once(
-    text: str,
-    model: str,
-    kw_count: int,
-    summary_tokens: int,
-) -> Tuple[str, List[str], Dict[str, str]]:
-    """Call Ollama once and return summary, keywords and meta data."""
+def loaded_models() -> List[str]:
+    """Return the models Ollama currently holds in memory."""
+    return [m.model or m.name or '' for m in get_client().ps().models]
 
-    system_prompt = "You are an API that must return JSON only."
-    user_prompt = (
-        f"Summarize the message below in <= {summary_tokens} words.\n"
-        f"Return exactly {kw_count} lowercase single-word keywords.\n"
-        "Provide: domain, topic, conversation_type, emotion, novelty (0-1).\n"
-        "Respond ONLY with JSON in this format:\n"
-        '{"summary":"...","keywords":["kw1","kw2"],"domain":"...","topic":"...",'
-        '"conversation_type":"...","emotion":"...","novelty":1}\n'
-        'MESSAGE:\n"""' + text + '"""'
-    )
 
-    response = ollama.generate(
+def model_loaded(model: str) -> bool:
+    """Return ``True`` if ``model`` is loaded (``ConnectionError`` if Ollama is down)."""
+    return _tagged(model) in {_tagged(m) for m in loaded_models()}
+
+
+_SYSTEM_PROMPT = "You are an API that must return JSON only."
+
+
+def _generate(prompt: str, model: str) -> str:
+    """Run one JSON-mode generation and return the raw response text."""
+    response = get_client().generate(
         model=model,
-        prompt=user_prompt,
-        system=system_prompt,
+        prompt=prompt,
+        system=_SYSTEM_PROMPT,
         # ➊ keep temperature 0 for deterministic output
         # ➋ use Ollama's JSON mode to avoid extra text
         format="json",
-        options={"temperature": 0},
+        options={"temperature": 0, "num_ctx": model_context(model)},
+        keep_alive=OLLAMA_KEEP_ALIVE,
         stream=False
     )
 
-
     raw_resp = response.response if hasattr(response, "response") else response
     if isinstance(raw_resp, dict):
         raw_resp = raw_resp.get('response', '')
     if not isinstance(raw_resp, str):
         raw_resp = str(raw_resp)
+    return raw_resp
 
-    try:
-        data = _extract_json(raw_resp)
-    except Exception as e:
-        logger.error(
-            "JSON parse failure: %s\nPrompt: %r\nResponse: %r",
-            e,
-            user_prompt[:500],  
-            raw_resp[:500],
-        )
-        return "", [], {}
 
+def _parse_result(data: Dict) -> Tuple[str, List[str], Dict[str, str]]:
+    """Turn a decoded model answer into ``(summary, keywords, meta)``."""
     summary = data.get('summary', '').strip()
     keywords = data.get('keywords', [])
     if isinstance(keywords, str):
@@ -136,24 +322,279 @@ def _summarise_once(
         'emotion': data.get('emotion', '').strip().lower(),
         'novelty': round(novelty_val, 2)
     }
+    return summary, keywords, meta
+
+
+def _summarise_once(
+    text: str,
+    model: str,
+    kw_count: int,
+    summary_tokens: int,
+) -> Tuple[str, List[str], Dict[str, str]]:
+    """Call Ollama once and return summary, keywords and meta data."""
+
+    cache = get_summary_cache()
+    key = cache_key(text, model, kw_count, summary_tokens)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
 
+    user_prompt = (
+        f"Summarize the message below in <= {summary_tokens} words.\n"
+        f"Return exactly {kw_count} lowercase single-word keywords.\n"
+        "Provide: domain, topic, conversation_type, emotion, novelty (0-1).\n"
+        "Respond ONLY with JSON in this format:\n"
+        '{"summary":"...","keywords":["kw1","kw2"],"domain":"...","topic":"...",'
+        '"conversation_type":"...","emotion":"...","novelty":1}\n'
+        'MESSAGE:\n"""' + text + '"""'
+    )
+    raw_resp = _generate(user_prompt, model)
+
+    try:
+        data = _extract_json(raw_resp)
+    except Exception as e:
+        logger.error(
+            "JSON parse failure: %s\nPrompt: %r\nResponse: %r",
+            e,
+            user_prompt[:500],  
+            raw_resp[:500],
+        )
+        return "", [], {}
+
+    summary, keywords, meta = _parse_result(data)
+    if cache is not None:
+        cache.put(key, (summary, keywords, meta))
     return summary, keywords, meta
 
 
+def _map_summaries(
+    chunks: List[str],
+    model: str,
+    kw_count: int,
+    summary_tokens: int,
+) -> List[str]:
+    """Summarise ``chunks`` concurrently, preserving their order."""
+    if len(chunks) == 1:
+        return [_summarise_once(chunks[0], model, kw_count, summary_tokens)[0]]
+    return list(_get_executor().map(
+        lambda c: _summarise_once(c, model, kw_count, summary_tokens)[0], chunks
+    ))
+
+
 def summarise_and_keywords(
     text: str,
     model: str,
     kw_count: int,
     summary_tokens: int,
 ) -> Tuple[str, List[str], Dict[str, str]]:
-    """Summarise ``text`` using Ollama, splitting into chunks if needed."""
-    if len(text) <= MAX_PROMPT_CHARS:
+    """Summarise ``text`` using Ollama, splitting into chunks if needed.
+
+    Sizes are measured in model tokens (see :mod:`hub.tokens`) against the
+    model's prompt budget. Long texts are split on paragraph/sentence
+    boundaries and the chunks are summarised concurrently (map). If the
+    joined partial summaries are still too long they are reduced again the
+    same way before the final call that also produces keywords and meta
+    data.
+    """
+    count = get_estimator(model)
+    budget = prompt_budget(model, summary_tokens)
+    if count(text) <= budget:
         return _summarise_once(text, model, kw_count, summary_tokens)
 
-    chunk_size = MAX_PROMPT_CHARS - 1000
-    chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
-    partial_summaries = [
-        _summarise_once(c, model, kw_count, summary_tokens)[0] for c in chunks
-    ]
-    combined = "\n".join(partial_summaries)
+    combined = text
+    for _ in range(MAX_REDUCE_DEPTH):
+        chunks = split_text(combined, budget, count)
+        partial_summaries = _map_summaries(chunks, model, kw_count, summary_tokens)
+        combined = "\n".join(p for p in partial_summaries if p)
+        if count(combined) <= budget:
+            break
+    else:
+        combined = split_text(combined, budget, count)[0]
     return _summarise_once(combined, model, kw_count, summary_tokens)
+
+
+_BATCH_STATS: Dict[str, int] = {'batches': 0, 'batched_items': 0, 'fallbacks': 0}
+_BATCH_STATS_LOCK = threading.Lock()
+
+
+def batch_stats() -> Dict[str, int]:
+    """Return counters for batched prompts and per-item fallbacks."""
+    with _BATCH_STATS_LOCK:
+        return dict(_BATCH_STATS)
+
+
+def _count_batch(batches: int = 0, items: int = 0, fallbacks: int = 0) -> None:
+    with _BATCH_STATS_LOCK:
+        _BATCH_STATS['batches'] += batches
+        _BATCH_STATS['batched_items'] += items
+        _BATCH_STATS['fallbacks'] += fallbacks
+
+
+def _summarise_group(
+    texts: List[str],
+    model: str,
+    kw_count: int,
+    summary_tokens: int,
+) -> List[Optional[Tuple[str, List[str], Dict[str, str]]]]:
+    """Summarise ``texts`` in one prompt; invalid items come back as ``None``."""
+    user_prompt = (
+        f"Summarize each of the {len(texts)} messages below in <= {summary_tokens} words.\n"
+        f"For each, return exactly {kw_count} lowercase single-word keywords and "
+        "domain, topic, conversation_type, emotion, novelty (0-1).\n"
+        "Respond ONLY with JSON in this format, one result per message id:\n"
+        '{"results":[{"id":1,"summary":"...","keywords":["kw1","kw2"],"domain":"...",'
+        '"topic":"...","conversation_type":"...","emotion":"...","novelty":1}]}\n'
+    )
+    user_prompt += "".join(
+        f'MESSAGE {i}:\n"""{t}"""\n' for i, t in enumerate(texts, 1)
+    )
+    results: List[Optional[Tuple[str, List[str], Dict[str, str]]]] = [None] * len(texts)
+    raw_resp = _generate(user_prompt, model)
+    try:
+        data = _extract_json(raw_resp)
+    except Exception as e:
+        logger.error("Batch JSON parse failure: %s\nResponse: %r", e, raw_resp[:500])
+        return results
+
+    items = data.get('results') if isinstance(data, dict) else data
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        idx = item.get('id')
+        if not isinstance(idx, int) or not 1 <= idx <= len(texts) or results[idx - 1]:
+            continue
+        if not isinstance(item.get('summary'), str) or not item['summary'].strip():
+            continue
+        try:
+            results[idx - 1] = _parse_result(item)
+        except (AttributeError, TypeError, ValueError):
+            continue
+    return results
+
+
+def summarise_batch(
+    texts: List[str],
+    model: str,
+    kw_count: int,
+    summary_tokens: int,
+) -> List[Tuple[str, List[str], Dict[str, str]]]:
+    """Summarise many messages, packing short ones into shared prompts.
+
+    Messages are packed greedily into prompts of up to
+    ``SUMMARY_BATCH_SIZE`` items that fit the model context together with
+    their answers, so the instruction prompt is processed once per batch.
+    Each returned item is validated; items missing from or malformed in the
+    batch answer are summarised again with a single-message call. Messages
+    too long for batching go through :func:`summarise_and_keywords`.
+    Results are returned in input order.
+    """
+    cache = get_summary_cache()
+    count = get_estimator(model)
+    capacity = model_context(model) - PROMPT_OVERHEAD
+    results: List[Optional[Tuple[str, List[str], Dict[str, str]]]] = [None] * len(texts)
+
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    single: List[int] = []
+    for i, text in enumerate(texts):
+        if cache is not None:
+            hit = cache.get(cache_key(text, model, kw_count, summary_tokens))
+            if hit is not None:
+                results[i] = hit
+                continue
+        cost = count(text) + answer_reserve(summary_tokens) + BATCH_ITEM_OVERHEAD
+        if SUMMARY_BATCH_SIZE <= 1 or cost > capacity // 2:
+            single.append(i)
+            continue
+        if current and (used + cost > capacity or len(current) >= SUMMARY_BATCH_SIZE):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+
+    def run(group: List[int]) -> None:
+        if len(group) == 1:
+            results[group[0]] = _summarise_once(texts[group[0]], model, kw_count, summary_tokens)
+            return
+        batch = _summarise_group([texts[i] for i in group], model, kw_count, summary_tokens)
+        missed = [i for i, res in zip(group, batch) if res is None]
+        _count_batch(batches=1, items=len(group), fallbacks=len(missed))
+        for i, res in zip(group, batch):
+            if res is not None:
+                results[i] = res
+                if cache is not None:
+                    cache.put(cache_key(texts[i], model, kw_count, summary_tokens), res)
+        for i in missed:
+            results[i] = _summarise_once(texts[i], model, kw_count, summary_tokens)
+
+    if len(groups) == 1:
+        run(groups[0])
+    else:
+        list(_get_executor().map(run, groups))
+    for i in single:
+        results[i] = summarise_and_keywords(texts[i], model, kw_count, summary_tokens)
+    return results  # type: ignore[return-value]
+
+
+def summarise_routed(
+    text: str,
+    default_model: str,
+    kw_count: int,
+    summary_tokens: int,
+    role: Optional[str] = None,
+) -> Tuple[str, List[str], Dict[str, str]]:
+    """Summarise ``text`` with the model chosen by the routing table.
+
+    See :mod:`hub.routing`. Latency and failures (exceptions or an empty
+    result) are recorded against the chosen route.
+    """
+    route = get_router().pick(default_model, heuristic_tokens(text), text, role)
+    start = time.perf_counter()
+    ok = False
+    try:
+        result = summarise_and_keywords(text, route['model'], kw_count, summary_tokens)
+        ok = bool(result[0])
+        return result
+    finally:
+        get_route_stats().record(
+            route['name'], route['model'], time.perf_counter() - start, ok
+        )
+
+
+def summarise_routed_batch(
+    texts: List[str],
+    default_model: str,
+    kw_count: int,
+    summary_tokens: int,
+    roles: Optional[List[Optional[str]]] = None,
+) -> List[Tuple[str, List[str], Dict[str, str]]]:
+    """Batch version of :func:`summarise_routed`, batching per chosen model.
+
+    Route latency is recorded per message as its share of the batch time.
+    """
+    roles = roles or [None] * len(texts)
+    router = get_router()
+    by_route: Dict[Tuple[str, str], List[int]] = {}
+    for i, (text, role) in enumerate(zip(texts, roles)):
+        route = router.pick(default_model, heuristic_tokens(text), text, role)
+        by_route.setdefault((route['name'], route['model']), []).append(i)
+
+    results: List[Optional[Tuple[str, List[str], Dict[str, str]]]] = [None] * len(texts)
+    for (name, model), idxs in by_route.items():
+        start = time.perf_counter()
+        out: List[Optional[Tuple[str, List[str], Dict[str, str]]]] = [None] * len(idxs)
+        try:
+            out = list(summarise_batch(
+                [texts[i] for i in idxs], model, kw_count, summary_tokens
+            ))
+        finally:
+            share = (time.perf_counter() - start) / len(idxs)
+            for res in out:
+                get_route_stats().record(name, model, share, bool(res and res[0]))
+        for i, res in zip(idxs, out):
+            results[i] = res
+    return results  # type: ignore[return-value]
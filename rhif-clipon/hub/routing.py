@@ -0,0 +1,149 @@
+"""Pick the Ollama model for a message and record per-route stats.
+
+The routing table is a list of routes tried in order; the first whose
+conditions all hold wins. Every condition is optional::
+
+    [
+      {"name": "short-user", "model": "llama3.2:3b-q4",
+       "roles": ["user"], "max_tokens": 300},
+      {"name": "code", "model": "qwen2.5-coder:7b", "min_code": 0.4},
+      {"name": "default"}
+    ]
+
+``min_tokens``/``max_tokens`` bound the estimated token count,
+``min_code``/``max_code`` bound the share of characters inside fenced code
+blocks and ``roles`` restricts the speaker. A route without ``model`` uses
+the hub's ``OLLAMA_MODEL``. Messages matching no route use a built-in
+``default`` route.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .code_utils import extract_markdown_blocks
+
+_CONDITIONS = ('roles', 'min_tokens', 'max_tokens', 'min_code', 'max_code')
+
+
+def code_density(text: str) -> float:
+    """Return the share of ``text`` characters inside fenced code blocks."""
+    if not text:
+        return 0.0
+    code = sum(len(b['code']) for b in extract_markdown_blocks(text))
+    return min(1.0, code / len(text))
+
+
+def load_routes(spec: str) -> List[Dict[str, Any]]:
+    """Parse a routing table from JSON text or a path to a JSON file."""
+    spec = spec.strip()
+    if not spec:
+        return []
+    if not spec.startswith('['):
+        spec = Path(spec).read_text(encoding='utf-8')
+    routes = json.loads(spec)
+    if not isinstance(routes, list):
+        raise ValueError("routing table must be a JSON list")
+    for i, route in enumerate(routes):
+        unknown = set(route) - set(_CONDITIONS) - {'name', 'model'}
+        if unknown:
+            raise ValueError(f"route {i}: unknown keys {sorted(unknown)}")
+        route.setdefault('name', route.get('model') or f"route{i}")
+    return routes
+
+
+class RouteStats:
+    """Thread-safe call, failure and latency counters per route."""
+
+    def __init__(self) -> None:
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, model: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            st = self._routes.setdefault(route, {
+                'model': model, 'calls': 0, 'failures': 0,
+                'total_seconds': 0.0, 'max_seconds': 0.0,
+            })
+            st['model'] = model
+            st['calls'] += 1
+            st['failures'] += 0 if ok else 1
+            st['total_seconds'] += seconds
+            st['max_seconds'] = max(st['max_seconds'], seconds)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return counters with mean latency and failure rate per route."""
+        with self._lock:
+            out = {}
+            for name, st in self._routes.items():
+                calls = st['calls']
+                out[name] = {
+                    'model': st['model'],
+                    'calls': calls,
+                    'failures': st['failures'],
+                    'failure_rate': round(st['failures'] / calls, 4) if calls else 0.0,
+                    'mean_seconds': round(st['total_seconds'] / calls, 3) if calls else 0.0,
+                    'max_seconds': round(st['max_seconds'], 3),
+                }
+            return out
+
+
+class Router:
+    """Choose a route for ``(tokens, code density, role)``."""
+
+    def __init__(self, routes: List[Dict[str, Any]]) -> None:
+        self.routes = routes
+
+    @staticmethod
+    def _matches(route: Dict[str, Any], tokens: int, code: float, role: Optional[str]) -> bool:
+        if 'roles' in route and role not in route['roles']:
+            return False
+        if tokens < route.get('min_tokens', 0):
+            return False
+        if 'max_tokens' in route and tokens > route['max_tokens']:
+            return False
+        if code < route.get('min_code', 0.0):
+            return False
+        if 'max_code' in route and code > route['max_code']:
+            return False
+        return True
+
+    def models(self, default_model: str) -> List[str]:
+        """Return every model the table can route to, default first."""
+        models = [default_model]
+        for route in self.routes:
+            model = route.get('model') or default_model
+            if model not in models:
+                models.append(model)
+        return models
+
+    def pick(self, default_model: str, tokens: int, text: str,
+             role: Optional[str] = None) -> Dict[str, Any]:
+        """Return ``{'name', 'model'}`` for the first matching route."""
+        code = code_density(text) if any(
+            'min_code' in r or 'max_code' in r for r in self.routes
+        ) else 0.0
+        for route in self.routes:
+            if self._matches(route, tokens, code, role):
+                return {'name': route['name'], 'model': route.get('model') or default_model}
+        return {'name': 'default', 'model': default_model}
+
+
+_ROUTER: Optional[Router] = None
+_ROUTE_STATS = RouteStats()
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_router() -> Router:
+    """Return the router built from ``OLLAMA_ROUTES`` (JSON or file path)."""
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = Router(load_routes(os.getenv('OLLAMA_ROUTES', '')))
+    return _ROUTER
+
+
+def get_route_stats() -> RouteStats:
+    return _ROUTE_STATS
@@ -0,0 +1,80 @@
+"""In-memory LRU cache of search results.
+
+Entries remember the database write generation they were computed at and
+are treated as misses once any write has happened since, so results are
+never stale. When the generation is unknown (``None``) entries fall back
+to expiring after a TTL, and are not cached at all without one. The cache
+is bounded by the approximate JSON size of the stored rows.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class SearchCache:
+    """Thread-safe LRU map of search keys to ``(rows, info)`` tuples."""
+
+    def __init__(self, max_bytes: int, ttl: float = 0) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._bytes = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, generation: Optional[int]) -> Optional[Any]:
+        """Return the cached value for ``key`` if still current, else ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                gen, stored, size, value = entry
+                if generation is None:
+                    current = gen is None and time.monotonic() - stored <= self.ttl
+                else:
+                    current = gen == generation
+                if current:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, generation: Optional[int], value: Any) -> None:
+        """Store ``value`` computed at ``generation`` and evict to fit."""
+        if generation is None and not self.ttl:
+            return
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, time.monotonic(), size, value)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        self._bytes -= self._entries.pop(key)[2]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit ratio and memory use."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+            }
@@ -0,0 +1,132 @@
+"""Persistent on-disk cache for model summaries.
+
+Entries are keyed on the SHA-256 of the input text plus the model and prompt
+parameters so identical turns are only ever summarised once. The cache lives
+in its own SQLite file, independent of the Flask app, and is bounded by the
+total size of stored values with least-recently-used eviction. Hits only
+note their time in memory; the stamps are written with the next ``put``
+(or every ``TOUCH_BATCH`` hits), so reads never wait on a disk write.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+Summary = Tuple[str, List[str], Dict[str, Any]]
+
+# pending ``last_used`` stamps written in one transaction
+TOUCH_BATCH = 256
+
+
+def cache_key(text: str, model: str, kw_count: int, summary_tokens: int) -> str:
+    """Return the cache key for a summarisation request."""
+    digest = hashlib.sha256(text.encode('utf-8', 'replace')).hexdigest()
+    return f"{digest}|{model}|{kw_count}|{summary_tokens}"
+
+
+class SummaryCache:
+    """SQLite backed LRU cache of ``(summary, keywords, meta)`` tuples."""
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS summary_cache (
+              key       TEXT PRIMARY KEY,
+              value     TEXT NOT NULL,
+              size      INTEGER NOT NULL,
+              last_used REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS summary_cache_lru_idx ON summary_cache(last_used)"
+        )
+        self._conn.commit()
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM summary_cache"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Summary]:
+        """Return the cached tuple for ``key`` or ``None`` on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM summary_cache WHERE key=?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+        summary, keywords, meta = json.loads(row[0])
+        return summary, keywords, meta
+
+    def put(self, key: str, value: Summary) -> None:
+        """Store ``value`` under ``key`` and evict old entries if over budget."""
+        blob = json.dumps(list(value))
+        size = len(blob)
+        with self._lock:
+            self._flush_touched()
+            old = self._conn.execute(
+                "SELECT size FROM summary_cache WHERE key=?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summary_cache(key, value, size, last_used) VALUES (?,?,?,?)",
+                (key, blob, size, time.time()),
+            )
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        """Write the pending ``last_used`` stamps (the caller commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE summary_cache SET last_used=? WHERE key=?",
+                ((stamp, key) for key, stamp in self._touched.items()),
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        """Drop least recently used rows until the cache is at 90% of budget."""
+        target = int(self.max_bytes * 0.9)
+        cur = self._conn.execute(
+            "SELECT key, size FROM summary_cache ORDER BY last_used"
+        )
+        victims = []
+        for key, size in cur:
+            if self._bytes <= target:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM summary_cache WHERE key=?", victims)
+        self.evictions += len(victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'entries': entries,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -0,0 +1,172 @@
+"""Compress packet text at rest.
+
+``rsp.text`` holds either plain TEXT (short texts, texts that do not
+shrink, and rows written before compression was enabled) or a BLOB made of
+a codec byte, the 8-byte id of the dictionary it was compressed with
+(zeros for none) and the compressed UTF-8. :func:`decode` accepts both, so
+readers never need to know which form a row uses.
+
+zlib (raw deflate with a preset dictionary) is always available; zstd is
+used when the optional ``zstandard`` package is installed. Dictionaries are
+trained from a sample of stored texts and kept in a process-wide registry
+keyed by their id; ``db`` persists them in ``text_dict`` and installs a
+loader so ids trained by another process are fetched on first use.
+"""
+
+import hashlib
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+try:  # optional dependency
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+CODECS = {'zlib': 1, 'zstd': 2}
+NO_DICT = bytes(8)
+# texts shorter than this many bytes are stored as they are
+MIN_COMPRESS = 96
+# zlib can only reference the last 32 KiB of a preset dictionary
+DICT_SIZE = 32768
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+_HEADER = struct.Struct('<B8s')
+_DICTS: Dict[bytes, bytes] = {}
+_DICTS_LOCK = threading.Lock()
+_LOADER: Optional[Callable[[bytes], Optional[bytes]]] = None
+_local = threading.local()  # zstd (de)compressors are not thread-safe
+_WORD_RE = re.compile(r"\S+")
+
+
+def available(codec: str) -> bool:
+    """Return whether ``codec`` can be used in this process."""
+    return codec == 'zlib' or (codec == 'zstd' and zstandard is not None)
+
+
+def dict_id(dictionary: bytes) -> bytes:
+    return hashlib.blake2b(dictionary, digest_size=8).digest()
+
+
+def register_dictionary(dictionary: bytes) -> bytes:
+    """Make ``dictionary`` available to :func:`decode`; return its id."""
+    did = dict_id(dictionary)
+    with _DICTS_LOCK:
+        _DICTS[did] = dictionary
+    return did
+
+
+def set_dictionary_loader(loader: Optional[Callable[[bytes], Optional[bytes]]]) -> None:
+    """Use ``loader(id)`` to fetch dictionaries :func:`decode` has not seen."""
+    global _LOADER
+    _LOADER = loader
+
+
+def _dictionary(did: bytes) -> bytes:
+    dictionary = _DICTS.get(did)
+    if dictionary is None and _LOADER is not None:
+        found = _LOADER(did)
+        if found is not None and dict_id(found) == did:
+            register_dictionary(found)
+            dictionary = found
+    if dictionary is None:
+        raise KeyError(f"unknown text dictionary {did.hex()}")
+    return dictionary
+
+
+def _zstd(kind: str, dictionary: Optional[bytes]):
+    cache = _local.__dict__.setdefault(kind, {})
+    key = dict_id(dictionary) if dictionary else NO_DICT
+    obj = cache.get(key)
+    if obj is None:
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        if kind == 'compress':
+            obj = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict)
+        else:
+            obj = zstandard.ZstdDecompressor(dict_data=zdict)
+        cache[key] = obj
+    return obj
+
+
+def encode(text: str, codec: str = 'zlib', dictionary: Optional[bytes] = None) -> Union[str, bytes]:
+    """Return the stored form of ``text``: a compressed blob or ``text`` itself."""
+    raw = text.encode('utf-8')
+    if len(raw) < MIN_COMPRESS:
+        return text
+    if codec == 'zlib':
+        opts = {'zdict': dictionary} if dictionary else {}
+        comp = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, **opts)
+        payload = comp.compress(raw) + comp.flush()
+    elif codec == 'zstd':
+        payload = _zstd('compress', dictionary).compress(raw)
+    else:
+        raise ValueError(f"unknown codec {codec!r}")
+    if len(payload) + _HEADER.size >= len(raw):
+        return text
+    did = register_dictionary(dictionary) if dictionary else NO_DICT
+    return _HEADER.pack(CODECS[codec], did) + payload
+
+
+def decode(value: Union[str, bytes, None]) -> Optional[str]:
+    """Return the text of a stored ``rsp.text`` value."""
+    if not isinstance(value, bytes):
+        return value
+    codec, did = _HEADER.unpack_from(value)
+    payload = value[_HEADER.size:]
+    dictionary = _dictionary(did) if did != NO_DICT else None
+    if codec == CODECS['zlib']:
+        opts = {'zdict': dictionary} if dictionary else {}
+        decomp = zlib.decompressobj(-15, **opts)
+        raw = decomp.decompress(payload) + decomp.flush()
+    elif codec == CODECS['zstd']:
+        if zstandard is None:
+            raise RuntimeError("text was compressed with zstd; install zstandard")
+        raw = _zstd('decompress', dictionary).decompress(payload)
+    else:
+        raise ValueError(f"unknown codec id {codec}")
+    return raw.decode('utf-8')
+
+
+def _fragments(text: str) -> Iterable[str]:
+    """Yield the lines and word trigrams of ``text`` worth sharing."""
+    for line in text.splitlines():
+        line = line.strip()
+        if 8 <= len(line) <= 200:
+            yield line + "\n"
+    words = _WORD_RE.findall(text)
+    for i in range(len(words) - 2):
+        yield " ".join(words[i:i + 3]) + " "
+
+
+def train_dictionary(samples: List[str], codec: str = 'zlib', size: int = DICT_SIZE) -> bytes:
+    """Build a compression dictionary of at most ``size`` bytes from ``samples``.
+
+    zstd uses its own trainer. For zlib the fragments (lines and word
+    trigrams) found in more than one sample are ranked by the bytes they
+    could save, and the best are placed last, where deflate reaches them
+    with the shortest distances.
+    """
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd dictionaries need the zstandard package")
+        return zstandard.train_dictionary(size, [s.encode('utf-8') for s in samples]).as_bytes()
+    seen: Counter = Counter()
+    for text in samples:
+        seen.update(set(_fragments(text)))
+    ranked = sorted(
+        (f for f, n in seen.items() if n > 1),
+        key=lambda f: (seen[f] - 1) * len(f), reverse=True,
+    )
+    picked: List[bytes] = []
+    total = 0
+    for frag in ranked:
+        data = frag.encode('utf-8')
+        if total + len(data) > size:
+            continue
+        picked.append(data)
+        total += len(data)
+    return b"".join(reversed(picked))
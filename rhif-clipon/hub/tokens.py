@@ -0,0 +1,119 @@
+"""Token estimation and per-model prompt budgets.
+
+Chunk sizes for summarisation are expressed in tokens of the target model
+rather than characters. A fast heuristic is always available; when the
+optional ``tokenizers`` package is installed and a ``tokenizer.json`` for
+the model family exists under ``TOKENIZER_DIR`` it is used instead.
+"""
+
+import logging
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import regex as re
+
+try:  # optional dependency
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover - depends on environment
+    Tokenizer = None
+
+TOKENIZER_DIR = os.getenv("TOKENIZER_DIR", "./tokenizers")
+# overrides the context size of every profile when set
+OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "0"))
+
+logger = logging.getLogger("tokens")
+
+
+def _legacy_prompt_cap(chars: Optional[str]) -> int:
+    """Map the deprecated ``OLLAMA_MAX_PROMPT`` character cap onto tokens."""
+    if not chars:
+        return 0
+    cap = int(chars) // 4  # the heuristic's four characters per token
+    logger.warning("OLLAMA_MAX_PROMPT is deprecated; prompts are budgeted in tokens "
+                   "(see OLLAMA_NUM_CTX). Capping prompts at %d tokens.", cap)
+    return cap
+
+
+# 0 = no cap beyond the model's context
+MAX_PROMPT_TOKENS = _legacy_prompt_cap(os.getenv("OLLAMA_MAX_PROMPT"))
+
+# model family -> context window we ask Ollama for (``num_ctx``)
+MODEL_PROFILES: Dict[str, Dict[str, int]] = {
+    'llama3.2': {'context': 8192},
+    'llama3.1': {'context': 8192},
+    'llama3': {'context': 8192},
+    'mistral': {'context': 8192},
+    'qwen2.5': {'context': 8192},
+    'gemma2': {'context': 8192},
+    'phi3': {'context': 4096},
+}
+DEFAULT_PROFILE = {'context': 4096}
+
+# tokens used by the fixed system/instruction prompt around the message
+PROMPT_OVERHEAD = 200
+
+_PIECE_RE = re.compile(r"[\p{L}\p{N}]+|[^\s\p{L}\p{N}]")
+_TOKENIZERS: Dict[str, Optional[Callable[[str], int]]] = {}
+_TOKENIZERS_LOCK = threading.Lock()
+
+
+def heuristic_tokens(text: str) -> int:
+    """Estimate the token count of ``text`` without a tokenizer.
+
+    Words count one token per four characters and every punctuation or
+    symbol character counts as its own token, so code-heavy text is not
+    underestimated the way a plain ``len / 4`` would.
+    """
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        total += math.ceil(len(piece) / 4) if piece[0].isalnum() else 1
+    return total
+
+
+def model_family(model: str) -> str:
+    """Return the profile key for an Ollama model name like ``llama3:8b``."""
+    name = model.split(':', 1)[0].lower()
+    for family in sorted(MODEL_PROFILES, key=len, reverse=True):
+        if name.startswith(family):
+            return family
+    return name
+
+
+def model_context(model: str) -> int:
+    """Return the context window (tokens) used for ``model``."""
+    if OLLAMA_NUM_CTX:
+        return OLLAMA_NUM_CTX
+    return MODEL_PROFILES.get(model_family(model), DEFAULT_PROFILE)['context']
+
+
+def _load_tokenizer(family: str) -> Optional[Callable[[str], int]]:
+    path = Path(TOKENIZER_DIR) / f"{family}.json"
+    if Tokenizer is None or not path.exists():
+        return None
+    tok = Tokenizer.from_file(str(path))
+    return lambda text: len(tok.encode(text, add_special_tokens=False).ids)
+
+
+def get_estimator(model: str) -> Callable[[str], int]:
+    """Return a ``text -> tokens`` function for ``model``."""
+    family = model_family(model)
+    with _TOKENIZERS_LOCK:
+        if family not in _TOKENIZERS:
+            _TOKENIZERS[family] = _load_tokenizer(family)
+        return _TOKENIZERS[family] or heuristic_tokens
+
+
+def answer_reserve(summary_tokens: int) -> int:
+    """Return the tokens kept free for one JSON answer (summary, keywords, meta)."""
+    return summary_tokens * 2 + 100
+
+
+def prompt_budget(model: str, summary_tokens: int) -> int:
+    """Return how many message tokens fit in one summarisation prompt."""
+    budget = model_context(model) - PROMPT_OVERHEAD - answer_reserve(summary_tokens)
+    if MAX_PROMPT_TOKENS:
+        budget = min(budget, MAX_PROMPT_TOKENS)
+    return max(256, budget)
@@ -1,7 +1,11 @@
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
-from hub.db import execute, insert_rsp, search_rsps, ensure_schema
+import sqlite3
+import pytest
+from hub.db import (execute, insert_rsp, insert_rsps, search_rsps, ensure_schema, find_rsp,
+                    update_rsp_summary, get_db, init_app, _POOLS,
+                    get_id_cache, warm_id_caches, encode_cursor, decode_cursor)
 from hub.rhif_utils import canonical_json
 from flask import Flask
 
@@ -59,3 +63,400 @@ def test_insert_strips_date_quotes():
         res = search_rsps('quoted', [], 10, start='2024-02-01', end='2024-02-03')
         assert len(res) == 1
 
+
+
+def test_find_rsp_and_duplicate_insert():
+    with app.app_context():
+        row = {'conv_id':'5','turn':1,'role':'user','date':'2024-03-01',
+               'text':'dupe me','summary':'','keywords':'[]','tags':'[]','tokens':2,
+               'domain':'test','topic':'dup'}
+        assert find_rsp('5', 1, 'dupe me') is None
+        rowid = insert_rsp(dict(row))
+        assert find_rsp('5', 1, 'dupe me') == rowid
+        assert find_rsp('5', 2, 'dupe me') is None
+        with pytest.raises(sqlite3.IntegrityError):
+            insert_rsp(dict(row))
+
+
+def test_pending_row_searchable_then_updated():
+    with app.app_context():
+        rowid = insert_rsp({'conv_id':'6','turn':1,'role':'user','date':'2024-03-02',
+                            'text':'pending turn','summary':None,'keywords':'[]',
+                            'tags':'[]','tokens':2})
+        res = search_rsps('pending', [], 10)
+        assert [r['id'] for r in res] == [rowid]
+        assert res[0]['summary'] is None
+        update_rsp_summary(rowid, 'queued summary', ['zeta'],
+                           {'domain': 'test', 'topic': 'async', 'novelty': 0.25})
+        res = search_rsps('queued', [], 10, topic='async')
+        assert [r['id'] for r in res] == [rowid]
+        assert res[0]['domain'] == 'test' and res[0]['novelty'] == 0.25
+        assert search_rsps('pending', [], 10, keywords='zeta')[0]['id'] == rowid
+
+
+def test_insert_rsps_batch_reports_duplicates():
+    with app.app_context():
+        rows = [{'conv_id':'7','turn':i,'role':'user','date':'2024-04-01',
+                 'text':f'batch row {i}','summary':'','keywords':'["b","a"]',
+                 'tags':'[]','tokens':3,'domain':'batch','topic':f't{i % 2}'}
+                for i in range(3)]
+        rows.append(dict(rows[0]))
+        res = insert_rsps(rows)
+        assert [r['dup'] for r in res] == [False, False, False, True]
+        assert res[3]['id'] == res[0]['id']
+        found = search_rsps('batch row', [], 10, topic='t1')
+        assert [r['id'] for r in found] == [res[1]['id']]
+        kw_ids = execute("SELECT DISTINCT keyword_set_id FROM rsp_keyword_xref WHERE rsp_id IN (?,?,?)",
+                         *[r['id'] for r in res[:3]])
+        assert len(kw_ids) == 1
+
+
+def test_bulk_insert_defers_fts_until_rebuild(tmp_path):
+    from hub.db import rebuild_fts, pending_rsps
+
+    bulk_app = Flask(__name__)
+    bulk_app.config['DB_PATH'] = str(tmp_path / 'bulk.sqlite')
+    init_app(bulk_app)
+    with bulk_app.app_context():
+        ensure_schema()
+        rows = [{'conv_id':'b','turn':i,'role':'user','date':'2024-05-01',
+                 'text':f'deferred bulkload row {i}','summary':None,'keywords':'["bulkkw"]',
+                 'tags':'[]','tokens':3} for i in range(5)]
+        insert_rsps(rows, fts=False)
+        assert search_rsps('bulkload', [], 10) == []
+        assert search_rsps('bulkload', [], 10, keywords='bulkkw') == []
+        rebuild_fts()
+        assert len(search_rsps('bulkload', [], 10)) == 5
+        assert len(search_rsps('bulkload', [], 10, keywords='bulkkw')) == 5
+        pending = pending_rsps(3)
+        assert [r['role'] for r in pending] == ['user'] * 3
+        assert len(pending_rsps(10, pending[-1]['id'])) == 2
+    _POOLS[bulk_app.config['DB_PATH']].close_all()
+
+
+def test_write_generation_sees_other_processes(tmp_path):
+    import subprocess
+    from hub.db import write_generation
+
+    path = str(tmp_path / 'shared.sqlite')
+    gen_app = Flask(__name__)
+    gen_app.config['DB_PATH'] = path
+    init_app(gen_app)
+    with gen_app.app_context():
+        ensure_schema()
+        before = write_generation()
+    writer = (
+        "from flask import Flask\n"
+        "from hub.db import init_app, insert_rsps\n"
+        "app = Flask('writer'); app.config['DB_PATH'] = %r; init_app(app)\n"
+        "with app.app_context():\n"
+        "    insert_rsps([{'conv_id': 'g', 'turn': 1, 'role': 'user', 'date': '2024-05-01',"
+        " 'text': 'written elsewhere', 'summary': 's', 'keywords': '[]', 'tags': '[]',"
+        " 'tokens': 2}], fts=False)\n" % path
+    )
+    subprocess.run([sys.executable, '-c', writer], check=True,
+                   cwd=str(Path(__file__).resolve().parents[1]))
+    with gen_app.app_context():
+        assert write_generation() > before
+    _POOLS[path].close_all()
+
+
+def test_fts_merge_settings_and_incremental_merge(tmp_path):
+    from hub.db import configure_fts, fts_stats, merge_fts
+
+    fts_app = Flask(__name__)
+    fts_app.config['DB_PATH'] = str(tmp_path / 'fts.sqlite')
+    init_app(fts_app)
+    with fts_app.app_context():
+        ensure_schema()
+        assert fts_stats()['rsp_fts']['automerge'] == 8
+        for i in range(20):
+            insert_rsp({'conv_id':'m','turn':i,'role':'user','date':'2024-05-02',
+                        'text':f'merge segment row {i}','summary':'','keywords':f'["m{i}"]',
+                        'tags':'[]','tokens':3})
+        before = fts_stats()['rsp_fts']['pages']
+        assert merge_fts(50) >= 2
+        assert fts_stats()['rsp_fts']['pages'] < before
+        assert len(search_rsps('segment', [], 50)) == 20
+        configure_fts(6, 20)
+        assert fts_stats()['keyword_set_fts']['crisismerge'] == 20
+    _POOLS[fts_app.config['DB_PATH']].close_all()
+
+
+def test_semantic_and_hybrid_search():
+    from hub.db import embedding_backlog, store_embeddings, semantic_search, hybrid_search
+    from hub.embeddings import embed_input, embed_texts, pack
+
+    with app.app_context():
+        ids = [r['id'] for r in insert_rsps([
+            {'conv_id':'s','turn':i,'role':'user','date':'2024-06-01','text':text,
+             'summary':'','keywords':'[]','tags':'[]','tokens':3,'domain':dom}
+            for i, (text, dom) in enumerate([
+                ('rotating expired passkeys for the service', 'auth'),
+                ('passkey rotation for tokens', 'ops'),
+                ('sourdough bread baking tips', 'food'),
+            ])
+        ])]
+        backlog = embedding_backlog('hash', 1000)
+        assert set(ids) <= {r['id'] for r in backlog}
+        vectors = embed_texts([embed_input(r['text'], r['summary']) for r in backlog], 'hash')
+        store_embeddings('hash', [(r['id'], pack(v)) for r, v in zip(backlog, vectors)])
+        assert embedding_backlog('hash', 1000) == []
+        assert embedding_backlog('other', 1000, after_id=ids[1])[0]['id'] == ids[2]
+
+        qvec = embed_texts(['rotate passkeys'], 'hash')[0]
+        info = {}
+        rows = semantic_search(qvec, 'hash', limit=2, info=info)
+        assert info['plan'] == 'semantic'
+        assert {r['id'] for r in rows} == set(ids[:2])
+        assert semantic_search(qvec, 'hash', limit=5, domain='ops')[0]['id'] == ids[1]
+
+        rows = hybrid_search('passkey', qvec, 'hash', limit=3)
+        assert rows[0]['id'] in ids[:2] and rows[0]['rank'] is None
+        update_rsp_summary(ids[0], 'auth', ['auth'], {})
+        assert [r['id'] for r in embedding_backlog('hash', 1000)] == [ids[0]]
+
+
+def test_near_duplicates_link_to_canonical_and_collapse():
+    from hub.db import find_near_dup, packet_summary, collapse_near_dups
+
+    text = "Quarterly zephyrine audit: reconcile the ledger against vendor invoices before Friday."
+    with app.app_context():
+        first = insert_rsps([{'conv_id':'nd','turn':1,'role':'user','date':'2024-07-01',
+                              'text':text,'summary':'audit ledger','keywords':'["audit"]',
+                              'tags':'[]','tokens':12,'domain':'finance','topic':'audit'}])[0]
+        assert first['near_dup_of'] is None
+        near = find_near_dup(text + " Thanks!")
+        assert near['id'] == first['id'] and near['similarity'] >= 0.85
+        assert find_near_dup("Completely unrelated musings about alpine hiking trails.") is None
+
+        summary, kw, meta = packet_summary(first['id'])
+        assert summary == 'audit ledger' and kw == ['audit'] and meta['domain'] == 'finance'
+
+        second = insert_rsps([{'conv_id':'nd','turn':2,'role':'user','date':'2024-07-02',
+                               'text':text + " Thanks!",'summary':summary,
+                               'keywords':'["audit"]','tags':'[]','tokens':13}])[0]
+        assert second['near_dup_of'] == first['id']
+        rows = search_rsps('zephyrine', [], 10)
+        assert len(rows) == 2
+        kept = collapse_near_dups(rows)
+        assert len(kept) == 1 and kept[0]['near_dups'] == 1
+
+
+def test_facet_counts_materialised_and_matched():
+    from hub.db import facet_counts, rebuild_facets
+
+    def counts(facets, dim):
+        return {f['value']: f['count'] for f in facets[dim]}
+
+    with app.app_context():
+        ids = [r['id'] for r in insert_rsps([
+            {'conv_id':'fc','turn':i,'role':'user','date':'2024-08-0%d' % (i + 1),
+             'text':'facet sample %s' % text,'summary':'','keywords':'[]','tags':'[]',
+             'tokens':3,'domain':dom,'topic':top}
+            for i, (text, dom, top) in enumerate([
+                ('quince jam', 'fcdom-a', 'fctop-x'),
+                ('quince tart', 'fcdom-a', 'fctop-y'),
+                ('pear cider', 'fcdom-b', 'fctop-x'),
+            ])
+        ])]
+        info = {}
+        facets = facet_counts(info=info)
+        assert info['plan'] == 'materialised'
+        assert counts(facets, 'domain')['fcdom-a'] == 2
+        assert counts(facets, 'topic')['fctop-x'] == 2
+
+        facets = facet_counts(domain='fcdom-a', info=info)
+        assert info['plan'] == 'materialised'
+        assert counts(facets, 'topic') == {'fctop-x': 1, 'fctop-y': 1}
+        assert counts(facets, 'domain')['fcdom-b'] == 1  # own filter ignored
+
+        facets = facet_counts('quince', info=info)
+        assert info['plan'] == 'matched'
+        assert counts(facets, 'domain') == {'fcdom-a': 2}
+        facets = facet_counts(conv_id='fc', topic='fctop-x', info=info)
+        assert counts(facets, 'domain') == {'fcdom-a': 1, 'fcdom-b': 1}
+        assert counts(facets, 'topic') == {'fctop-x': 2, 'fctop-y': 1}
+        assert facet_counts(domain='no-such-domain', info=info)['topic'] == []
+
+        update_rsp_summary(ids[2], 'cider', ['cider'], {'domain': 'fcdom-a', 'topic': 'fctop-x'})
+        facets = facet_counts(domain='fcdom-a')
+        assert counts(facets, 'topic') == {'fctop-x': 2, 'fctop-y': 1}
+        assert 'fcdom-b' not in counts(facets, 'domain')
+        before = facet_counts(limit=1000)
+        rebuild_facets()
+        assert facet_counts(limit=1000) == before
+
+
+def test_snippets_highlight_matches_and_fetch_rsp():
+    from hub.db import add_snippets, fetch_rsp
+
+    text = "Preamble words. " * 20 + "The xylocarp harvest was late this year. " + "Tail. " * 20
+    with app.app_context():
+        rowid = insert_rsp({'conv_id':'sn','turn':1,'role':'assistant','date':'2024-09-01',
+                            'text':text,'summary':'xylocarp harvest','keywords':'[]',
+                            'tags':'[]','tokens':40,'domain':'farm','topic':'snippets'})
+        rows = search_rsps('xylocarp', [], 10)
+        add_snippets('xylocarp', rows, '[', ']')
+        assert '[xylocarp]' in rows[0]['snippet']
+        assert len(rows[0]['snippet']) < len(text) // 4
+        assert rows[0]['highlight'] == '[xylocarp] harvest'
+
+        rows = [dict(rows[0])]
+        add_snippets('"unbalanced', rows)  # not valid FTS syntax
+        assert rows[0]['snippet'].startswith('Preamble words.')
+        assert rows[0]['highlight'] == 'xylocarp harvest'
+
+        row = fetch_rsp(rowid)
+        assert row['text'] == text and row['domain'] == 'farm'
+        assert fetch_rsp(10 ** 9) is None
+
+
+def test_text_is_compressed_at_rest_and_read_back_plain():
+    from hub.db import fetch_conversation, fetch_rsp
+
+    text = "Compressed quokka notes: " + "the quokka eats leaves and grass at night. " * 10
+    with app.app_context():
+        rowid = insert_rsp({'conv_id':'cz','turn':1,'role':'assistant','date':'2024-10-01',
+                            'text':text,'summary':'','keywords':'[]','tags':'[]','tokens':60})
+        stored = execute("SELECT typeof(text) AS t, length(text) AS n FROM rsp WHERE id=?", rowid)[0]
+        assert stored['t'] == 'blob' and stored['n'] < len(text) // 2
+        assert search_rsps('quokka', [], 5)[0]['text'] == text
+        assert fetch_conversation('cz')[0]['text'] == text
+        assert fetch_rsp(rowid)['text'] == text
+        assert find_rsp('cz', 1, text) == rowid
+        update_rsp_summary(rowid, 'quokka diet', ['quokka'], {})
+        assert search_rsps('quokka diet', [], 5)[0]['id'] == rowid
+
+
+def test_migrate_plain_archive_to_compressed_text(tmp_path):
+    from hub.db import fetch_rsp, recompress_text, text_stats, train_text_dict, use_text_view
+
+    old_app = Flask(__name__)
+    old_app.config['DB_PATH'] = str(tmp_path / 'old.sqlite')
+    old_app.config['TEXT_COMPRESSION'] = 'none'
+    init_app(old_app)
+    texts = ["Sure! Here is how to tune the wombat burrow heater, step %d. " % i * 4
+             for i in range(30)]
+    with old_app.app_context():
+        ensure_schema()
+        conn = get_db()
+        # archives from before compression index ``rsp`` directly
+        conn.execute("DROP TABLE rsp_fts")
+        conn.execute("CREATE VIRTUAL TABLE rsp_fts USING fts5(text, summary, "
+                     "tokenize='trigram', content='rsp', content_rowid='id')")
+        conn.commit()
+        insert_rsps([{'conv_id':'m','turn':i,'role':'user','date':'2024-10-02','text':t,
+                      'summary':'','keywords':'[]','tags':'[]','tokens':40}
+                     for i, t in enumerate(texts)])
+        assert text_stats()['compressed_rows'] == 0
+
+        assert use_text_view() and not use_text_view()
+        assert train_text_dict('zlib', samples=20)['samples'] == 20
+        result = recompress_text('zlib', batch=7)
+        assert result['rows'] == 30 and result['bytes_after'] < result['bytes_before']
+        stats = text_stats()
+        assert stats['fts_on_view'] and stats['compressed_rows'] == 30 and stats['ratio'] > 2
+        rows = search_rsps('"step 17."', [], 5)
+        assert [r['text'] for r in rows] == [texts[17]]
+        # as if another process had trained it: decode looks it up in text_dict
+        from hub import text_codec
+        digest = execute("SELECT digest FROM text_dict")[0]['digest']
+        del text_codec._DICTS[digest]
+        assert fetch_rsp(rows[0]['id'])['text'] == texts[17]
+        assert digest in text_codec._DICTS
+    _POOLS[old_app.config['DB_PATH']].close_all()
+
+
+def test_id_cache_drops_oldest_keyword_sets_first():
+    from hub.db import IdCache
+
+    cache = IdCache(max_keyword_sets=3)
+    cache.remember({}, {'a': 1, 'b': 2})
+    cache.remember({('domain', 'x'): 7}, {'c': 3, 'd': 4, 'e': 5})
+    assert cache.keyword_sets('abcde') == {'c': 3, 'd': 4, 'e': 5}
+    assert cache.dims([('domain', 'x')]) == {('domain', 'x'): 7}
+
+
+def test_file_db_uses_pooled_wal_connection(tmp_path):
+    file_app = Flask(__name__)
+    file_app.config['DB_PATH'] = str(tmp_path / 'pool.sqlite')
+    init_app(file_app)
+    with file_app.app_context():
+        ensure_schema()
+        conn = get_db()
+        assert get_db() is conn
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    with file_app.app_context():
+        assert get_db() is conn  # returned on teardown and reused
+    pool = _POOLS[file_app.config['DB_PATH']]
+    assert pool.opened == 1
+    pool.close_all()
+
+
+def test_id_cache_serves_repeat_dimension_lookups():
+    with app.app_context():
+        cache = get_id_cache()
+        warm_id_caches()
+        assert cache.dims([('domain', 'test')])
+        before = cache.stats()
+        insert_rsp({'conv_id':'8','turn':1,'role':'user','date':'2024-05-01',
+                    'text':'cached dims','summary':'','keywords':'[]','tags':'[]',
+                    'tokens':2,'domain':'test','topic':'unit'})
+        after = cache.stats()
+        assert after['hits'] - before['hits'] == 3  # domain, topic, keyword set
+        assert after['misses'] == before['misses']
+
+
+def test_search_keyset_pagination():
+    with app.app_context():
+        ids = [r['id'] for r in insert_rsps([
+            {'conv_id':'9','turn':i,'role':'user','date':'2024-06-01',
+             'text':f'pager {i}','summary':'','keywords':'[]','tags':'[]','tokens':2}
+            for i in range(5)])]
+        for extra in ({}, {'conv_id': '9'}):
+            seen, cursor = [], None
+            while True:
+                page = search_rsps('pager', [], 2, cursor=cursor, **extra)
+                seen.extend(r['id'] for r in page)
+                if len(page) < 2:
+                    break
+                cursor = encode_cursor(page[-1]['rank'], page[-1]['id'])
+            assert sorted(seen) == sorted(ids)
+            assert len(seen) == len(set(seen))
+        assert decode_cursor(encode_cursor(-1.5, 3)) == (-1.5, 3)
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor')
+
+
+def test_search_planner_drives_from_rare_filter():
+    with app.app_context():
+        insert_rsps([
+            {'conv_id':'10','turn':i,'role':'user','date':'2024-07-01',
+             'text':f'common term {i}','summary':'','keywords':'[]','tags':'[]','tokens':3,
+             'domain':'plan','topic':'rare' if i == 3 else 'busy'}
+            for i in range(20)])
+        info = {}
+        res = search_rsps('common term', [], 10, topic='rare', explain=True, info=info)
+        assert [r['text'] for r in res] == ['common term 3']
+        assert info['plan'] == 'filter'
+        assert any('rsp_topic_idx' in d for d in info['query_plan'])
+        info = {}
+        res = search_rsps('common', [], 50, domain='plan', info=info)
+        assert info['plan'] == 'fts'
+        assert len(res) == 20
+        assert search_rsps('common', [], 10, topic='no-such-topic') == []
+
+
+def test_slow_search_finds_typos():
+    with app.app_context():
+        rowid = insert_rsp({'conv_id':'11','turn':1,'role':'user','date':'2024-08-01',
+                            'text':'renewing credentials for the gateway','summary':'',
+                            'keywords':'["credentials"]','tags':'[]','tokens':5})
+        assert search_rsps('credentails', [], 5) == []
+        info = {}
+        res = search_rsps('credentails', [], 5, slow=True, info=info)
+        assert [r['id'] for r in res] == [rowid]
+        assert res[0]['rank'] is None and res[0]['fuzzy'] > 1
+        assert 'credentials' in info['corrections']['credentails']
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.embeddings import VectorIndex, hash_embedding, pack, rrf, unpack
+
+
+def test_hash_embedding_is_normalised_and_deterministic():
+    a = hash_embedding("renewing credentials")
+    assert a == hash_embedding("renewing credentials")
+    assert abs(sum(v * v for v in a) - 1.0) < 1e-6
+    near = hash_embedding("renew the credential")
+    far = hash_embedding("banana bread recipe")
+    dot = lambda x, y: sum(p * q for p, q in zip(x, y))
+    assert dot(a, near) > dot(a, far)
+
+
+def test_pack_roundtrip():
+    vec = [0.5, -0.25, 1.0]
+    assert list(unpack(pack(vec))) == vec
+
+
+def test_vector_index_search_and_replace():
+    index = VectorIndex()
+    index.add([(1, 10, pack([1.0, 0.0])), (2, 11, pack([0.0, 1.0]))])
+    assert [i for i, _ in index.search([0.9, 0.1], 2)] == [10, 11]
+    index.add([(3, 10, pack([0.0, -1.0]))])  # re-embedded row
+    assert len(index) == 2 and index.last_seq == 3
+    assert index.search([0.9, 0.1], 1)[0][0] == 11
+
+
+def test_rrf_prefers_items_ranked_by_both():
+    fused = rrf([[1, 2, 3], [4, 1, 3]])
+    assert [i for i, _ in fused][:2] == [1, 3]
+
+
+def test_vector_index_grows_and_replaces_in_place(monkeypatch):
+    import pytest
+    import hub.embeddings as embeddings
+
+    for numpy in (embeddings.np, None):
+        if numpy is None and embeddings.np is None:
+            continue
+        monkeypatch.setattr(embeddings, 'np', numpy)
+        index = VectorIndex()
+        index.add((i, i, pack([1.0, i / 2000.0])) for i in range(1, 1501))
+        assert len(index) == 1500 and index.search([0.0, 1.0], 1)[0][0] == 1500
+        matrix = index._matrix
+        index.add([(1501, 3, pack([0.0, 1.0]))])  # re-embedded: same row, same storage
+        assert index._matrix is matrix and len(index) == 1500
+        assert index.search([0.0, 1.0], 1)[0] == (3, pytest.approx(1.0))
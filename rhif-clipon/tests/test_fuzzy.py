@@ -0,0 +1,22 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.fuzzy import bounded_levenshtein, corrections, score_text, words
+
+
+def test_bounded_levenshtein():
+    assert bounded_levenshtein('token', 'token', 1) == 0
+    assert bounded_levenshtein('tokn', 'token', 1) == 1
+    assert bounded_levenshtein('credentails', 'credentials', 2) == 2
+    assert bounded_levenshtein('apple', 'orange', 2) == 3
+
+
+def test_corrections_prefers_close_and_common_words():
+    vocab = [('token', 5), ('taken', 50), ('tokens', 1), ('banana', 9)]
+    assert corrections('tokn', vocab) == [('token', 1)]  # short words allow one edit
+    vocab = [('refreshes', 10), ('refresh', 2), ('refrain', 5)]
+    assert corrections('refreshh', vocab) == [('refresh', 1), ('refreshes', 2)]
+    assert corrections('refreshh', vocab, max_results=1) == [('refresh', 1)]
+    assert words('Hi, Token-refresh 42!') == {'token', 'refresh'}
+    assert score_text('token refresh', {'tokn': [('token', 1)], 'refresh': []}) == 1.0 + 0.75
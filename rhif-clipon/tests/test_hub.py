@@ -0,0 +1,303 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+os.environ.setdefault('DB_PATH', ':memory:')
+os.environ.setdefault('SUMMARY_CACHE_PATH', '')
+os.environ.setdefault('OLLAMA_HOST', '127.0.0.1:9')
+
+import pytest
+
+import hub.hub as hub_app
+from hub.db import ensure_schema
+
+LONG = ("The ingest test turn describes a lengthy troubleshooting session about "
+        "rotating signing certificates on the staging cluster without downtime.")
+
+with hub_app.app.app_context():
+    ensure_schema()
+
+
+@pytest.fixture
+def client():
+    return hub_app.app.test_client()
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    calls = []
+
+    def fake(text, model, kw_count, summary_tokens, role=None):
+        calls.append(text)
+        return 'model summary', ['model'], {'domain': 'hubtest'}
+
+    monkeypatch.setattr(hub_app, 'summarise_routed', fake)
+    return calls
+
+
+def test_ingest_duplicate_turn_returns_409_without_model_call(client, model_calls):
+    turn = {'conv_id': 'hub-dup', 'turn': 1, 'role': 'user', 'text': LONG}
+    first = client.post('/ingest', json=turn)
+    assert first.status_code == 200 and len(model_calls) == 1
+    skipped = client.get('/stats').get_json()['llm_calls_skipped']
+
+    again = client.post('/ingest', json=turn)
+    assert again.status_code == 409
+    assert again.get_json() == {'ok': False, 'dup': True, 'id': first.get_json()['id']}
+    assert len(model_calls) == 1
+    assert client.get('/stats').get_json()['llm_calls_skipped'] == skipped + 1
+
+
+def _failing_model(error):
+    def fake(*args, **kwargs):
+        raise error
+    return fake
+
+
+def test_overloaded_model_falls_back_to_local_summary(monkeypatch):
+    monkeypatch.setattr(hub_app, 'summarise_routed',
+                        _failing_model(hub_app.ollama.ResponseError('busy', 503)))
+    with hub_app.app.app_context():
+        summary, kw, meta = hub_app._summarise(LONG)
+    assert summary and kw
+
+
+def test_timeout_falls_back_to_local_summary(monkeypatch):
+    monkeypatch.setattr(hub_app, 'summarise_routed_batch',
+                        _failing_model(hub_app.httpx.ReadTimeout('slow')))
+    rows = [{'text': LONG, 'role': 'user'}]
+    with hub_app.app.app_context():
+        hub_app._summarise_rows(rows)
+    assert rows[0]['summary']
+
+
+def test_missing_model_is_not_hidden_by_fallback(monkeypatch, caplog):
+    error = hub_app.ollama.ResponseError("model 'nope' not found", 404)
+    monkeypatch.setattr(hub_app, 'summarise_routed', _failing_model(error))
+    monkeypatch.setattr(hub_app, 'summarise_routed_batch', _failing_model(error))
+    with hub_app.app.app_context():
+        with pytest.raises(hub_app.ollama.ResponseError):
+            hub_app._summarise(LONG)
+        with pytest.raises(hub_app.ollama.ResponseError):
+            hub_app._summarise_rows([{'text': LONG, 'role': 'user'}])
+    assert hub_app.app.config['OLLAMA_MODEL'] in caplog.text
+
+
+def test_failing_embed_model_is_reported_once_per_backlog(client, model_calls, monkeypatch):
+    assert hub_app.app.config['EMBED_MODEL'] == ''  # opt-in
+    calls = []
+
+    def broken(texts, model):
+        calls.append(len(texts))
+        raise ConnectionError('embedding server down')
+
+    monkeypatch.setitem(hub_app.app.config, 'EMBED_MODEL', 'broken-embed')
+    monkeypatch.setattr(hub_app, 'embed_texts', broken)
+    monkeypatch.setattr(hub_app, '_EMBED_RETRY_AT', 0.0)
+    jobs = hub_app.get_job_queue()
+    failed = jobs.stats()['failed']
+    for turn in range(3):
+        text = f"Embedding outage turn {turn} covers quarterly zeppelin maintenance logs."
+        client.post('/ingest', json={'conv_id': 'hub-embed', 'turn': turn,
+                                     'role': 'user', 'text': text})
+        jobs._queue.join()
+    assert len(calls) == 1
+    assert jobs.stats()['failed'] == failed + 1
+
+
+def _facet(client, dim, value, **args):
+    body = client.get('/facets', query_string={'limit': 500, **args}).get_json()
+    return next((f['count'] for f in body['facets'][dim] if f['value'] == value), 0)
+
+
+def test_facets_follow_resummarise_and_delete(client, monkeypatch):
+    def fake(text, model, kw_count, summary_tokens, role=None):
+        return 'facet summary', ['facet'], {'domain': 'facetdomain', 'topic': 'alpha'}
+
+    monkeypatch.setattr(hub_app, 'summarise_routed', fake)
+    ids = []
+    for turn, animal in enumerate(['quokka', 'wombat', 'numbat']):
+        text = f"The facet test turn follows a {animal} across the quokkaland plateau at dusk."
+        resp = client.post('/ingest', json={'conv_id': 'hub-facets', 'turn': turn,
+                                            'role': 'user', 'text': text})
+        ids.append(resp.get_json()['id'])
+
+    for args in ({}, {'q': 'quokkaland'}):
+        assert _facet(client, 'domain', 'facetdomain', **args) == 3
+        assert _facet(client, 'topic', 'alpha', domain='facetdomain', **args) == 3
+
+    with hub_app.app.app_context():
+        hub_app.update_rsp_summary(ids[0], 'resummarised', ['facet'],
+                                   {'domain': 'facetdomain', 'topic': 'beta'})
+    for args in ({}, {'q': 'quokkaland'}):
+        assert _facet(client, 'topic', 'alpha', domain='facetdomain', **args) == 2
+        assert _facet(client, 'topic', 'beta', domain='facetdomain', **args) == 1
+
+    assert client.delete(f'/rsp/{ids[1]}').get_json() == {'ok': True, 'id': ids[1]}
+    assert client.delete(f'/rsp/{ids[1]}').status_code == 404
+    assert client.get(f'/rsp/{ids[1]}').status_code == 404
+    with hub_app.app.app_context():
+        assert hub_app.vocab_doc_freq(['wombat', 'numbat']) == {'numbat': 1}
+    for args in ({}, {'q': 'quokkaland'}):
+        assert _facet(client, 'domain', 'facetdomain', **args) == 2
+        assert _facet(client, 'topic', 'alpha', domain='facetdomain', **args) == 1
+        assert _facet(client, 'topic', 'beta', domain='facetdomain', **args) == 1
+    hits = client.get('/search', query_string={'q': 'quokkaland', 'collapse': 0},
+                      headers={'Accept': 'application/json'}).get_json()
+    assert sorted(h['id'] for h in hits) == [ids[0], ids[2]]
+
+
+def test_async_ingest_job_can_be_polled(client, model_calls):
+    turn = {'conv_id': 'hub-async', 'turn': 1, 'role': 'user', 'async': True,
+            'text': "The async test turn audits the hydroponic greenhouse valve schedule."}
+    resp = client.post('/ingest', json=turn)
+    assert resp.status_code == 202
+    body = resp.get_json()
+    hub_app.get_job_queue()._queue.join()
+
+    job = client.get(f"/jobs/{body['job']}").get_json()
+    assert job['status'] == 'done' and job['rsp_id'] == body['id']
+    assert client.get(f"/rsp/{body['id']}").get_json()['summary'] == 'model summary'
+    assert client.get('/jobs/no-such-job').status_code == 404
+
+
+def test_async_ingest_losing_the_last_slot_returns_503(client, model_calls, monkeypatch):
+    jobs = hub_app.JobQueue(0, 1)
+    jobs.submit(lambda: None)  # no workers, so the only slot stays taken
+    monkeypatch.setattr(jobs, 'full', lambda: False)  # another request saw room
+    monkeypatch.setattr(hub_app, 'get_job_queue', lambda: jobs)
+    turn = {'conv_id': 'hub-race', 'turn': 1, 'role': 'user', 'async': True,
+            'text': "The race test turn inventories the lighthouse lens polishing kit."}
+
+    resp = client.post('/ingest', json=turn)
+    assert resp.status_code == 503 and resp.headers['Retry-After'] == '1'
+    with hub_app.app.app_context():
+        assert hub_app.find_rsp('hub-race', 1, turn['text']) is None
+    assert jobs.stats()['submitted'] == 1
+
+
+def test_async_ingest_batch_counts_only_queued_rows_against_capacity(client, model_calls,
+                                                                     monkeypatch):
+    jobs = hub_app.JobQueue(0, 2)
+    jobs.submit(lambda: None)  # one of the two slots stays taken
+    texts = [f"The capacity test turn {i} weighs {word} crates at the harbour."
+             for i, word in enumerate(['marmalade', 'tarpaulin', 'anchovy'])]
+    stored = client.post('/ingest', json={'conv_id': 'hub-cap', 'turn': 0,
+                                          'role': 'user', 'text': texts[0]}).get_json()['id']
+    monkeypatch.setattr(hub_app, 'get_job_queue', lambda: jobs)
+    turns = [{'conv_id': 'hub-cap', 'turn': i, 'role': 'user', 'text': t}
+             for i, t in enumerate(texts)]
+
+    resp = client.post('/ingest_batch?async=1', json={'turns': turns})
+    assert resp.status_code == 413
+    resp = client.post('/ingest_batch?async=1', json={'turns': turns[1:]})
+    assert resp.status_code == 503 and resp.headers['Retry-After'] == '1'
+    # the duplicate needs no job, so the pair fits in the one free slot
+    resp = client.post('/ingest_batch?async=1', json={'turns': turns[:2]})
+    assert resp.status_code == 200
+    results = resp.get_json()['results']
+    assert results[0]['dup'] and results[0]['id'] == stored
+    assert results[1]['ok'] and 'job' in results[1]
+
+
+def test_ingest_batch_reports_each_turn_and_batches_the_model(client, monkeypatch):
+    batches = []
+
+    def fake_batch(texts, model, kw_count, summary_tokens, roles=None):
+        batches.append(list(texts))
+        return [(f'batch summary {i}', ['batch'], {'domain': 'hubbatch'})
+                for i in range(len(texts))]
+
+    monkeypatch.setattr(hub_app, 'summarise_routed_batch', fake_batch)
+    texts = [
+        "The batch test turn catalogues antique barometers in the museum annex.",
+        "The batch test turn schedules oboe reed shaving lessons for the quartet.",
+        "The batch test turn compares sourdough hydration across three flours.",
+    ]
+    stored = client.post('/ingest_batch', json={'turns': [
+        {'conv_id': 'hub-batch', 'turn': 0, 'role': 'user', 'text': texts[0]},
+    ]}).get_json()['results'][0]['id']
+    batches.clear()
+
+    resp = client.post('/ingest_batch', json={'turns': [
+        {'conv_id': 'hub-batch', 'turn': 0, 'role': 'user', 'text': texts[0]},
+        {'conv_id': 'hub-batch', 'turn': 1, 'role': 'user', 'text': texts[1]},
+        {'conv_id': 'hub-batch', 'turn': 2, 'role': 'user', 'text': '   '},
+        {'conv_id': 'hub-batch', 'role': 'user', 'text': 'no turn number here'},
+        'not a turn',
+        {'conv_id': 'hub-batch', 'turn': 3, 'role': 'assistant', 'text': texts[2]},
+    ]})
+    assert resp.status_code == 200
+    body = resp.get_json()
+    results = body['results']
+    assert results[0] == {'ok': False, 'dup': True, 'id': stored}
+    assert results[1]['ok'] and results[5]['ok']
+    assert results[2] == {'ok': False, 'error': 'empty text'}
+    assert results[3] == {'ok': False, 'error': 'missing turn'}
+    assert results[4] == {'ok': False, 'error': 'turn must be an object'}
+    assert body['inserted'] == 2 and body['duplicates'] == 1
+    assert batches == [[texts[1], texts[2]]]  # one model call for both new turns
+    row = client.get(f"/rsp/{results[5]['id']}").get_json()
+    assert row['summary'] == 'batch summary 1'
+
+
+def test_ingest_computes_minhash_signature_once(client, model_calls, monkeypatch):
+    import hub.minhash as minhash
+
+    calls = []
+    real = minhash.signature
+
+    def counting(text):
+        calls.append(len(text))
+        return real(text)
+
+    monkeypatch.setattr(hub_app, 'signature', counting)
+    monkeypatch.setattr(minhash, 'signature', counting)
+    text = "The signature test turn lists every tram depot on the northern loop. " * 20
+    resp = client.post('/ingest', json={'conv_id': 'hub-sig', 'turn': 1,
+                                        'role': 'user', 'text': text})
+    assert resp.status_code == 200
+    assert len(calls) == 1
+
+
+def test_collapsed_search_pages_are_full_and_never_repeat_a_cluster(client, model_calls):
+    topics = [
+        "zorblatt boiler pressure drops overnight whenever the feed pump cycles twice",
+        "zorblatt turbine blades show pitting after the salt spray storm in march",
+        "zorblatt condenser tubes need rodding because cooling water fouled them badly",
+        "zorblatt pump seals weep oil onto the plinth during every cold morning start",
+        "zorblatt valve actuators stick halfway open when the instrument air is damp",
+    ]
+    turns = []
+    for n, topic in enumerate(topics):
+        copies = 3 if n < 3 else 1  # three clusters of three, two singletons
+        for c in range(copies):
+            text = f"The paging test notes that the {topic}." + " Thanks!" * c
+            turns.append({'conv_id': f'hub-paging-{c}', 'turn': n, 'role': 'user',
+                          'text': text})
+    ids = [r['id'] for r in client.post('/ingest_batch', json={'turns': turns})
+           .get_json()['results']]
+    with hub_app.app.app_context():
+        links = hub_app.near_dup_links(ids)
+    cluster = {i: links.get(i, i) for i in ids}
+    assert len(set(cluster.values())) == 5
+
+    pages, cursor = [], None
+    while True:
+        args = {'q': 'zorblatt', 'limit': 2, 'fields': 'id', **({'cursor': cursor} if cursor else {})}
+        resp = client.get('/search', query_string=args, headers={'Accept': 'application/json'})
+        pages.append([r['id'] for r in resp.get_json()])
+        cursor = resp.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+        assert len(pages) < 10
+    shown = [cluster[i] for page in pages for i in page]
+    assert [len(p) for p in pages[:-1]] == [2] * (len(pages) - 1)
+    assert len(shown) == len(set(shown)) == 5
+
+    uncollapsed = client.get('/search', query_string={'q': 'zorblatt', 'limit': 20,
+                                                      'collapse': 0, 'fields': 'id'},
+                             headers={'Accept': 'application/json'}).get_json()
+    assert len(uncollapsed) == len(ids)
@@ -0,0 +1,126 @@
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'tools'))
+
+os.environ.setdefault('DB_PATH', ':memory:')
+os.environ.setdefault('SUMMARY_CACHE_PATH', '')
+os.environ.setdefault('OLLAMA_HOST', '127.0.0.1:9')
+
+import pytest
+
+import hub.hub as hub_app
+import ingest_export
+from hub.db import (_POOLS, ensure_schema, execute, rebuild_minhash, search_rsps, vocab_doc_freq,
+                    write_generation)
+
+TEXT = ("The direct load turn {n} recounts how the xylophonist tuned every bar "
+        "of the marimba before the harbour festival opened on saturday.")
+
+
+@pytest.fixture
+def direct_app(tmp_path, monkeypatch):
+    path = str(tmp_path / 'direct.sqlite')
+    monkeypatch.setitem(hub_app.app.config, 'DB_PATH', path)
+    with hub_app.app.app_context():
+        ensure_schema()
+    yield hub_app.app
+    _POOLS.pop(path).close_all()
+
+
+def _turns(count):
+    for n in range(count):
+        yield {'conv_id': 'direct', 'turn': n, 'role': 'user', 'date': '',
+               'text': TEXT.format(n=n), 'tags': ['#legacy']}
+
+
+def test_direct_load_defers_then_rebuilds_derived_indexes(direct_app):
+    inserted, duplicates = ingest_export.ingest_direct(direct_app, _turns(5), commit_every=2)
+    assert (inserted, duplicates) == (5, 0)
+    with direct_app.app_context():
+        rows = execute("SELECT id, date, summary FROM rsp ORDER BY id")
+        assert {r['date'] for r in rows} == {date.today().isoformat()}
+        assert all(r['summary'] is None for r in rows)
+        assert len(search_rsps('xylophonist', [], 10)) == 5
+        assert vocab_doc_freq(['xylophonist']) == {'xylophonist': 5}
+        assert rebuild_minhash() == 0  # signatures already rebuilt
+        linked = execute("SELECT COUNT(*) AS n FROM rsp_minhash WHERE canonical_id IS NOT NULL")
+        assert linked[0]['n'] == 4
+    assert ingest_export.ingest_direct(direct_app, _turns(5), commit_every=2) == (0, 5)
+
+
+def test_direct_load_skips_turns_the_hub_already_summarised(direct_app):
+    from hub.db import insert_rsps
+    from hub.hub import _row_from_payload
+
+    stored = [dict(_row_from_payload(t), summary='hub summary', keywords='["hub"]',
+                   domain='music') for t in _turns(2)]
+    with direct_app.app_context():
+        insert_rsps(stored)
+    # the summary's meta changes the hash, so only the turn and text match
+    assert ingest_export.ingest_direct(direct_app, _turns(3), commit_every=10) == (1, 2)
+
+
+def test_short_turns_get_minhash_placeholders_once(direct_app):
+    short = [{'conv_id': 'direct-short', 'turn': n, 'role': 'user', 'date': '',
+              'text': f'ok {n}'} for n in range(3)]
+    assert ingest_export.ingest_direct(direct_app, short, commit_every=10) == (3, 0)
+    with direct_app.app_context():
+        placeholders = execute("SELECT COUNT(*) AS n FROM rsp_minhash WHERE sig = x''")
+        assert placeholders[0]['n'] == 3
+        before = write_generation()
+        assert rebuild_minhash() == 0
+        assert write_generation() == before
+
+
+def test_pending_only_summarises_rows_left_by_defer(direct_app, tmp_path, monkeypatch):
+    export = tmp_path / 'export'
+    export.mkdir()
+    (export / 'conversations.json').write_text('[]')
+    ingest_export.ingest_direct(direct_app, _turns(3), commit_every=10)
+    calls = []
+
+    def fake_batch(texts, model, kw_count, summary_tokens, roles=None):
+        calls.append(len(texts))
+        return [('pending summary', ['pending'], {'domain': 'backfill'}) for _ in texts]
+
+    monkeypatch.setattr(hub_app, 'summarise_routed_batch', fake_batch)
+    monkeypatch.setattr(ingest_export, '_direct_app', lambda path: direct_app)
+    monkeypatch.setattr(sys, 'argv', ['ingest_export', '--export-dir', str(export),
+                                      '--direct', direct_app.config['DB_PATH'],
+                                      '--pending', 'only', '--batch', '8'])
+    ingest_export.main()
+
+    assert sum(calls) == 3
+    with direct_app.app_context():
+        rows = execute("SELECT summary FROM rsp")
+        assert [r['summary'] for r in rows] == ['pending summary'] * 3
+        assert len(search_rsps('pending summary', [], 10, domain='backfill')) == 3
+
+
+def test_batch_checkpoint_marks_only_turns_the_hub_stored(tmp_path, monkeypatch, capsys):
+    import json
+
+    export = tmp_path / 'export'
+    export.mkdir()
+    mapping = {str(n): {'message': {'author': {'role': 'user'},
+                                    'content': {'content_type': 'text', 'parts': [f'turn {n}']}}}
+               for n in range(3)}
+    (export / 'conversations.json').write_text(json.dumps([{'id': 'ckpt', 'mapping': mapping}]))
+
+    def fake_batch(hub, turns):
+        return 0.5, [{'ok': True, 'id': 1}, {'ok': False, 'dup': True, 'id': 2},
+                     {'ok': False, 'error': 'queue full'}]
+
+    monkeypatch.setattr(ingest_export, 'ingest_batch', fake_batch)
+    monkeypatch.setattr(sys, 'argv', ['ingest_export', '--export-dir', str(export),
+                                      '--batch', '3'])
+    ingest_export.main()
+
+    lines = (export / 'ingest_checkpoint.jsonl').read_text().splitlines()
+    assert [json.loads(line) for line in lines] == [['ckpt', 1], ['ckpt', 2]]
+    out = capsys.readouterr().out
+    assert 'Packets ingested: 2' in out and 'Failed: 1' in out
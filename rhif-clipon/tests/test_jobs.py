@@ -0,0 +1,39 @@
+import sys
+import threading
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.jobs import JobQueue
+
+
+def test_job_queue_runs_and_reports():
+    q = JobQueue(2, 10)
+    done = threading.Event()
+    ok = q.submit(done.set, rsp_id=7)
+    bad = q.submit(lambda: 1 / 0)
+    done.wait(2)
+    q._queue.join()
+    assert q.get(ok)['status'] == 'done'
+    assert q.get(ok)['rsp_id'] == 7
+    assert q.get(bad)['status'] == 'failed'
+    assert 'division' in q.get(bad)['error']
+    stats = q.stats()
+    assert stats['done'] == 1 and stats['failed'] == 1 and stats['depth'] == 0
+    assert q.get('missing') is None
+
+
+def test_submit_never_blocks_on_a_full_queue():
+    import queue
+    import pytest
+
+    q = JobQueue(1, 1)
+    started, release = threading.Event(), threading.Event()
+    q.submit(lambda: (started.set(), release.wait(2)))
+    started.wait(2)
+    q.submit(lambda: None)  # waits in the queue, which is now full
+    with pytest.raises(queue.Full):
+        q.submit(lambda: None)
+    assert q.stats()['submitted'] == 2
+    release.set()
+    q._queue.join()
+    assert q.stats()['done'] == 2
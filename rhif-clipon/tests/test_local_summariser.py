@@ -0,0 +1,39 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.local_summariser import local_summarise
+
+
+def test_short_turn_shape():
+    summary, keywords, meta = local_summarise("Thanks, continue please.", 8, 120)
+    assert summary == "Thanks, continue please."
+    assert keywords == ['continue', 'please', 'thanks']
+    assert set(meta) == {'domain', 'topic', 'conversation_type', 'emotion', 'novelty'}
+    assert meta['novelty'] == 0.0
+
+
+def test_idf_ranks_rare_words_first():
+    text = "python python sqlite sqlite index"
+    df = {'python': 90, 'sqlite': 2, 'index': 50}
+    _, keywords, meta = local_summarise(text, 2, 120, lambda words: df, 100)
+    assert keywords == ['sqlite', 'python']
+    assert meta['novelty'] == 0.0
+
+
+def test_long_text_is_extractive_and_bounded():
+    text = (
+        "The weather was nice. "
+        "Database indexes speed up sqlite queries on large tables. "
+        "We had lunch. "
+        "Covering indexes let sqlite answer queries from the index alone."
+    )
+    summary, _, _ = local_summarise(text, 4, 12)
+    assert len(summary.split()) <= 12
+    assert "sqlite" in summary
+
+
+def test_novelty_counts_unseen_words():
+    _, _, meta = local_summarise("alpha beta gamma delta", 4, 120, lambda words: {'alpha': 3}, 10)
+    assert meta['novelty'] == 0.75
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.minhash import BANDS, NUM_PERM, band_keys, pack, signature, similarity, unpack
+
+BASE = "The deployment failed because the migration locked the orders table for ten minutes."
+
+
+def test_near_identical_texts_score_high():
+    a = signature(BASE)
+    b = signature(BASE.replace("ten", "eleven") + " ")
+    c = signature("Sourdough needs a lively starter and a long, cold overnight proof.")
+    assert similarity(a, b) > 0.7
+    assert similarity(a, c) < 0.2
+    assert similarity(a, signature(BASE.upper())) == 1.0  # case and spacing normalised
+
+
+def test_short_text_has_no_signature():
+    assert signature("ok thanks") is None
+    assert signature("") is None
+
+
+def test_band_keys_and_pack_roundtrip():
+    sig = signature(BASE)
+    assert len(sig) == NUM_PERM
+    keys = band_keys(sig)
+    assert len(keys) == BANDS and all(-2 ** 63 <= k < 2 ** 63 for k in keys)
+    assert band_keys(signature(BASE)) == keys
+    assert unpack(pack(sig)) == sig
+
+
+def test_long_texts_are_sampled_consistently():
+    from hub.minhash import MAX_SHINGLES, shingles
+
+    words = [f"w{i:05d}" for i in range(40000)]
+    long_text = " ".join(words)
+    assert len(shingles(long_text)) == MAX_SHINGLES
+    edited = " ".join(words[:-50] + ["tail"] * 50)
+    assert similarity(signature(long_text), signature(edited)) > 0.9
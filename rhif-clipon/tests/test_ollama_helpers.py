@@ -23,3 +23,152 @@ def test_extract_json_code_fence():
     resp = "Response:\n```json\n" + txt + "\n```"
     data = _extract_json(resp)
     assert data['novelty'] == 0
+
+
+def test_extract_json_repairs_quotes_and_newlines():
+    from hub.ollama_helpers import json_recovery_stats
+
+    before = json_recovery_stats().get('repair', 0)
+    resp = 'noise {"summary":“multi\nline”,"keywords":[]} trailing {'
+    data = _extract_json(resp)
+    assert data['summary'] == 'multi\nline'
+    assert json_recovery_stats()['repair'] == before + 1
+
+
+def test_extract_json_reads_single_quoted_dict():
+    from hub.ollama_helpers import json_recovery_stats
+
+    before = json_recovery_stats().get('literal', 0)
+    resp = "Here you go: {'summary': 'single\nquoted', 'keywords': ['a', 'b']}"
+    data = _extract_json(resp)
+    assert data == {'summary': 'single quoted', 'keywords': ['a', 'b']}
+    assert json_recovery_stats()['literal'] == before + 1
+
+
+def test_extract_json_bounded_on_pathological_input():
+    import time
+    import pytest
+
+    start = time.perf_counter()
+    with pytest.raises(ValueError):
+        _extract_json('{"a":' * 20000 + '[' * 20000)
+    assert time.perf_counter() - start < 2
+
+
+def test_summarise_once_uses_cache(tmp_path, monkeypatch):
+    from hub import ollama_helpers
+    from types import SimpleNamespace
+    from hub.summary_cache import SummaryCache
+
+    calls = []
+
+    def fake_generate(**kwargs):
+        calls.append(kwargs)
+        return {'response': '{"summary":"ok","keywords":["a"],"domain":"d","topic":"t",'
+                            '"conversation_type":"c","emotion":"e","novelty":0.5}'}
+
+    monkeypatch.setattr(ollama_helpers, '_CACHE', SummaryCache(str(tmp_path / 'c.sqlite'), 1 << 20))
+    monkeypatch.setattr(ollama_helpers, '_CLIENT', SimpleNamespace(generate=fake_generate))
+    first = ollama_helpers._summarise_once('same text', 'm', 8, 120)
+    second = ollama_helpers._summarise_once('same text', 'm', 8, 120)
+    assert first == second
+    assert len(calls) == 1
+    assert calls[0]['keep_alive'] == ollama_helpers.OLLAMA_KEEP_ALIVE
+
+
+def test_split_text_prefers_paragraph_and_sentence_boundaries():
+    from hub.ollama_helpers import split_text
+
+    paras = ["First para. " * 3, "Second one is here. " * 2, "x" * 50]
+    chunks = split_text("\n\n".join(paras), 60)
+    assert all(len(c) <= 60 for c in chunks)
+    assert chunks[0].startswith("First para.")
+    assert chunks[0].rstrip().endswith(".")
+    assert "".join(chunks).replace("\n", "").replace(" ", "") == \
+        "".join(paras).replace(" ", "")
+
+
+def test_long_text_map_reduce_is_concurrent(monkeypatch):
+    import threading
+    from hub import ollama_helpers
+
+    seen = []
+    lock = threading.Lock()
+
+    def fake_once(text, model, kw_count, summary_tokens):
+        with lock:
+            seen.append(threading.current_thread().name)
+        return "s" * 10, ["k"], {"domain": "d"}
+
+    monkeypatch.setattr(ollama_helpers, "prompt_budget", lambda model, n: 300)
+    monkeypatch.setattr(ollama_helpers, "_summarise_once", fake_once)
+    text = "\n\n".join(["sentence. " * 10] * 40)
+    summary, kw, meta = ollama_helpers.summarise_and_keywords(text, "m", 8, 120)
+    assert kw == ["k"]
+    assert any(name.startswith("summarise") for name in seen)
+    assert seen[-1] == threading.current_thread().name  # final combine call
+
+
+def test_summarise_routed_records_route_stats(monkeypatch):
+    import pytest
+    from hub import ollama_helpers
+    from hub.routing import Router, RouteStats
+
+    stats = RouteStats()
+    router = Router([{'name': 'user', 'model': 'small', 'roles': ['user']}])
+    monkeypatch.setattr(ollama_helpers, 'get_router', lambda: router)
+    monkeypatch.setattr(ollama_helpers, 'get_route_stats', lambda: stats)
+    models = []
+
+    def fake(text, model, kw_count, summary_tokens):
+        models.append(model)
+        if text == 'boom':
+            raise ConnectionError('down')
+        return 'ok', ['k'], {}
+
+    monkeypatch.setattr(ollama_helpers, 'summarise_and_keywords', fake)
+    ollama_helpers.summarise_routed('hello', 'big', 8, 120, 'user')
+    ollama_helpers.summarise_routed('hello', 'big', 8, 120, 'assistant')
+    with pytest.raises(ConnectionError):
+        ollama_helpers.summarise_routed('boom', 'big', 8, 120, 'user')
+    assert models == ['small', 'big', 'small']
+    out = stats.stats()
+    assert out['user']['calls'] == 2 and out['user']['failures'] == 1
+    assert out['default'] == {**out['default'], 'model': 'big', 'calls': 1, 'failures': 0}
+
+
+def test_summarise_batch_falls_back_per_item(monkeypatch):
+    import json
+    from hub import ollama_helpers
+
+    prompts = []
+
+    def fake_generate(prompt, model):
+        prompts.append(prompt)
+        if prompt.startswith("Summarize each"):
+            # second item is malformed, third is missing
+            return json.dumps({'results': [
+                {'id': 1, 'summary': 'one', 'keywords': ['a'], 'novelty': 0.1},
+                {'id': 2, 'summary': '', 'keywords': []},
+            ]})
+        return json.dumps({'summary': 'single', 'keywords': ['s'], 'novelty': 0})
+
+    monkeypatch.setattr(ollama_helpers, '_CACHE', None)
+    monkeypatch.setattr(ollama_helpers, 'SUMMARY_CACHE_PATH', '')
+    monkeypatch.setattr(ollama_helpers, '_generate', fake_generate)
+    results = ollama_helpers.summarise_batch(['first', 'second', 'third'], 'm', 4, 50)
+    assert [r[0] for r in results] == ['one', 'single', 'single']
+    assert results[0][1] == ['a']
+    assert len(prompts) == 3  # one batch + two single-message fallbacks
+    assert 'MESSAGE 3:' in prompts[0]
+
+
+def test_model_loaded_matches_default_tag(monkeypatch):
+    from types import SimpleNamespace
+    from hub import ollama_helpers
+
+    running = SimpleNamespace(models=[SimpleNamespace(model='llama3:latest', name='llama3:latest')])
+    monkeypatch.setattr(ollama_helpers, '_CLIENT', SimpleNamespace(ps=lambda: running))
+    assert ollama_helpers.model_loaded('llama3')
+    assert ollama_helpers.model_loaded('llama3:latest')
+    assert not ollama_helpers.model_loaded('llama3:8b-q5')
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.routing import Router, RouteStats, code_density, load_routes
+
+
+ROUTES = """[
+  {"name": "short-user", "model": "small", "roles": ["user"], "max_tokens": 50},
+  {"name": "code", "model": "coder", "min_code": 0.5},
+  {"name": "long", "min_tokens": 1000}
+]"""
+
+
+def test_code_density():
+    assert code_density("no code here") == 0.0
+    text = "x\n```python\n" + "a = 1\n" * 20 + "```"
+    assert code_density(text) > 0.8
+
+
+def test_routes_pick_first_match():
+    router = Router(load_routes(ROUTES))
+    assert router.pick("big", 10, "thanks", "user") == {'name': 'short-user', 'model': 'small'}
+    assert router.pick("big", 10, "thanks", "assistant") == {'name': 'default', 'model': 'big'}
+    code = "```python\n" + "print(1)\n" * 30 + "```"
+    assert router.pick("big", 200, code, "assistant")['model'] == 'coder'
+    assert router.pick("big", 5000, "prose", "assistant") == {'name': 'long', 'model': 'big'}
+
+
+def test_routes_from_file_and_validation(tmp_path):
+    path = tmp_path / "routes.json"
+    path.write_text('[{"model": "m"}]')
+    assert load_routes(str(path)) == [{'model': 'm', 'name': 'm'}]
+    assert load_routes("") == []
+    with pytest.raises(ValueError):
+        load_routes('[{"model": "m", "max_token": 3}]')
+
+
+def test_route_stats():
+    st = RouteStats()
+    st.record('a', 'm', 1.0, True)
+    st.record('a', 'm', 3.0, False)
+    out = st.stats()['a']
+    assert out['calls'] == 2 and out['failures'] == 1
+    assert out['failure_rate'] == 0.5
+    assert out['mean_seconds'] == 2.0 and out['max_seconds'] == 3.0
@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.search_cache import SearchCache
+
+
+def test_search_cache_generation_and_lru():
+    cache = SearchCache(max_bytes=200)
+    cache.put('a', 1, [{'id': 1}])
+    assert cache.get('a', 1) == [{'id': 1}]
+    assert cache.get('a', 2) is None  # a write happened since
+    assert cache.stats()['entries'] == 0
+    for key in 'bcdefg':
+        cache.put(key, 2, [{'id': 'x' * 60}])
+    stats = cache.stats()
+    assert stats['bytes'] <= 200 and stats['evictions'] > 0
+    assert cache.get('b', 2) is None
+    assert cache.get('g', 2) is not None
+    assert cache.stats()['hits'] == 2
+
+
+def test_search_cache_ttl_is_only_a_fallback(monkeypatch):
+    import hub.search_cache as sc
+    now = [100.0]
+    monkeypatch.setattr(sc.time, 'monotonic', lambda: now[0])
+    cache = SearchCache(max_bytes=1000, ttl=5)
+    cache.put('a', 1, [])
+    cache.put('b', None, [])  # generation unknown
+    now[0] += 4
+    assert cache.get('b', None) == []
+    now[0] += 2
+    assert cache.get('a', 1) == []  # still the current generation
+    assert cache.get('b', None) is None
+    untimed = SearchCache(max_bytes=1000)
+    untimed.put('a', None, [])
+    assert untimed.get('a', None) is None
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.summary_cache import SummaryCache, cache_key
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'c.sqlite'), 1024 * 1024)
+    key = cache_key('hello', 'm', 8, 120)
+    assert cache.get(key) is None
+    cache.put(key, ('hi', ['a'], {'domain': 'x'}))
+    assert cache.get(key) == ('hi', ['a'], {'domain': 'x'})
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    assert cache_key('hello', 'm', 8, 100) != key
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = SummaryCache(str(tmp_path / 'c.sqlite'), 250)
+    for i in range(3):
+        cache.put(f'k{i}', ('x' * 60, [], {}))
+    cache.get('k0')  # refresh k0 so k1 becomes the oldest
+    cache.put('k3', ('x' * 60, [], {}))
+    assert cache.get('k1') is None
+    assert cache.get('k0') is not None
+    assert cache.stats()['bytes'] <= 250
+
+
+def test_cache_hits_do_not_write_until_batched(tmp_path, monkeypatch):
+    import hub.summary_cache as sc
+
+    monkeypatch.setattr(sc, 'TOUCH_BATCH', 3)
+    cache = SummaryCache(str(tmp_path / 'c.sqlite'), 1024 * 1024)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, ('hi', [], {}))
+    writes = cache._conn.total_changes
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    assert cache._conn.total_changes == writes
+    cache.get('c')  # third pending stamp flushes the batch
+    assert cache._conn.total_changes == writes + 3
@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from hub import text_codec
+from hub.text_codec import decode, encode, train_dictionary
+
+SAMPLES = [
+    f"Sure! Here is how you can configure the service.\n\nStep {i}: set option_{i} "
+    f"to {i * 7} and restart.\n\nLet me know if you have any other questions."
+    for i in range(40)
+]
+
+
+def test_roundtrip_and_short_text_stays_plain():
+    text = SAMPLES[0] * 3
+    stored = encode(text)
+    assert isinstance(stored, bytes) and len(stored) < len(text)
+    assert decode(stored) == text
+    assert encode("ok thanks") == "ok thanks"
+    assert decode("plain") == "plain" and decode(None) is None
+
+
+def test_dictionary_shrinks_small_texts():
+    dictionary = train_dictionary(SAMPLES[:30])
+    assert 0 < len(dictionary) <= text_codec.DICT_SIZE
+    plain = sum(len(encode(t)) for t in SAMPLES[30:])
+    with_dict = [encode(t, 'zlib', dictionary) for t in SAMPLES[30:]]
+    assert sum(len(v) for v in with_dict) < plain
+    assert [decode(v) for v in with_dict] == SAMPLES[30:]
+
+
+def test_unknown_dictionary_is_an_error():
+    stored = bytearray(encode(SAMPLES[1], 'zlib', train_dictionary(SAMPLES[:10])))
+    stored[1:9] = b'\xff' * 8
+    with pytest.raises(KeyError):
+        decode(bytes(stored))
+
+
+def test_missing_dictionary_is_fetched_through_the_loader(monkeypatch):
+    dictionary = train_dictionary(SAMPLES[:12])
+    stored = encode(SAMPLES[20], 'zlib', dictionary)
+    did = text_codec.dict_id(dictionary)
+    monkeypatch.delitem(text_codec._DICTS, did)
+    asked = []
+    monkeypatch.setattr(text_codec, '_LOADER', lambda d: asked.append(d) or dictionary)
+    assert decode(stored) == SAMPLES[20]
+    assert decode(stored) == SAMPLES[20]
+    assert asked == [did]  # registered after the first fetch
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub import tokens
+
+
+def test_heuristic_counts_code_punctuation():
+    prose = "the quick brown fox jumps over the lazy dog"
+    code = "if(a[i]){b.c(d,e);}"
+    assert tokens.heuristic_tokens(prose) == 12
+    assert tokens.heuristic_tokens(code) > len(code) / 4
+
+
+def test_model_profiles_and_budget(monkeypatch):
+    monkeypatch.setattr(tokens, 'OLLAMA_NUM_CTX', 0)
+    assert tokens.model_family('llama3.1:8b') == 'llama3.1'
+    assert tokens.model_family('llama3:8b-q5') == 'llama3'
+    assert tokens.model_context('phi3:mini') == 4096
+    assert tokens.model_context('unknown-model') == tokens.DEFAULT_PROFILE['context']
+    assert tokens.prompt_budget('llama3:8b', 120) == 8192 - tokens.PROMPT_OVERHEAD - 340
+    monkeypatch.setattr(tokens, 'OLLAMA_NUM_CTX', 2048)
+    assert tokens.model_context('llama3:8b') == 2048
+    assert tokens.get_estimator('no-tokenizer-here') is tokens.heuristic_tokens
+
+
+def test_legacy_max_prompt_maps_to_a_token_cap(monkeypatch, caplog):
+    assert tokens._legacy_prompt_cap(None) == 0
+    with caplog.at_level('WARNING', logger='tokens'):
+        cap = tokens._legacy_prompt_cap('8000')
+    assert cap == 2000 and 'deprecated' in caplog.text
+    monkeypatch.setattr(tokens, 'OLLAMA_NUM_CTX', 0)
+    monkeypatch.setattr(tokens, 'MAX_PROMPT_TOKENS', cap)
+    assert tokens.prompt_budget('llama3:8b', 120) == 2000
@@ -0,0 +1,152 @@
+"""Compress stored packet text and measure the size/latency tradeoff.
+
+Usage:
+    python compress_text.py ./rhif.sqlite stats
+    python compress_text.py ./rhif.sqlite migrate --codec zlib --vacuum
+    python compress_text.py ./rhif.sqlite bench --samples 500 --queries 50
+
+``migrate`` points ``rsp_fts`` at the decompressing ``rsp_text`` view
+(rebuilding the index once for older archives), trains a dictionary on a
+sample of packets and rewrites every ``rsp.text`` with it. It can be
+re-run later to retrain. Set ``TEXT_COMPRESSION`` to the same codec for
+the hub so new packets use the dictionary too. ``bench`` does not modify
+the database: it compares codecs with and without a dictionary on a
+sample and times searches and conversation fetches as stored now, so run
+it before and after ``migrate``. Stop the hub before migrating.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub import text_codec  # noqa: E402
+from hub.db import (  # noqa: E402
+    ensure_schema, execute, fetch_conversation, init_app, recompress_text, search_rsps,
+    text_stats, train_text_dict, use_text_view,
+)
+
+
+def _ms(samples):
+    """Return mean and p95 of ``samples`` (seconds) in milliseconds."""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {'mean_ms': round(statistics.mean(ordered) * 1000, 3), 'p95_ms': round(p95 * 1000, 3)}
+
+
+def bench_codecs(texts, dict_size):
+    """Compare compression ratio and speed per codec on ``texts``.
+
+    Dictionaries are trained on the first half and measured on the second
+    so the ratio is not flattered by training on the test data.
+    """
+    half = len(texts) // 2
+    train, test = texts[:half], texts[half:]
+    plain = sum(len(t.encode('utf-8')) for t in test)
+    results = {}
+    for codec in ('zlib', 'zstd'):
+        if not text_codec.available(codec):
+            continue
+        for label, dictionary in (('plain', None),
+                                  ('dict', text_codec.train_dictionary(train, codec, dict_size))):
+            start = time.perf_counter()
+            stored = [text_codec.encode(t, codec, dictionary) for t in test]
+            encode_s = time.perf_counter() - start
+            start = time.perf_counter()
+            for value in stored:
+                text_codec.decode(value)
+            decode_s = time.perf_counter() - start
+            size = sum(len(v if isinstance(v, bytes) else v.encode('utf-8')) for v in stored)
+            results[f'{codec}-{label}'] = {
+                'ratio': round(plain / size, 3) if size else None,
+                'encode_us': round(encode_s / len(test) * 1e6, 1),
+                'decode_us': round(decode_s / len(test) * 1e6, 1),
+            }
+    return results
+
+
+def bench_queries(queries):
+    """Time FTS searches and conversation fetches as the archive is stored."""
+    words = [r['word'] for r in execute(
+        "SELECT word FROM rsp_vocab WHERE length(word) >= 4 ORDER BY random() LIMIT ?", queries
+    )]
+    convs = [r['conv_id'] for r in execute(
+        "SELECT conv_id FROM rsp GROUP BY conv_id ORDER BY random() LIMIT ?", queries
+    )]
+    search_s, conv_s = [], []
+    for word in words:
+        start = time.perf_counter()
+        search_rsps(word, [], 20)
+        search_s.append(time.perf_counter() - start)
+    for conv_id in convs:
+        start = time.perf_counter()
+        fetch_conversation(conv_id)
+        conv_s.append(time.perf_counter() - start)
+    out = {}
+    if search_s:
+        out['search'] = _ms(search_s)
+    if conv_s:
+        out['conversation'] = _ms(conv_s)
+    return out
+
+
+def main():
+    """CLI entry point."""
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('db', help="Path to the RHIF SQLite database")
+    sub = ap.add_subparsers(dest='action', required=True)
+    sub.add_parser('stats', help="Show how text is stored and the database size")
+    migrate = sub.add_parser('migrate', help="Train a dictionary and compress all text")
+    migrate.add_argument('--codec', choices=sorted(text_codec.CODECS), default='zlib')
+    migrate.add_argument('--samples', type=int, default=2000, help="Packets to train on")
+    migrate.add_argument('--dict-size', type=int, default=text_codec.DICT_SIZE)
+    migrate.add_argument('--batch', type=int, default=1000, help="Rows per transaction")
+    migrate.add_argument('--vacuum', action='store_true', help="VACUUM afterwards to shrink the file")
+    bench = sub.add_parser('bench', help="Benchmark codecs and query latency")
+    bench.add_argument('--samples', type=int, default=500, help="Packets to compress")
+    bench.add_argument('--queries', type=int, default=50, help="Searches and fetches to time")
+    bench.add_argument('--dict-size', type=int, default=text_codec.DICT_SIZE)
+    args = ap.parse_args()
+
+    app = Flask(__name__)
+    app.config['DB_PATH'] = args.db
+    if args.action == 'migrate':
+        if not text_codec.available(args.codec):
+            ap.error(f"{args.codec} is not available; install zstandard")
+        app.config['TEXT_COMPRESSION'] = args.codec
+    init_app(app)
+    start = time.monotonic()
+    with app.app_context():
+        ensure_schema()
+        if args.action == 'migrate':
+            before = text_stats()
+            if use_text_view():
+                print("Rebuilt rsp_fts on the rsp_text view")
+            if before['rows']:
+                print(f"Dictionary: {json.dumps(train_text_dict(args.codec, args.samples, args.dict_size))}")
+            print(f"Rewritten: {json.dumps(recompress_text(args.codec, args.batch))}")
+            if args.vacuum:
+                execute("VACUUM")
+            after = text_stats()
+            print(json.dumps({'before': before, 'after': after}, indent=2))
+        elif args.action == 'bench':
+            texts = [text_codec.decode(r['text']) for r in execute(
+                "SELECT text FROM rsp WHERE text IS NOT NULL ORDER BY random() LIMIT ?", args.samples
+            )]
+            report = {'stats': text_stats(), 'queries': bench_queries(args.queries)}
+            if len(texts) >= 2:
+                report['codecs'] = bench_codecs(texts, args.dict_size)
+            print(json.dumps(report, indent=2))
+        else:
+            print(json.dumps(text_stats(), indent=2))
+    print(f'Done in {time.monotonic() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Maintain the RHIF full-text indexes.
+
+Usage:
+    python fts_admin.py ./rhif.sqlite stats
+    python fts_admin.py ./rhif.sqlite merge --pages 500
+    python fts_admin.py ./rhif.sqlite optimize
+    python fts_admin.py ./rhif.sqlite rebuild
+    python fts_admin.py ./rhif.sqlite config --automerge 8 --crisismerge 32
+
+``merge`` works in small transactions and is safe while the hub is running;
+``rebuild`` and ``optimize`` rewrite whole indexes and are best run idle.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from flask import Flask
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from hub.db import (  # noqa: E402
+    FTS_AUTOMERGE, FTS_CRISISMERGE, configure_fts, fts_stats, init_app, merge_fts,
+    optimize_fts, rebuild_fts,
+)
+
+
+def main():
+    """CLI entry point."""
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('db', help="Path to the RHIF SQLite database")
+    sub = ap.add_subparsers(dest='action', required=True)
+    sub.add_parser('stats', help="Show page counts and merge settings")
+    merge = sub.add_parser('merge', help="Incrementally merge index segments")
+    merge.add_argument('--pages', type=int, default=500, help="Leaf pages merged per step")
+    sub.add_parser('optimize', help="Merge each index into a single b-tree")
+    sub.add_parser('rebuild', help="Rebuild the indexes from their tables, then optimize")
+    config = sub.add_parser('config', help="Set automerge/crisismerge")
+    config.add_argument('--automerge', type=int, default=FTS_AUTOMERGE)
+    config.add_argument('--crisismerge', type=int, default=FTS_CRISISMERGE)
+    args = ap.parse_args()
+
+    app = Flask(__name__)
+    app.config['DB_PATH'] = args.db
+    init_app(app)
+    start = time.monotonic()
+    with app.app_context():
+        if args.action == 'merge':
+            print(f'Merge steps: {merge_fts(args.pages)}')
+        elif args.action == 'optimize':
+            optimize_fts()
+        elif args.action == 'rebuild':
+            rebuild_fts()
+        elif args.action == 'config':
+            configure_fts(args.automerge, args.crisismerge)
+        print(json.dumps(fts_stats(), indent=2))
+    print(f'Done in {time.monotonic() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
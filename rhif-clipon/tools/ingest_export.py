@@ -1,12 +1,31 @@
-"""Import legacy ChatGPT archives into the RHIF hub."""
+"""Import legacy ChatGPT archives into the RHIF hub.
+
+Turns are posted by ``--workers`` threads sharing one pooled HTTP session,
+with at most ``--window`` requests in flight. Every stored (or already
+present) turn is appended to a checkpoint file so an interrupted import can
+be rerun and will skip the turns it already sent.
+
+``--direct DB_PATH`` skips HTTP and writes straight into the database in
+large transactions. Rows are stored with their summary pending; the
+full-text indexes, fuzzy-search vocabulary, near-duplicate signatures and
+facet counts are rebuilt once at the end. ``--pending now`` then
+summarises them in-process, or ``--pending only`` does that later as a
+separate pass.
+"""
 
 import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 import logging
+import threading
 
 import ijson
 import requests
 import time
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
 
 
@@ -17,27 +36,72 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.setLevel(logging.ERROR)
 
+# statuses that mean "slow down" rather than "failed"
+BACKPRESSURE_STATUSES = (429, 503)
+RETRY_STATUSES = (500, 502, 504)
+MAX_BACKPRESSURE_WAITS = 60
 
-def ingest_message(hub, data):
-    """POST ``data`` to the hub with retries and back-off."""
+_session = requests
+# monotonic time before which no worker should send (hub asked us to wait)
+_pause_until = 0.0
+_pause_lock = threading.Lock()
+
+
+def make_session(workers):
+    """Return a ``requests.Session`` whose pool fits ``workers`` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _back_off(res, delay):
+    """Pause every worker for the hub's ``Retry-After`` (or ``delay``) seconds."""
+    global _pause_until
+    try:
+        wait_for = float(res.headers.get('Retry-After', delay))
+    except ValueError:
+        wait_for = delay
+    with _pause_lock:
+        _pause_until = max(_pause_until, time.monotonic() + wait_for)
+
+
+def _wait_for_hub():
+    remaining = _pause_until - time.monotonic()
+    if remaining > 0:
+        time.sleep(remaining)
+
+
+def _post(url, payload, describe):
+    """POST ``payload`` with retries; returns the final response.
+
+    429/503 responses pause all workers as long as the hub asks and do not
+    use up the error retries.
+    """
     delay = 1
-    for _ in range(3):
+    errors = 0
+    waits = 0
+    while errors < 3:
+        _wait_for_hub()
         res = None  # Ensure res is always defined
         try:
-            res = requests.post(f'{hub}/ingest', json=data)
-            if res.status_code in (429, 500, 502, 503, 504):
-                time.sleep(delay)
-                delay *= 2
+            res = _session.post(url, json=payload)
+            if res.status_code in BACKPRESSURE_STATUSES and waits < MAX_BACKPRESSURE_WAITS:
+                waits += 1
+                _back_off(res, delay)
                 continue
-            res.raise_for_status()
-            return
+            if res.status_code in RETRY_STATUSES:
+                raise requests.HTTPError(f'{res.status_code} from hub')
+            if res.status_code != 409:
+                res.raise_for_status()
+            return res
         except Exception as e:
+            errors += 1
             logger.error(
-                "Failed ingest for conv %s turn %s: %s\nPayload: %r\nResponse: %s",
-                data.get('conv_id'),
-                data.get('turn'),
+                "Failed ingest for %s: %s\nResponse: %s",
+                describe,
                 e,
-                data.get('text', '')[:200],
                 res.text[:200] if res is not None else ''
             )
             time.sleep(delay)
@@ -45,17 +109,33 @@ def ingest_message(hub, data):
     raise RuntimeError('ingest failed after retries')
 
 
-def main():
-    """CLI entry point for importing a ChatGPT archive directory."""
-    ap = argparse.ArgumentParser()
-    ap.add_argument('--export-dir', required=True, help="Directory containing conversations.json")
-    ap.add_argument('--hub', default='http://127.0.0.1:8765', help="URL of the ingestion hub")
-    ap.add_argument('--max-per-conv', type=int, default=100000, help="Max messages per conversation to ingest")
-    ap.add_argument('--summariser', choices=['ollama', 'gemini'], default='ollama', help="Summariser to use")
-    args = ap.parse_args()
+def ingest_message(hub, data):
+    """POST ``data`` to the hub; return seconds the hub spent summarising."""
+    res = _post(
+        f'{hub}/ingest', data,
+        f"conv {data.get('conv_id')} turn {data.get('turn')} ({data.get('text', '')[:200]!r})",
+    )
+    if res.status_code == 409:
+        return 0.0  # already stored
+    return res.json().get('llm_seconds', 0.0)
 
-    conv_path = Path(args.export_dir) / 'conversations.json'
-    total = 0
+
+def ingest_batch(hub, turns):
+    """POST ``turns`` to ``/ingest_batch``.
+
+    Returns ``(llm_seconds, results)`` with the hub's result for each turn.
+    """
+    res = _post(
+        f'{hub}/ingest_batch', {'turns': turns},
+        f"batch of {len(turns)} turns starting conv {turns[0].get('conv_id')} "
+        f"turn {turns[0].get('turn')}",
+    )
+    body = res.json()
+    return body.get('llm_seconds', 0.0), body.get('results', [])
+
+
+def iter_turns(conv_path, max_per_conv):
+    """Yield ``/ingest`` payloads for every text turn in ``conversations.json``."""
     with open(conv_path, 'r', encoding='utf-8') as f:
         # Top-level JSON is an array, so parse using 'item'
         conversations = ijson.items(f, 'item')
@@ -87,7 +167,9 @@ def main():
                 for part in parts:
                     if len(part) > 8000:
                         continue
-                    data = {
+                    if turn > max_per_conv:
+                        break
+                    yield {
                         'conv_id': conv_id,
                         'turn': turn,
                         'role': role,
@@ -96,21 +178,248 @@ def main():
                         'text': part,
                         'tags': ['#legacy'],
                     }
-                    try:
-                        ingest_message(args.hub, data)
-                    except Exception as e:
-                        logger.error(
-                            "Exception ingesting turn %s of %s: %s",
-                            turn,
-                            conv_id,
-                            e,
-                        )
                     turn += 1
-                    total += 1
-                    if turn > args.max_per_conv:
-                        break
 
+
+class Checkpoint:
+    """Append-only record of ``(conv_id, turn)`` pairs already ingested."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        conv_id, turn = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    self.done.add((conv_id, turn))
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def mark(self, turns):
+        for t in turns:
+            self.done.add((t['conv_id'], t['turn']))
+            self._file.write(json.dumps([t['conv_id'], t['turn']]) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def _direct_app(db_path):
+    """Return the hub app bound to ``db_path`` for in-process database access."""
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    os.environ['DB_PATH'] = db_path
+    from hub.hub import app
+    from hub.db import ensure_schema
+    app.config['DB_PATH'] = db_path
+    with app.app_context():
+        ensure_schema()
+    return app
+
+
+def ingest_direct(app, turns, commit_every):
+    """Insert ``turns`` straight into the database, summaries pending.
+
+    Rows are built as ``/ingest`` builds them and written ``commit_every``
+    per transaction without touching the FTS indexes, vocabulary, MinHash
+    tables or facet counts; each is rebuilt in one pass at the end. Turns
+    already stored with the same conversation, turn and text (whatever their
+    date) or the same hash count as duplicates. Returns ``(inserted, duplicates)``.
+    """
+    from hub.db import (find_rsp, insert_rsps, rebuild_facets, rebuild_fts, rebuild_minhash,
+                        rebuild_vocab)
+    from hub.hub import _row_from_payload
+
+    inserted = duplicates = 0
+    rows = []
+
+    def flush():
+        nonlocal inserted, duplicates
+        with app.app_context():
+            fresh = [row for row in rows
+                     if find_rsp(row['conv_id'], row['turn'], row['text']) is None]
+            duplicates += len(rows) - len(fresh)
+            for res in insert_rsps(fresh, fts=False, derived=False):
+                duplicates += res['dup']
+                inserted += not res['dup']
+        rows.clear()
+
+    for data in turns:
+        rows.append(_row_from_payload(data))
+        if len(rows) >= commit_every:
+            flush()
+    if rows:
+        flush()
+    with app.app_context():
+        rebuild_fts()
+        rebuild_vocab()
+        rebuild_minhash()
+        rebuild_facets()
+    return inserted, duplicates
+
+
+def summarise_pending(app, workers, batch):
+    """Summarise stored rows whose summary is pending, ``batch`` per call.
+
+    ``workers`` batches run concurrently through the hub's summariser (with
+    its routing, local short-turn path and offline fallback); the results
+    are written back from this thread. Returns ``(rows, llm_seconds)``.
+    """
+    from hub.db import META_AXES, pending_rsps, update_rsp_summary
+    from hub.hub import _summarise_rows
+
+    def run(rows):
+        start = time.perf_counter()
+        with app.app_context():
+            _summarise_rows(rows)
+        return time.perf_counter() - start
+
+    done = 0
+    llm_seconds = 0.0
+    after_id = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool, tqdm(desc='Summaries') as bar:
+        while True:
+            with app.app_context():
+                rows = pending_rsps(batch * workers, after_id)
+            if not rows:
+                break
+            after_id = rows[-1]['id']
+            chunks = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+            llm_seconds += sum(pool.map(run, chunks))
+            with app.app_context():
+                for row in rows:
+                    meta = {axis: row.get(axis) for axis in META_AXES}
+                    update_rsp_summary(row['id'], row['summary'], json.loads(row['keywords']), meta)
+            done += len(rows)
+            bar.update(len(rows))
+    return done, llm_seconds
+
+
+def main():
+    """CLI entry point for importing a ChatGPT archive directory."""
+    global _session
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--export-dir', required=True, help="Directory containing conversations.json")
+    ap.add_argument('--hub', default='http://127.0.0.1:8765', help="URL of the ingestion hub")
+    ap.add_argument('--max-per-conv', type=int, default=100000, help="Max messages per conversation to ingest")
+    ap.add_argument('--summariser', choices=['ollama', 'gemini'], default='ollama', help="Summariser to use")
+    ap.add_argument('--batch', type=int, default=1,
+                    help="Turns per /ingest_batch request; the hub packs their summaries into shared prompts")
+    ap.add_argument('--workers', type=int, default=1, help="Concurrent requests to the hub")
+    ap.add_argument('--window', type=int, default=0,
+                    help="Max requests in flight (default: 4 x workers)")
+    ap.add_argument('--checkpoint', default=None,
+                    help="Resume file of ingested (conv_id, turn) pairs "
+                         "(default: <export-dir>/ingest_checkpoint.jsonl)")
+    ap.add_argument('--direct', metavar='DB_PATH', default=None,
+                    help="Write straight into this database instead of posting to the hub")
+    ap.add_argument('--commit-every', type=int, default=5000,
+                    help="Rows per transaction with --direct")
+    ap.add_argument('--pending', choices=['defer', 'now', 'only'], default='defer',
+                    help="With --direct: 'defer' (default) loads rows with an empty summary, "
+                         "which stays empty until a later run with '--pending only'; 'now' "
+                         "summarises them right after the load; 'only' loads nothing and "
+                         "summarises every pending row")
+    args = ap.parse_args()
+
+    conv_path = Path(args.export_dir) / 'conversations.json'
+    if args.direct:
+        return main_direct(args, conv_path)
+    checkpoint = Checkpoint(args.checkpoint or Path(args.export_dir) / 'ingest_checkpoint.jsonl')
+    workers = max(args.workers, 1)
+    window = args.window or workers * 4
+    _session = make_session(workers)
+
+    total = skipped = failed = 0
+    llm_seconds = 0.0
+    started = time.monotonic()
+
+    def send(turns):
+        if args.batch > 1:
+            return ingest_batch(args.hub, turns)
+        return ingest_message(args.hub, turns[0]), [{'ok': True}]
+
+    def settle(done, in_flight):
+        nonlocal total, failed, llm_seconds
+        for fut in done:
+            turns = in_flight.pop(fut)
+            try:
+                seconds, results = fut.result()
+                llm_seconds += seconds
+            except Exception as e:
+                failed += len(turns)
+                logger.error(
+                    "Exception ingesting turn %s of %s: %s",
+                    turns[0]['turn'],
+                    turns[0]['conv_id'],
+                    e,
+                )
+                continue
+            # only turns the hub stored (or already had) are safe to skip next run
+            stored = []
+            for turn, res in zip(turns, results):
+                if res.get('ok') or res.get('dup'):
+                    stored.append(turn)
+                else:
+                    logger.error("Hub rejected turn %s of %s: %s",
+                                 turn['turn'], turn['conv_id'], res.get('error'))
+            failed += len(turns) - len(stored)
+            checkpoint.mark(stored)
+            total += len(stored)
+
+    in_flight = {}
+    pending = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(turns):
+            while len(in_flight) >= window:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                settle(done, in_flight)
+            in_flight[pool.submit(send, turns)] = turns
+
+        for data in iter_turns(conv_path, args.max_per_conv):
+            if (data['conv_id'], data['turn']) in checkpoint:
+                skipped += 1
+                continue
+            pending.append(data)
+            if len(pending) >= max(args.batch, 1):
+                submit(pending)
+                pending = []
+        if pending:
+            submit(pending)
+        settle(wait(in_flight).done, in_flight)
+    checkpoint.close()
+
+    elapsed = max(time.monotonic() - started, 1e-9)
     print(f'Packets ingested: {total}')
+    print(f'Skipped (checkpoint): {skipped}  Failed: {failed}')
+    print(f'Throughput: {total / elapsed:.1f} turns/s over {elapsed:.1f}s, '
+          f'LLM-seconds: {llm_seconds:.1f}')
+
+
+
+def main_direct(args, conv_path):
+    """Run the ``--direct`` import and/or pending-summary pass."""
+    app = _direct_app(args.direct)
+    workers = max(args.workers, 1)
+    started = time.monotonic()
+    if args.pending != 'only':
+        inserted, duplicates = ingest_direct(
+            app, iter_turns(conv_path, args.max_per_conv), max(args.commit_every, 1)
+        )
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f'Packets ingested: {inserted}  Duplicates: {duplicates}')
+        print(f'Throughput: {inserted / elapsed:.1f} turns/s over {elapsed:.1f}s')
+    if args.pending != 'defer':
+        started = time.monotonic()
+        done, llm_seconds = summarise_pending(app, workers, max(args.batch, 8))
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f'Summarised: {done} at {done / elapsed:.1f} turns/s, '
+              f'LLM-seconds: {llm_seconds:.1f}')
 
 
 if __name__ == '__main__':
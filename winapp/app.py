@@ -39,8 +39,8 @@ class RHIFApp:
         self.search_history = self.settings.get("history", [])
         self.limit_var = tk.IntVar(value=self.settings.get("search_limit", 20))
         self.always_on_top_var = tk.BooleanVar(value=self.settings.get("always_on_top", True))
-        self.domain_suggestions = set()
-        self.topic_suggestions = set()
+        self.domain_suggestions = []
+        self.topic_suggestions = []
         self.domain_cb = None
         self.topic_cb = None
 
@@ -139,14 +139,16 @@ class RHIFApp:
         self.filters_win.resizable(False, False)
         self.filters_win.transient(self.panel)
         self.filters_win.attributes("-topmost", self.always_on_top_var.get())
+        if not self.domain_suggestions:
+            self.refresh_facets()
 
         row = 0
         ttk.Label(self.filters_win, text="Domain").grid(row=row, column=0, sticky="e")
-        self.domain_cb = ttk.Combobox(self.filters_win, textvariable=self.domain_var, values=sorted(self.domain_suggestions), width=15)
+        self.domain_cb = ttk.Combobox(self.filters_win, textvariable=self.domain_var, values=self.domain_suggestions, width=15)
         self.domain_cb.grid(row=row, column=1, pady=2)
         row += 1
         ttk.Label(self.filters_win, text="Topic").grid(row=row, column=0, sticky="e")
-        self.topic_cb = ttk.Combobox(self.filters_win, textvariable=self.topic_var, values=sorted(self.topic_suggestions), width=15)
+        self.topic_cb = ttk.Combobox(self.filters_win, textvariable=self.topic_var, values=self.topic_suggestions, width=15)
         self.topic_cb.grid(row=row, column=1, pady=2)
         row += 1
         for lbl, var in [
@@ -289,6 +291,8 @@ class RHIFApp:
             self.search_history.append(q)
             self.search_entry['values'] = self.search_history
         params = {'q': q, 'limit': str(self.limit_var.get())}
+        # the list only needs an excerpt; the preview loads the conversation
+        list_params = {'fields': 'id,conv_id,summary,snippet', 'open': '', 'close': ''}
         if self.domain_var.get():
             params['domain'] = self.domain_var.get()
         if self.topic_var.get():
@@ -306,7 +310,7 @@ class RHIFApp:
         try:
             r = requests.get(
                 f'{HUB_BASE}/search',
-                params=params,
+                params={**params, **list_params},
                 headers={'Accept': 'application/json'}
             )
             r.raise_for_status()
@@ -320,20 +324,31 @@ class RHIFApp:
         self.results.delete(0, tk.END)
         self.conv_cache.clear()
         for row in self.rows:
-            txt = (row.get('summary') or row.get('text', ''))[:60]
+            txt = (row.get('summary') or row.get('snippet', ''))[:60]
             self.results.insert(tk.END, txt)
-            if row.get('domain'):
-                self.domain_suggestions.add(row['domain'])
-            if row.get('topic'):
-                self.topic_suggestions.add(row['topic'])
-        if self.domain_cb:
-            self.domain_cb['values'] = sorted(self.domain_suggestions)
-        if self.topic_cb:
-            self.topic_cb['values'] = sorted(self.topic_suggestions)
+        params.pop('limit', None)
+        params.pop('slow', None)
+        self.refresh_facets(params)
         self.preview.set_html('<i>Select an entry</i>')
         self.conv_rows = []
         self.conv_idx = -1
 
+    def refresh_facets(self, params=None):
+        """Fill the domain/topic suggestions from the hub's facet counts."""
+        try:
+            r = requests.get(f'{HUB_BASE}/facets', params=params or {})
+            r.raise_for_status()
+            facets = r.json()['facets']
+        except Exception:
+            return
+        # the hub lists the most frequent values first
+        self.domain_suggestions = [f['value'] for f in facets.get('domain', [])]
+        self.topic_suggestions = [f['value'] for f in facets.get('topic', [])]
+        if self.domain_cb:
+            self.domain_cb['values'] = self.domain_suggestions
+        if self.topic_cb:
+            self.topic_cb['values'] = self.topic_suggestions
+
     def ensure_conversation(self, conv_id):
         if conv_id not in self.conv_cache:
             r = requests.get(f'{HUB_BASE}/conversation', params={'conv_id': conv_id})